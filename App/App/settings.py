@@ -96,6 +96,16 @@ STATICFILES_DIRS = [
 ]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Fotos de artículos (catalog/subidas.py): máximo por foto y por publicación, en bytes
+CATALOG_SUBIDA_MAX_ARCHIVO = 10 * 1024 * 1024
+CATALOG_SUBIDA_MAX_TOTAL = 50 * 1024 * 1024
+# Exportación del catálogo (catalog/exportar.py): filas por lectura a la base de datos
+CATALOG_EXPORTAR_CHUNK = 2000
+# Fotos de artículos y de perfil se guardan por contenido en MEDIA_ROOT/cas/
+# (common/almacenamiento.py). Sus URLs no cambian nunca de contenido: en
+# producción el servidor web puede servir /media/cas/ con esta misma cabecera.
+MEDIA_CAS_DIRECTORIO = "cas"
+MEDIA_CAS_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -111,6 +121,10 @@ REST_FRAMEWORK = {
         "django_filters.rest_framework.DjangoFilterBackend",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Límites por vista con throttle_scope (ScopedRateThrottle)
+    "DEFAULT_THROTTLE_RATES": {
+        "exportar": "10/hour",  # /api/articulos/exportar/ recorre todo el catálogo
+    },
     # (Opcional) Paginación recomendada:
     # "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     # "PAGE_SIZE": 10,
@@ -139,8 +153,51 @@ AUTH_USER_MODEL = "users.User"
 EXTERNAL_GEO = {
     "NOMINATIM_BASE": "https://nominatim.openstreetmap.org/search",
     # Nominatim requiere un User-Agent identificable:
-    "USER_AGENT": "Toolingo/1.0 (contacto: tu-email@dominio.com)"
+    "USER_AGENT": "Toolingo/1.0 (contacto: tu-email@dominio.com)",
+    # Política de Nominatim: máximo 1 petición/segundo (por proceso, ver common/services/nominatim.py)
+    "RATE_PER_SEC": 1.0,
+    "MAX_RETRIES": 3,
+}
+# Caché de geocodificación (common/services/geocoding.py), en segundos:
+# resultados encontrados, consultas sin resultado y tamaño del LRU en proceso
+GEOCODING_CACHE_TTL = 60 * 60 * 24 * 30
+GEOCODING_CACHE_TTL_NEGATIVO = 60 * 60 * 24
+GEOCODING_CACHE_LRU = 512
+# Proveedores de geocodificación, en orden (ver common/services/geocoding.py):
+# nomenclátor local de Colombia (common/data/gazetteer_co.csv) y Nominatim de respaldo.
+# Con ["gazetteer"] solo no se sale a la red (tests, benchmarks).
+GEOCODING_PROVIDERS = ["gazetteer", "nominatim"]
+
+# Cola de tareas en segundo plano (common/jobs.py, manage.py run_workers):
+# intentos antes de pasar a DEAD, backoff inicial/máximo entre reintentos y
+# segundos tras los que una tarea RUNNING de un worker caído vuelve a la cola.
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF = 10
+JOBS_BACKOFF_MAX = 60 * 60
+JOBS_LOCK_TIMEOUT = 60 * 10
+
+# Feed de cambios de /api/aliados/productos/?since= (catalog/feed.py): segundos
+# que se retienen los cambios recientes para no saltar transacciones en curso.
+ALIADOS_FEED_MARGEN = 5
+
+# Índice espacial en memoria (KD-tree) para /api/articulos/cerca/.
+# Se construye al arrancar, se actualiza con señales de Articulo y se recarga
+# cuando otro proceso lo cambia (versión en el caché: conviene uno compartido).
+CATALOG_INDICE_ESPACIAL = False
+
+# Caché de Django (facetas, árbol de categorías, GET condicional, respuestas).
+# LocMem es por proceso; en producción con varios workers conviene Redis/Memcached.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "toolingo",
+    },
 }
+
+# Caché de respuestas para lecturas anónimas del catálogo (common/cache_respuestas.py)
+CACHE_RESPUESTAS_ALIAS = "default"
+CACHE_RESPUESTAS_TTL = 60 * 5
+
 # Timeout en segundos para requests externas
 HTTP_CLIENT_TIMEOUT = 8
 
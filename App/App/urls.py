@@ -33,6 +33,8 @@ from rentals.views import (
     ReviewsByArticuloEligibility, ReviewsByArticuloCreate,
 )
 from chat.views import ConversationViewSet
+from common.almacenamiento import servir_media
+from common.views import EstadisticasCacheView, EstadisticasGeocodingView
 from catalog.pages import productos_aliados
 
 
@@ -84,6 +86,8 @@ urlpatterns = [
     path("api/aliados/productos/", AliadosArticuloList.as_view(), name="aliados-productos"),
     path("api/wallet/", WalletBalanceView.as_view(), name="wallet-balance"),
     path("api/wallet/recargar/", WalletRechargeView.as_view(), name="wallet-recharge"),
+    path("api/cache/estadisticas/", EstadisticasCacheView.as_view(), name="cache-estadisticas"),
+    path("api/geocoding/estadisticas/", EstadisticasGeocodingView.as_view(), name="geocoding-estadisticas"),
 
     # --- Endpoints de reseñas ---
     path("api/articulos/<uuid:art_id>/reviews/", ReviewsByArticuloList.as_view(), name="art-reviews-list"),
@@ -120,4 +124,4 @@ urlpatterns += i18n_patterns(
 
 #  Media en modo DEBUG
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=servir_media, document_root=settings.MEDIA_ROOT)
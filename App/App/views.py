@@ -2,12 +2,13 @@
 from django.shortcuts import render
 from django.http import HttpResponse
 from django.utils.timezone import now
-from datetime import timedelta
 
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from rest_framework.views import APIView
 
+from common import jobs
+from common.models import Notification
 from common.services.payment_factory import make_processor
 from rentals.models import CartItem, Alquiler
 
@@ -36,8 +37,22 @@ def _notif_box(request):
     return request.session["notifs"]
 
 
+def _notif_dict(n):
+    """Notification (tabla) con la misma forma que las de la sesión."""
+    return {
+        "id": f"n-{n.pk}",
+        "kind": n.kind,
+        "title": n.title,
+        "body": n.body,
+        "action_url": n.action_url,
+        "created_at": n.created_at.isoformat(),
+        "expires_at": n.expires_at.isoformat() if n.expires_at else None,
+        "read_at": n.read_at.isoformat() if n.read_at else None,
+    }
+
+
 class NotificacionesList(APIView):
-    """GET /api/notificaciones/ -> lista activas"""
+    """GET /api/notificaciones/ -> lista activas (tabla Notification + sesión)"""
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
@@ -51,6 +66,9 @@ class NotificacionesList(APIView):
             if exp and tnow.isoformat() > exp:
                 continue
             alive.append(n)
+        guardadas = (Notification.objects.filter(user=request.user, read_at__isnull=True)
+                     .exclude(expires_at__lt=tnow))
+        alive = [_notif_dict(n) for n in guardadas] + alive
         request.session["notifs"] = box
         request.session.modified = True
         return Response({"count": len(alive), "results": alive})
@@ -63,7 +81,7 @@ class NotificacionesMarkAll(APIView):
     def post(self, request):
         box = _notif_box(request)
         tnow = now().isoformat()
-        marked = 0
+        marked = Notification.objects.filter(user=request.user, read_at__isnull=True).update(read_at=now())
         for n in box:
             if not n.get("read_at"):
                 n["read_at"] = tnow
@@ -171,28 +189,11 @@ class SimularPagoView(APIView):
             resp["Content-Disposition"] = f'attachment; filename="{filename}"'
             return resp
 
-        # Notificación “Califica el artículo…”
-        try:
-            items = CartItem.objects.filter(user=request.user).select_related("articulo")
-            box = _notif_box(request)
-            tnow = now()
-            for it in items:
-                art_obj = getattr(it, "articulo", None)
-                if not art_obj:
-                    continue
-                box.append({
-                    "id": f"rev-{art_obj.id}-{int(tnow.timestamp())}",
-                    "kind": "review_request",
-                    "title": "Califica el artículo que adquiriste",
-                    "body": f"Cuéntanos cómo te fue con “{getattr(art_obj, 'titulo', str(art_obj.id))}”.",
-                    "action_url": f"/articulo/{art_obj.id}/#opiniones",
-                    "created_at": tnow.isoformat(),
-                    "expires_at": (tnow + timedelta(days=5)).isoformat(),
-                    "read_at": None,
-                })
-            request.session["notifs"] = box
-            request.session.modified = True
-        except Exception:
-            pass
+        # Notificación “Califica el artículo…” (la crea un worker, ver rentals/tareas.py)
+        articulo_ids = [str(pk) for pk in CartItem.objects.filter(user=request.user)
+                        .values_list("articulo_id", flat=True).distinct() if pk]
+        if articulo_ids:
+            jobs.enqueue("rentals.pedir_resenas", priority=5,
+                         user_id=str(request.user.pk), articulo_ids=articulo_ids)
 
         return Response(result, status=status.HTTP_200_OK)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'catalog'
+
+    def ready(self):
+        # registra haversine_km en las conexiones SQLite y las señales del índice espacial
+        from . import db, signals, spatial  # noqa: F401
+        if spatial.habilitado():
+            spatial.indice.cargar_al_arrancar()
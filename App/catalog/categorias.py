@@ -0,0 +1,66 @@
+# App/catalog/categorias.py
+"""
+Árbol de categorías para /api/categorias/arbol/ y el campo `hijas`.
+
+Se arma en memoria a partir de una sola consulta (ordenada por profundidad,
+así cada padre aparece antes que sus hijas) y se guarda en caché hasta que
+cambie alguna categoría (ver catalog/signals.py).
+"""
+from django.core.cache import cache
+from django.db.models import Q
+
+CLAVE = "catalog:categorias:arbol"
+TTL = 60 * 60
+
+
+def invalidar():
+    cache.delete(CLAVE)
+
+
+def construir():
+    from .models import Categoria
+    nodos, raices = {}, []
+    filas = (Categoria.objects.order_by("profundidad", "nombre")
+             .values_list("id", "nombre", "slug", "parent_id", "profundidad", "es_hoja"))
+    for pk, nombre, slug, parent_id, prof, es_hoja in filas:
+        nodo = {"id": str(pk), "nombre": nombre, "slug": slug,
+                "parent": str(parent_id) if parent_id else None,
+                "profundidad": prof, "es_hoja": es_hoja, "hijas": []}
+        nodos[pk] = nodo
+        padre = nodos.get(parent_id)
+        (padre["hijas"] if padre else raices).append(nodo)
+    return raices
+
+
+def obtener():
+    """Lista de raíces, cada una con sus `hijas` anidadas."""
+    arbol = cache.get(CLAVE)
+    if arbol is None:
+        arbol = construir()
+        cache.set(CLAVE, arbol, TTL)
+    return arbol
+
+
+def por_id(arbol):
+    """{id (str): nodo} para todo el árbol."""
+    nodos, pila = {}, list(arbol)
+    while pila:
+        nodo = pila.pop()
+        nodos[nodo["id"]] = nodo
+        pila.extend(nodo["hijas"])
+    return nodos
+
+
+def ids_subarbol(slug):
+    """
+    Ids de la categoría `slug` y todas sus descendientes, vía la ruta
+    materializada (prefijo indexado). Lista vacía si el slug no existe.
+    """
+    from .models import Categoria
+    rutas = list(Categoria.objects.filter(slug=slug).values_list("ruta", flat=True))
+    if not rutas:
+        return []
+    prefijos = Q()
+    for ruta in rutas:
+        prefijos |= Categoria.subarbol(ruta)
+    return list(Categoria.objects.filter(prefijos).values_list("id", flat=True))
@@ -0,0 +1,52 @@
+# App/catalog/db.py
+from django.db.backends.signals import connection_created
+from django.db.models import FloatField, Func, Value
+from django.dispatch import receiver
+
+from .utils import haversine_km, R_TIERRA_KM
+
+
+def _haversine_sqlite(lat1, lng1, lat2, lng2):
+    if lat1 is None or lng1 is None or lat2 is None or lng2 is None:
+        return None
+    return haversine_km(lat1, lng1, lat2, lng2)
+
+
+@receiver(connection_created)
+def registrar_funciones_sqlite(sender, connection, **kwargs):
+    """
+    Registra haversine_km(lat1, lng1, lat2, lng2) en cada conexión SQLite
+    para poder filtrar/ordenar por distancia dentro de la consulta.
+    """
+    if connection.vendor == "sqlite":
+        connection.connection.create_function("haversine_km", 4, _haversine_sqlite, deterministic=True)
+
+
+class Haversine(Func):
+    """
+    Distancia en km entre (lat, lng) de cada fila y un origen fijo.
+
+    En SQLite usa la función registrada arriba; en otros motores expande la
+    misma fórmula con RADIANS/SIN/COS/ASIN/SQRT estándar.
+    Uso: Articulo.objects.annotate(distancia=Haversine("lat", "lng", 6.24, -75.58))
+    """
+    function = "haversine_km"
+    output_field = FloatField()
+
+    def __init__(self, lat, lng, lat0, lng0, **extra):
+        super().__init__(lat, lng, Value(float(lat0)), Value(float(lng0)), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, **extra_context)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (lat, p_lat), (lng, p_lng), (lat0, p_lat0), (lng0, p_lng0) = (
+            compiler.compile(e) for e in self.get_source_expressions()
+        )
+        sql = (
+            f"2 * {R_TIERRA_KM} * ASIN(SQRT("
+            f"POWER(SIN((RADIANS({lat}) - RADIANS({lat0})) / 2), 2) + "
+            f"COS(RADIANS({lat0})) * COS(RADIANS({lat})) * "
+            f"POWER(SIN((RADIANS({lng}) - RADIANS({lng0})) / 2), 2)))"
+        )
+        return sql, (*p_lat, *p_lat0, *p_lat0, *p_lat, *p_lng, *p_lng0)
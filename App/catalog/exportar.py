@@ -0,0 +1,95 @@
+# App/catalog/exportar.py
+"""
+Exportación completa del catálogo en NDJSON o CSV, por streaming.
+
+Las filas se leen con values() e iterator(chunk_size=...) (sin instancias
+de modelo ni serializer) y se emiten en bloques de texto a medida que
+llegan, opcionalmente comprimidos con gzip de forma incremental. La memoria
+no depende del tamaño del catálogo. La usan GET /api/articulos/exportar/
+y el comando exportar_catalogo.
+"""
+import csv
+import zlib
+from io import StringIO
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Articulo
+
+# Campos públicos (los mismos que muestra el listado), con la categoría aplanada
+CAMPOS = (
+    "id", "titulo", "descripcion", "estado", "precio_por_dia", "deposito",
+    "disponibilidad_global", "ubicacion", "lat", "lng",
+    "categoria_id", "categoria__slug", "creado", "actualizado",
+)
+COLUMNAS = tuple(c.replace("__", "_") for c in CAMPOS)  # categoria__slug -> categoria_slug
+
+CHUNK = getattr(settings, "CATALOG_EXPORTAR_CHUNK", 2000)
+FORMATOS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+
+def filas(qs=None, chunk_size=None):
+    """Diccionarios {columna: valor} de `qs` (todo el catálogo por defecto), en orden de id."""
+    qs = Articulo.objects.all() if qs is None else qs
+    for fila in qs.order_by("id").values_list(*CAMPOS).iterator(chunk_size=chunk_size or CHUNK):
+        yield dict(zip(COLUMNAS, fila))
+
+
+def _en_bloques(lineas, tamano):
+    # un write por bloque en lugar de uno por fila
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= tamano:
+            yield "".join(bloque)
+            bloque = []
+    if bloque:
+        yield "".join(bloque)
+
+
+def ndjson(datos, tamano=500):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    return _en_bloques((encoder.encode(d) + "\n" for d in datos), tamano)
+
+
+def csv_(datos, tamano=500):
+    def lineas():
+        buf = StringIO()
+        escritor = csv.DictWriter(buf, fieldnames=COLUMNAS)
+        escritor.writeheader()
+        for d in datos:
+            escritor.writerow(d)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+    # el encabezado queda en la primera línea emitida
+    return _en_bloques(lineas(), tamano)
+
+
+def generar(formato, qs=None, chunk_size=None):
+    """Bloques de texto del catálogo en `formato` ("ndjson" o "csv")."""
+    datos = filas(qs, chunk_size)
+    return ndjson(datos) if formato == "ndjson" else csv_(datos)
+
+
+def gzip(bloques, nivel=6, minimo=64 * 1024):
+    """Comprime en gzip sobre la marcha; emite cuando junta `minimo` bytes."""
+    z = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # wbits=31: cabecera y cola gzip
+    pendiente = []
+    n = 0
+    for bloque in bloques:
+        salida = z.compress(bloque.encode("utf-8"))
+        if salida:
+            pendiente.append(salida)
+            n += len(salida)
+        if n >= minimo:
+            yield b"".join(pendiente)
+            pendiente, n = [], 0
+    pendiente.append(z.flush())
+    yield b"".join(pendiente)
@@ -0,0 +1,82 @@
+# App/catalog/facetas.py
+"""
+Conteos por faceta (categoría, estado y rango de precio) para la barra
+lateral del catálogo. Cada faceta es una sola consulta agrupada y el
+resultado se guarda en caché con una clave normalizada de los filtros.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.utils.translation import get_language
+
+# Cortes del histograma de precio_por_dia (COP/día)
+CORTES_PRECIO = [20000, 50000, 100000, 200000, 500000]
+TTL = 60 * 5
+CLAVE_VERSION = "catalog:facetas:version"
+
+# Parámetros que no cambian los conteos
+PARAMS_IGNORADOS = {"ordering", "page", "page_size", "cursor", "format", "fields", "expand"}
+
+
+def invalidar():
+    """Descarta todas las facetas en caché (se llama desde las señales)."""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 1, None)
+
+
+def clave(query_params):
+    """
+    Clave de caché independiente del orden de los parámetros y de los
+    valores vacíos: ?estado=NUEVO&precio_min=10 == ?precio_min=10&estado=NUEVO.
+    """
+    partes = []
+    for k in sorted(query_params.keys()):
+        if k in PARAMS_IGNORADOS:
+            continue
+        valores = sorted(v.strip() for v in query_params.getlist(k) if v.strip())
+        if valores:
+            partes.append(f"{k}={','.join(valores)}")
+    digest = hashlib.sha1("&".join(partes).encode()).hexdigest()
+    version = cache.get(CLAVE_VERSION, 0)
+    return f"catalog:facetas:{version}:{get_language()}:{digest}"
+
+
+def calcular(qs):
+    """
+    `qs` es el queryset ya filtrado; devuelve el payload de /facetas/.
+    """
+    qs = qs.order_by()
+
+    por_estado = {f["estado"]: f["n"] for f in qs.values("estado").annotate(n=Count("id"))}
+
+    categorias = [
+        {"id": f["categoria_id"], "slug": f["categoria__slug"], "nombre": f["categoria__nombre"], "n": f["n"]}
+        for f in (qs.values("categoria_id", "categoria__slug", "categoria__nombre")
+                    .annotate(n=Count("id")).order_by("-n", "categoria__nombre"))
+    ]
+
+    cubeta = Case(*[When(precio_por_dia__lt=c, then=Value(i)) for i, c in enumerate(CORTES_PRECIO)],
+                  default=Value(len(CORTES_PRECIO)), output_field=IntegerField())
+    por_cubeta = {f["cubeta"]: f["n"] for f in qs.annotate(cubeta=cubeta).values("cubeta").annotate(n=Count("id"))}
+    limites = [0, *CORTES_PRECIO, None]
+    precios = [{"desde": limites[i], "hasta": limites[i + 1], "n": por_cubeta.get(i, 0)}
+               for i in range(len(limites) - 1)]
+
+    return {
+        "total": sum(por_estado.values()),
+        "categoria": categorias,
+        "estado": [{"valor": k, "n": n} for k, n in sorted(por_estado.items())],
+        "precio_por_dia": precios,
+    }
+
+
+def obtener(qs, query_params):
+    k = clave(query_params)
+    data = cache.get(k)
+    if data is None:
+        data = calcular(qs)
+        cache.set(k, data, TTL)
+    return data
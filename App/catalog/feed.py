@@ -0,0 +1,70 @@
+# App/catalog/feed.py
+"""
+Feed de cambios del catálogo para aliados (/api/aliados/productos/?since=).
+
+Altas y ediciones salen de Articulo.actualizado y las bajas de
+ArticuloBorrado; ambas se recorren por keyset sobre (fecha, id) con sus
+índices y se intercalan en un solo orden. El cursor es la posición del
+último cambio entregado: el aliado lo guarda y pide solo lo posterior.
+
+Solo se entregan cambios con más de ALIADOS_FEED_MARGEN segundos (5 por
+defecto): una transacción que aún no confirmó puede traer una fecha anterior
+a la de otras ya visibles, y sin el margen el cursor la dejaría atrás.
+"""
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from .models import Articulo, ArticuloBorrado
+
+LIMITE = 100
+LIMITE_MAX = 500
+
+
+def codificar(posicion):
+    fecha, pk = posicion
+    return urlsafe_b64encode(json.dumps([fecha.isoformat(), str(pk)]).encode()).decode()
+
+
+def decodificar(crudo):
+    """Posición (fecha, uuid) del cursor; None si viene vacío (desde el principio)."""
+    if not crudo:
+        return None
+    try:
+        fecha, pk = json.loads(urlsafe_b64decode(crudo.encode()).decode())
+        return datetime.fromisoformat(fecha), uuid.UUID(pk)
+    except (TypeError, ValueError):
+        raise NotFound("Cursor inválido.")
+
+
+def _despues(qs, campo_fecha, campo_id, posicion):
+    if posicion:
+        fecha, pk = posicion
+        qs = qs.filter(Q(**{f"{campo_fecha}__gt": fecha}) | Q(**{campo_fecha: fecha, f"{campo_id}__gt": pk}))
+    return qs.order_by(campo_fecha, campo_id)
+
+
+def cambios(posicion, limite=LIMITE):
+    """
+    (cambios, siguiente, hay_mas). Cada cambio es (fecha, id, articulo) con
+    articulo=None para las bajas; `siguiente` es la posición del último (o
+    la recibida si no hubo cambios).
+    """
+    margen = getattr(settings, "ALIADOS_FEED_MARGEN", 5)
+    hasta = timezone.now() - timedelta(seconds=margen)
+    articulos = _despues(Articulo.objects.filter(actualizado__lte=hasta).select_related("portada"),
+                         "actualizado", "id", posicion)[:limite + 1]
+    bajas = _despues(ArticuloBorrado.objects.filter(borrado__lte=hasta),
+                     "borrado", "articulo_id", posicion).values_list("borrado", "articulo_id")[:limite + 1]
+
+    todos = sorted([(a.actualizado, a.pk, a) for a in articulos] + [(f, pk, None) for f, pk in bajas],
+                   key=lambda c: (c[0], c[1]))
+    pagina = todos[:limite]
+    siguiente = (pagina[-1][0], pagina[-1][1]) if pagina else posicion
+    return pagina, siguiente, len(todos) > limite
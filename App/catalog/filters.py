@@ -1,12 +1,143 @@
 import django_filters as df
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+from rest_framework import filters
+from . import categorias, trigramas
 from .models import Articulo
+from .utils import caja_radio
 
 class ArticuloFilter(df.FilterSet):
     precio_min = df.NumberFilter(field_name="precio_por_dia", lookup_expr="gte")
     precio_max = df.NumberFilter(field_name="precio_por_dia", lookup_expr="lte")
     categoria = df.CharFilter(field_name="categoria__slug", lookup_expr="iexact")
+    # categoría y todas sus subcategorías (ruta materializada)
+    categoria_arbol = df.CharFilter(method="filtro_categoria_arbol")
     ubicacion = df.CharFilter(field_name="ubicacion", lookup_expr="icontains")
+    # Origen para la anotación "distancia" (la aplica ArticuloViewSet.get_queryset)
+    lat = df.NumberFilter(method="filtro_origen")
+    lng = df.NumberFilter(method="filtro_origen")
+    radio_km = df.NumberFilter(method="filtro_radio")
 
     class Meta:
         model = Articulo
         fields = ["estado"]
+
+    def filtro_origen(self, queryset, name, value):
+        return queryset
+
+    def filtro_categoria_arbol(self, queryset, name, value):
+        return queryset.filter(categoria_id__in=categorias.ids_subarbol(value))
+
+    def filtro_radio(self, queryset, name, value):
+        lat0 = self.form.cleaned_data.get("lat")
+        lng0 = self.form.cleaned_data.get("lng")
+        if "distancia" not in queryset.query.annotations or lat0 is None or lng0 is None:
+            return queryset
+        # caja envolvente primero (indexable), luego la distancia exacta; sin
+        # filtro de longitud si el círculo alcanza un polo o cruza ±180°
+        radio = float(value)
+        lat_lo, lat_hi, lng_lo, lng_hi = caja_radio(lat0, lng0, radio)
+        queryset = queryset.filter(lat__gte=lat_lo, lat__lte=lat_hi)
+        if lng_lo is not None:
+            queryset = queryset.filter(lng__gte=lng_lo, lng__lte=lng_hi)
+        return queryset.filter(distancia__lte=radio)
+
+class ArticuloSearchFilter(filters.SearchFilter):
+    """
+    Búsqueda ?search= sobre el índice FTS5 catalog_articulo_fts (ver migración
+    0005). Cada término se trata como prefijo ("tala" encuentra "taladro") y
+    los resultados se anotan con "relevancia" (bm25, menor es mejor) para que
+    ArticuloOrderingFilter los ordene cuando no se pide otro orden.
+    En motores sin FTS5 se comporta como el SearchFilter de DRF (LIKE).
+    """
+    tabla_fts = "catalog_articulo_fts"
+    tabla_map = "catalog_articulo_fts_map"
+    # pesos bm25 por columna: titulo, descripcion, ubicacion
+    pesos = (10.0, 1.0, 3.0)
+    _disponible = {}
+
+    def _fts_disponible(self, queryset):
+        alias = queryset.db
+        if alias not in self._disponible:
+            conn = connections[alias]
+            self._disponible[alias] = (conn.vendor == "sqlite"
+                                       and self.tabla_fts in conn.introspection.table_names())
+        return self._disponible[alias]
+
+    @staticmethod
+    def expresion_match(terminos):
+        """
+        'taladro percutor' -> '"taladro"* "percutor"*' (AND implícito, prefijos).
+        """
+        limpios = ["".join(ch for ch in t if ch.isalnum()) for t in terminos]
+        return " ".join(f'"{t}"*' for t in limpios if t)
+
+    def filter_queryset(self, request, queryset, view):
+        terminos = self.get_search_terms(request)
+        if not terminos or not self._fts_disponible(queryset):
+            return super().filter_queryset(request, queryset, view)
+        match = self.expresion_match(terminos)
+        if not match:
+            return queryset.none()
+        tabla = queryset.model._meta.db_table
+        pesos = ", ".join(str(p) for p in self.pesos)
+        return (queryset
+                .extra(tables=[self.tabla_map, self.tabla_fts],
+                       where=[f"{self.tabla_map}.articulo_id = {tabla}.id",
+                              f"{self.tabla_map}.rowid = {self.tabla_fts}.rowid",
+                              f"{self.tabla_fts} MATCH %s"],
+                       params=[match])
+                .annotate(relevancia=RawSQL(f"bm25({self.tabla_fts}, {pesos})", (), output_field=FloatField())))
+
+
+class ArticuloFuzzyFilter(filters.BaseFilterBackend):
+    """
+    ?q_fuzzy=: búsqueda tolerante a errores ("talador" encuentra "taladro")
+    por similitud de trigramas con el título del artículo o con el nombre de
+    su categoría (ver catalog/trigramas.py). Anota "similitud" (0..1).
+    """
+    param = "q_fuzzy"
+    # una coincidencia por categoría pesa menos que una por título
+    peso_categoria = 0.8
+
+    def filter_queryset(self, request, queryset, view):
+        q = (request.query_params.get(self.param) or "").strip()
+        if not q:
+            return queryset
+        por_articulo, por_categoria = trigramas.buscar(q)
+        if not por_articulo and not por_categoria:
+            return queryset.none()
+        sim_articulo = Case(*[When(id=pk, then=Value(sim)) for pk, sim in por_articulo.items()],
+                            default=Value(0.0), output_field=FloatField())
+        sim_categoria = Case(*[When(categoria_id=pk, then=Value(sim * self.peso_categoria))
+                               for pk, sim in por_categoria.items()],
+                             default=Value(0.0), output_field=FloatField())
+        return (queryset
+                .filter(Q(id__in=list(por_articulo)) | Q(categoria_id__in=list(por_categoria)))
+                .annotate(similitud=Greatest(sim_articulo, sim_categoria)))
+
+
+class ArticuloOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter que descarta los campos anotados que la consulta no trae
+    (?ordering=distancia sin ?lat=&lng=, por ejemplo) y que, sin ?ordering=,
+    ordena por relevancia o similitud cuando hay una búsqueda activa.
+    """
+    # anotación -> orden por defecto cuando está presente (None = sin defecto)
+    anotaciones = {"distancia": None, "relevancia": "relevancia", "similitud": "-similitud"}
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        validos = super().remove_invalid_fields(queryset, fields, view, request)
+        for anotacion in self.anotaciones:
+            if anotacion not in queryset.query.annotations:
+                validos = [f for f in validos if f.lstrip("-") != anotacion]
+        return validos
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param):
+            for anotacion, orden in self.anotaciones.items():
+                if orden and anotacion in queryset.query.annotations:
+                    return [orden]
+        return super().get_ordering(request, queryset, view)
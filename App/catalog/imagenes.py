@@ -0,0 +1,89 @@
+# App/catalog/imagenes.py
+"""
+Derivados de Imagen: variantes de ancho fijo en WebP y JPEG, sin EXIF,
+para que listados, carrito y chat no descarguen la foto original.
+
+Se guardan con el storage de la imagen (ContenidoStorage, ver
+common/almacenamiento.py), que los nombra por contenido:
+cas/ab/cd/<sha256>.<ext>. Sus rutas quedan en
+Imagen.derivados = {"320": {"webp": ..., "jpg": ...}, ...}. Dos fotos
+iguales comparten derivados, y cada referencia cuenta en common.Blob.
+"""
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image as PILImage, ImageOps
+
+from .models import Articulo
+
+logger = logging.getLogger(__name__)
+
+ANCHOS = (320, 640, 1280)
+FORMATOS = {"webp": "WEBP", "jpg": "JPEG"}
+CALIDAD = 80
+
+
+def _ruta(imagen, ancho, ext):
+    # nombre sugerido: ContenidoStorage solo conserva la extensión y guarda en
+    # cas/ab/cd/<sha256>.<ext>; los storages que no son por contenido lo usan tal cual
+    return f"articulos/derivados/{imagen.pk}/{ancho}.{ext}"
+
+
+def _anchos_para(ancho_original):
+    # no se amplía: anchos menores que el original, o el original si es más chico
+    anchos = [a for a in ANCHOS if a < ancho_original]
+    return anchos or [ancho_original]
+
+
+def _codificar(img, formato):
+    buf = BytesIO()
+    if formato == "JPEG" and img.mode != "RGB":
+        fondo = PILImage.new("RGB", img.size, (255, 255, 255))
+        fondo.paste(img, mask=img.getchannel("A") if "A" in img.getbands() else None)
+        img = fondo
+    # sin exif=...: Pillow no copia los metadatos (GPS, cámara) al derivado
+    img.save(buf, formato, quality=CALIDAD, optimize=True)
+    return ContentFile(buf.getvalue())
+
+
+def generar_derivados(imagen):
+    """
+    Genera (o regenera) los derivados de `imagen` y actualiza Imagen.derivados.
+    Devuelve el diccionario de rutas; {} si el archivo no es una imagen legible.
+    """
+    storage = imagen.imagen.storage
+    try:
+        with imagen.imagen.open("rb") as f:
+            original = PILImage.open(f)
+            original = ImageOps.exif_transpose(original)  # respeta la orientación de la cámara
+            if original.mode not in ("RGB", "RGBA"):
+                original = original.convert("RGBA" if "transparency" in original.info else "RGB")
+            original.load()
+    except (OSError, ValueError) as e:
+        logger.warning("No se pudieron generar derivados de %s: %s", imagen.pk, e)
+        return {}
+
+    borrar_derivados(imagen)
+    derivados = {}
+    for ancho in _anchos_para(original.width):
+        alto = max(1, round(original.height * ancho / original.width))
+        reducida = original.resize((ancho, alto), PILImage.LANCZOS)
+        for ext, formato in FORMATOS.items():
+            ruta = storage.save(_ruta(imagen, ancho, ext), _codificar(reducida, formato))
+            derivados.setdefault(str(ancho), {})[ext] = ruta
+
+    type(imagen).objects.filter(pk=imagen.pk).update(derivados=derivados)
+    # portada_srcset cambia: el ETag del detalle sale de Articulo.actualizado
+    Articulo.objects.filter(pk=imagen.articulo_id).update(actualizado=timezone.now())
+    imagen.derivados = derivados
+    return derivados
+
+
+def borrar_derivados(imagen):
+    """Suelta los derivados de `imagen`; en cas/ el archivo se borra cuando nadie más lo usa."""
+    storage = imagen.imagen.storage
+    for formatos in (imagen.derivados or {}).values():
+        for ruta in formatos.values():
+            storage.delete(ruta)
@@ -0,0 +1,42 @@
+# App/catalog/management/commands/exportar_catalogo.py
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import exportar
+
+
+class Command(BaseCommand):
+    help = ("Exporta el catálogo completo en NDJSON o CSV (mismos campos que GET /api/articulos/exportar/), "
+            "leyendo por lotes: la memoria no crece con el tamaño del catálogo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--formato", choices=sorted(exportar.FORMATOS), default="ndjson")
+        parser.add_argument("--gzip", action="store_true", help="Comprime la salida con gzip.")
+        parser.add_argument("--output", "-o", default="-", help="Archivo de salida ('-' = stdout).")
+        parser.add_argument("--chunk-size", type=int, default=exportar.CHUNK,
+                            help="Filas por lectura a la base de datos.")
+
+    def handle(self, *args, **opts):
+        if opts["chunk_size"] < 1:
+            raise CommandError("--chunk-size debe ser mayor que 0.")
+        bloques = exportar.generar(opts["formato"], chunk_size=opts["chunk_size"])
+        if opts["gzip"]:
+            bloques = exportar.gzip(bloques)
+
+        salida = opts["output"]
+        if salida == "-":
+            if opts["gzip"]:
+                destino = getattr(self.stdout, "buffer", None)  # stdout binario del proceso
+                if destino is None:
+                    raise CommandError("Con --gzip indica --output o redirige stdout a un archivo.")
+                for b in bloques:
+                    destino.write(b)
+            else:
+                for b in bloques:
+                    self.stdout.write(b, ending="")
+            return
+
+        modo, kwargs = ("wb", {}) if opts["gzip"] else ("w", {"encoding": "utf-8", "newline": ""})
+        with open(salida, modo, **kwargs) as f:
+            for b in bloques:
+                f.write(b)
+        self.stderr.write(self.style.SUCCESS(f"Catálogo exportado en {salida}"))
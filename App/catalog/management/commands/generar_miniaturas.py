@@ -0,0 +1,24 @@
+# App/catalog/management/commands/generar_miniaturas.py
+from django.core.management.base import BaseCommand
+from catalog.imagenes import generar_derivados
+from catalog.models import Imagen
+
+class Command(BaseCommand):
+    help = "Genera los derivados (320/640/1280 px, WebP y JPEG) de las imágenes que aún no los tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenera también las que ya tienen derivados.")
+        parser.add_argument("--batch-size", type=int, default=200, help="Filas leídas por consulta.")
+
+    def handle(self, *args, **opts):
+        qs = Imagen.objects.order_by("id")
+        if not opts["force"]:
+            qs = qs.filter(derivados={})
+        total = qs.count()
+        ok, fail = 0, 0
+        for img in qs.iterator(chunk_size=opts["batch_size"]):
+            if generar_derivados(img):
+                ok += 1
+            else:
+                fail += 1
+        self.stdout.write(self.style.SUCCESS(f"Listo. Total: {total}, generadas: {ok}, fallidas: {fail}"))
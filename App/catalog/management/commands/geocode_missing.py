@@ -1,28 +1,124 @@
 # App/catalog/management/commands/geocode_missing.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
 from catalog.models import Articulo
-from common.services.geocoding import geocode_address, GeocodingError
+from catalog.signals import articulos_actualizados_en_bloque
+from catalog.utils import clave_para
+from common.services import nominatim
+from common.services.geocoding import geocode_address, normalizar_consulta, GeocodingError
 
 class Command(BaseCommand):
-    help = "Geocodifica artículos sin lat/lng usando Nominatim."
+    help = ("Geocodifica artículos sin lat/lng usando Nominatim: una consulta por dirección distinta, "
+            "escrituras por lotes y reanudable desde un checkpoint.")
 
     def add_arguments(self, parser):
         parser.add_argument("--country", default="co", help="Filtro de país (country codes). Ej: co")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Hilos resolviendo direcciones a la vez (el límite de Nominatim es común a todos).")
+        parser.add_argument("--batch-size", type=int, default=500, help="Artículos por bulk_update.")
+        parser.add_argument("--checkpoint", default=".geocode_missing.json",
+                            help="Archivo con la última dirección escrita; se borra al terminar.")
+        parser.add_argument("--reset", action="store_true", help="Ignora el checkpoint y empieza desde el principio.")
+
+    # ---------- checkpoint ----------
+    def _leer_checkpoint(self, ruta, cc):
+        try:
+            with open(ruta) as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return datos.get("ultima") if datos.get("country") == cc else None
+
+    def _guardar_checkpoint(self, ruta, cc, ultima):
+        tmp = f"{ruta}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"country": cc, "ultima": ultima}, f)
+        os.replace(tmp, ruta)  # atómico: un corte no deja el archivo a medias
+
+    # ---------- geocodificación ----------
+    def _agrupar(self):
+        """{dirección normalizada: [(id, ubicacion)]} de los artículos pendientes."""
+        qs = (Articulo.objects.filter(lat__isnull=True, lng__isnull=True)
+              .exclude(ubicacion__isnull=True).exclude(ubicacion="")
+              .values_list("id", "ubicacion"))
+        grupos = {}
+        for pk, ubicacion in qs.iterator(chunk_size=2000):
+            grupos.setdefault(normalizar_consulta(ubicacion), []).append((pk, ubicacion))
+        return grupos
+
+    def _resolver(self, direccion, cc, en_hilo):
+        try:
+            return geocode_address(direccion, country_codes=cc)
+        except GeocodingError:
+            return None
+        finally:
+            if en_hilo:
+                connection.close()  # cada hilo abre su propia conexión
+
+    def _escribir(self, pendientes):
+        with transaction.atomic():
+            Articulo.objects.bulk_update(pendientes, ["lat", "lng", "celda", "ubicacion", "actualizado"],
+                                         batch_size=len(pendientes))
 
     def handle(self, *args, **opts):
         cc = opts["country"]
-        qs = Articulo.objects.filter(lat__isnull=True, lng__isnull=True).exclude(ubicacion__isnull=True).exclude(ubicacion="")
-        total = qs.count()
-        ok, fail = 0, 0
-        for art in qs.iterator():
-            try:
-                lat, lng, display = geocode_address(art.ubicacion, country_codes=cc)
-                art.lat = lat
-                art.lng = lng
-                if display and len(display) > len(art.ubicacion or ""):
-                    art.ubicacion = display
-                art.save(update_fields=["lat", "lng", "ubicacion"])
-                ok += 1
-            except GeocodingError:
-                fail += 1
-        self.stdout.write(self.style.SUCCESS(f"Listo. Total: {total}, geocodificados: {ok}, fallidos: {fail}"))
+        workers = max(1, opts["workers"])
+        lote = max(1, opts["batch_size"])
+        checkpoint = opts["checkpoint"]
+        max_ubicacion = Articulo._meta.get_field("ubicacion").max_length
+
+        grupos = self._agrupar()
+        claves = sorted(grupos)
+        ultima = None if opts["reset"] else self._leer_checkpoint(checkpoint, cc)
+        if ultima:
+            claves = [k for k in claves if k > ultima]
+            self.stdout.write(f"Reanudando después de «{ultima}».")
+        total = sum(len(grupos[k]) for k in claves)
+        self.stdout.write(f"{total} artículos, {len(claves)} direcciones distintas.")
+
+        direcciones = [grupos[k][0][1] for k in claves]
+        ok, fail, escritos = 0, 0, False
+        pendientes = []
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            resultados = (pool.map(lambda d: self._resolver(d, cc, True), direcciones) if pool
+                          else (self._resolver(d, cc, False) for d in direcciones))
+            # map conserva el orden, así el checkpoint siempre avanza
+            for clave, res in zip(claves, resultados):
+                if res is None:
+                    fail += len(grupos[clave])
+                else:
+                    lat, lng, display = round(res[0], 6), round(res[1], 6), res[2]
+                    for pk, ubicacion in grupos[clave]:
+                        if display and len(display) > len(ubicacion or ""):
+                            ubicacion = display[:max_ubicacion]
+                        pendientes.append(Articulo(id=pk, lat=lat, lng=lng, celda=clave_para(lat, lng),
+                                                   ubicacion=ubicacion, actualizado=timezone.now()))
+                    ok += len(grupos[clave])
+                if len(pendientes) >= lote:
+                    self._escribir(pendientes)
+                    self._guardar_checkpoint(checkpoint, cc, clave)
+                    escritos, pendientes = True, []
+                    self.stdout.write(f"  {ok + fail}/{total}")
+            if pendientes:
+                self._escribir(pendientes)
+                escritos = True
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            if escritos:
+                # bulk_update no emite señales: índice espacial y cachés a mano
+                articulos_actualizados_en_bloque()
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        stats = nominatim.cliente().estadisticas()
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo. Total: {total}, geocodificados: {ok}, fallidos: {fail}. "
+            f"Nominatim: {stats['llamadas']} llamadas, {stats['reintentos']} reintentos, "
+            f"{stats['espera_s']:.1f}s de espera por el límite."))
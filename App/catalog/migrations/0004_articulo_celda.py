@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+from catalog.utils import clave_para
+
+
+def rellenar_celdas(apps, schema_editor):
+    Articulo = apps.get_model("catalog", "Articulo")
+    pendientes = []
+    for art in Articulo.objects.exclude(lat__isnull=True).exclude(lng__isnull=True).iterator():
+        art.celda = clave_para(art.lat, art.lng)
+        pendientes.append(art)
+    Articulo.objects.bulk_update(pendientes, ["celda"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_articulo_lat_articulo_lng'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articulo',
+            name='celda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=24),
+        ),
+        migrations.RunPython(rellenar_celdas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Índice FTS5 de artículos (solo SQLite). El rowid de la tabla FTS se fija
+# en catalog_articulo_fts_map, porque el rowid implícito de catalog_articulo
+# (PK UUID) puede cambiar con un VACUUM. Los triggers mantienen ambos al día.
+CREAR = [
+    """CREATE TABLE IF NOT EXISTS catalog_articulo_fts_map (
+        rowid INTEGER PRIMARY KEY,
+        articulo_id char(32) NOT NULL UNIQUE
+    )""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS catalog_articulo_fts USING fts5(
+        titulo, descripcion, ubicacion,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS catalog_articulo_fts_ai AFTER INSERT ON catalog_articulo BEGIN
+        INSERT INTO catalog_articulo_fts_map (articulo_id) VALUES (new.id);
+        INSERT INTO catalog_articulo_fts (rowid, titulo, descripcion, ubicacion)
+        VALUES ((SELECT rowid FROM catalog_articulo_fts_map WHERE articulo_id = new.id),
+                new.titulo, new.descripcion, new.ubicacion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS catalog_articulo_fts_au
+    AFTER UPDATE OF titulo, descripcion, ubicacion ON catalog_articulo BEGIN
+        UPDATE catalog_articulo_fts
+           SET titulo = new.titulo, descripcion = new.descripcion, ubicacion = new.ubicacion
+         WHERE rowid = (SELECT rowid FROM catalog_articulo_fts_map WHERE articulo_id = new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS catalog_articulo_fts_ad AFTER DELETE ON catalog_articulo BEGIN
+        DELETE FROM catalog_articulo_fts
+         WHERE rowid = (SELECT rowid FROM catalog_articulo_fts_map WHERE articulo_id = old.id);
+        DELETE FROM catalog_articulo_fts_map WHERE articulo_id = old.id;
+    END""",
+    "INSERT INTO catalog_articulo_fts_map (articulo_id) SELECT id FROM catalog_articulo",
+    """INSERT INTO catalog_articulo_fts (rowid, titulo, descripcion, ubicacion)
+       SELECT m.rowid, a.titulo, a.descripcion, a.ubicacion
+         FROM catalog_articulo a JOIN catalog_articulo_fts_map m ON m.articulo_id = a.id""",
+]
+
+BORRAR = [
+    "DROP TRIGGER IF EXISTS catalog_articulo_fts_ai",
+    "DROP TRIGGER IF EXISTS catalog_articulo_fts_au",
+    "DROP TRIGGER IF EXISTS catalog_articulo_fts_ad",
+    "DROP TABLE IF EXISTS catalog_articulo_fts",
+    "DROP TABLE IF EXISTS catalog_articulo_fts_map",
+]
+
+
+def _ejecutar(sentencias):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return  # otros motores: ArticuloSearchFilter cae a LIKE
+        with schema_editor.connection.cursor() as cursor:
+            for sql in sentencias:
+                cursor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_articulo_celda'),
+    ]
+
+    operations = [
+        migrations.RunPython(_ejecutar(CREAR), _ejecutar(BORRAR)),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from catalog.trigramas import trigramas
+
+
+def indexar_existentes(apps, schema_editor):
+    Articulo = apps.get_model("catalog", "Articulo")
+    Categoria = apps.get_model("catalog", "Categoria")
+    Trigrama = apps.get_model("catalog", "Trigrama")
+    filas = []
+    for art in Articulo.objects.only("id", "titulo").iterator():
+        tris = trigramas(art.titulo)
+        filas.extend(Trigrama(trigrama=t, total=len(tris), articulo_id=art.id) for t in tris)
+    for cat in Categoria.objects.only("id", "nombre").iterator():
+        tris = trigramas(cat.nombre)
+        filas.extend(Trigrama(trigrama=t, total=len(tris), categoria_id=cat.id) for t in tris)
+    Trigrama.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_articulo_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trigrama',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(db_index=True, max_length=3)),
+                ('total', models.PositiveSmallIntegerField()),
+                ('articulo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='catalog.articulo')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='catalog.categoria')),
+            ],
+        ),
+        migrations.RunPython(indexar_existentes, migrations.RunPython.noop),
+    ]
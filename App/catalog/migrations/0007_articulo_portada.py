@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rellenar_portadas(apps, schema_editor):
+    Articulo = apps.get_model("catalog", "Articulo")
+    Imagen = apps.get_model("catalog", "Imagen")
+    primera = {}
+    for img_id, art_id in Imagen.objects.order_by("id").values_list("id", "articulo_id").iterator():
+        primera.setdefault(art_id, img_id)
+    pendientes = [Articulo(id=art_id, portada_id=img_id) for art_id, img_id in primera.items()]
+    Articulo.objects.bulk_update(pendientes, ["portada"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_trigrama'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articulo',
+            name='portada',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalog.imagen'),
+        ),
+        migrations.RunPython(rellenar_portadas, migrations.RunPython.noop),
+    ]
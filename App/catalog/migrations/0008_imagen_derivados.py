@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_articulo_portada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagen',
+            name='derivados',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:43
+
+from django.db import migrations, models
+
+
+def rellenar_rutas(apps, schema_editor):
+    Categoria = apps.get_model("catalog", "Categoria")
+    hijas = {}
+    for pk, parent_id in Categoria.objects.values_list("id", "parent_id").iterator():
+        hijas.setdefault(parent_id, []).append(pk)
+    pendientes = []
+    pila = [(pk, "", 0) for pk in hijas.get(None, [])]
+    while pila:
+        pk, base, prof = pila.pop()
+        ruta = f"{base}{pk.hex}/"
+        pendientes.append(Categoria(id=pk, ruta=ruta, profundidad=prof))
+        pila.extend((h, ruta, prof + 1) for h in hijas.get(pk, []))
+    Categoria.objects.bulk_update(pendientes, ["ruta", "profundidad"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_imagen_derivados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='profundidad',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='ruta',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=330),
+        ),
+        migrations.RunPython(rellenar_rutas, migrations.RunPython.noop),
+    ]
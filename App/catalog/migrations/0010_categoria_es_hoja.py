@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+def marcar_padres(apps, schema_editor):
+    Categoria = apps.get_model("catalog", "Categoria")
+    padres = Categoria.objects.filter(parent__isnull=False).values("parent_id")
+    Categoria.objects.filter(pk__in=padres).update(es_hoja=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_categoria_ruta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='es_hoja',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(marcar_padres, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_indices_articulo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagen',
+            name='sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:08
+
+import common.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_blob'),
+        ('catalog', '0012_imagen_sha256'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagen',
+            name='imagen',
+            field=models.ImageField(storage=common.almacenamiento.contenido, upload_to='articulos/'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:30
+
+from importlib import import_module
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+# En SQLite, AddField con default rehace catalog_articulo y se pierden los
+# triggers del índice FTS (0005); se vuelven a crear al final.
+fts = import_module("catalog.migrations.0005_articulo_fts")
+TRIGGERS = [sql for sql in fts.CREAR if sql.lstrip().startswith("CREATE TRIGGER")]
+
+
+def actualizado_desde_creado(apps, schema_editor):
+    Articulo = apps.get_model("catalog", "Articulo")
+    Articulo.objects.update(actualizado=F("creado"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_imagen_storage_contenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articulo',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fts._ejecutar(TRIGGERS), migrations.RunPython.noop),
+        migrations.RunPython(actualizado_desde_creado, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['actualizado', 'id'], name='articulo_actualizado_idx'),
+        ),
+        migrations.CreateModel(
+            name='ArticuloBorrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('articulo_id', models.UUIDField()),
+                ('borrado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['borrado', 'articulo_id'], name='articulo_borrado_idx')],
+            },
+        ),
+    ]
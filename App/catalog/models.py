@@ -1,28 +1,83 @@
 import uuid
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Concat, Substr
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.text import slugify
 from django.conf import settings
+from common.almacenamiento import contenido
 from common.enums import EstadoArticulo
+from .utils import clave_para
 
 class Categoria(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     nombre = models.CharField(max_length=100)
     parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.CASCADE, related_name="hijas")
     slug = models.SlugField(max_length=120, blank=True)
+    # Ruta materializada: ids (hex) de la raíz a este nodo, "<raiz>/<...>/<id>/".
+    # Los descendientes de X son los que tienen X.ruta como prefijo (ver subarbol).
+    ruta = models.CharField(max_length=330, blank=True, default="", db_index=True, editable=False)
+    profundidad = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Sin hijas; lo mantienen save() y la señal post_delete (ver recalcular_hojas)
+    es_hoja = models.BooleanField(default=True, editable=False)
 
     class Meta:
         unique_together = [("parent","nombre")]
 
+    def _ruta_nueva(self):
+        if self.parent_id is None:
+            return f"{self.id.hex}/", 0
+        padre = self.parent
+        return f"{padre.ruta}{self.id.hex}/", padre.profundidad + 1
+
+    def clean(self):
+        if self.parent_id and self.ruta and self.parent.ruta.startswith(self.ruta):
+            raise ValidationError({"parent": "Una categoría no puede colgar de sí misma ni de una descendiente."})
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base = f"{self.parent.slug}-{self.nombre}" if self.parent else self.nombre
             self.slug = slugify(base)
+        self.clean()
+        ruta_anterior, prof_anterior = self.ruta, self.profundidad
+        self.ruta, self.profundidad = self._ruta_nueva()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "parent" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "ruta", "profundidad"}
         super().save(*args, **kwargs)
+        if self.parent_id:
+            Categoria.objects.filter(pk=self.parent_id, es_hoja=True).update(es_hoja=False)
+            if self._meta.get_field("parent").is_cached(self):
+                self.parent.es_hoja = False
+        if ruta_anterior and ruta_anterior != self.ruta:
+            # el padre anterior es el penúltimo tramo de la ruta vieja
+            tramos = ruta_anterior.rstrip("/").split("/")
+            if len(tramos) > 1:
+                Categoria.recalcular_hojas([uuid.UUID(tramos[-2])])
+            # se movió: reescribe el prefijo de todo el subárbol en una sola consulta
+            (Categoria.objects.filter(Categoria.subarbol(ruta_anterior)).exclude(pk=self.pk)
+             .update(ruta=Concat(Value(self.ruta), Substr("ruta", len(ruta_anterior) + 1),
+                                 output_field=models.CharField()),
+                     profundidad=F("profundidad") + (self.profundidad - prof_anterior)))
 
-    @property
-    def es_hoja(self):
-        return not self.hijas.exists()
+    def descendientes(self, incluir_propia=True):
+        qs = Categoria.objects.filter(Categoria.subarbol(self.ruta))
+        return qs if incluir_propia else qs.exclude(pk=self.pk)
+
+    @staticmethod
+    def subarbol(ruta):
+        """
+        Q de las categorías cuya ruta empieza por `ruta`. Se expresa como rango
+        y no como startswith: el LIKE de SQLite no usa el índice de `ruta`.
+        Las rutas solo tienen hex y "/", todos menores que "~".
+        """
+        return Q(ruta__gte=ruta, ruta__lt=ruta + "~")
+
+    @classmethod
+    def recalcular_hojas(cls, pks):
+        hijas = cls.objects.filter(parent_id=OuterRef("pk"))
+        cls.objects.filter(pk__in=pks).update(es_hoja=~Exists(hijas))
 
     def __str__(self):
         return f"{self.parent} > {self.nombre}" if self.parent else self.nombre
@@ -39,13 +94,40 @@ class Articulo(models.Model):
     disponibilidad_global = models.BooleanField(default=True)
     ubicacion = models.CharField(max_length=140)
     creado = models.DateTimeField(auto_now_add=True)
+    # Último cambio (feed de aliados). Las escrituras sin save() (update,
+    # bulk_update) deben fijarlo a mano.
+    actualizado = models.DateTimeField(auto_now=True)
     lat = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, help_text="Latitud en grados decimales")
     lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, help_text="Longitud en grados decimales")
+    # Celda de la rejilla espacial (ver catalog.utils); se recalcula al guardar lat/lng
+    celda = models.CharField(max_length=24, blank=True, default="", db_index=True, editable=False)
+    # Imagen de portada desnormalizada (la mantiene catalog/signals.py)
+    portada = models.ForeignKey("Imagen", null=True, blank=True, on_delete=models.SET_NULL,
+                                related_name="+", editable=False)
+
+    class Meta:
+        indexes = [
+            # caja lat/lng de /cerca/ y ?radio_km= cuando no se usa la rejilla
+            models.Index(fields=["lat", "lng"], name="articulo_lat_lng_idx"),
+            # orden por defecto del listado y de la paginación por cursor
+            models.Index(fields=["-creado", "id"], name="articulo_creado_idx"),
+            # cursor (actualizado, id) del feed de cambios de /api/aliados/productos/
+            models.Index(fields=["actualizado", "id"], name="articulo_actualizado_idx"),
+        ]
 
     @property
     def has_coords(self) -> bool:
         return self.lat is not None and self.lng is not None
 
+    def save(self, *args, **kwargs):
+        self.celda = clave_para(self.lat, self.lng)
+        update_fields = kwargs.get("update_fields")
+        if update_fields:
+            # auto_now solo se escribe si está en update_fields: sin él el
+            # cambio no aparecería en el feed de aliados (catalog/feed.py)
+            extra = {"actualizado", "celda"} if {"lat", "lng"} & set(update_fields) else {"actualizado"}
+            kwargs["update_fields"] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
 
     def clean(self):
         if not self.categoria.es_hoja:
@@ -54,8 +136,54 @@ class Articulo(models.Model):
     def __str__(self):
         return self.titulo
 
+class ArticuloBorrado(models.Model):
+    """
+    Lápida de un artículo borrado, para que el feed de cambios de aliados
+    informe la baja (la fila de Articulo ya no existe). La crea catalog/signals.py.
+    """
+    articulo_id = models.UUIDField()
+    borrado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["borrado", "articulo_id"], name="articulo_borrado_idx")]
+
+    def __str__(self):
+        return f"{self.articulo_id} ({self.borrado:%Y-%m-%d %H:%M})"
+
+
 class Imagen(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     articulo = models.ForeignKey(Articulo, on_delete=models.CASCADE, related_name="imagenes")
-    imagen = models.ImageField(upload_to="articulos/")
+    imagen = models.ImageField(upload_to="articulos/", storage=contenido)
     descripcion = models.CharField(max_length=140, blank=True)
+    # SHA-256 del archivo original, calculado durante la subida (catalog/subidas.py)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    # {"320": {"webp": ruta, "jpg": ruta}, ...} (ver catalog/imagenes.py)
+    derivados = models.JSONField(default=dict, blank=True, editable=False)
+
+    def variantes(self, ext="webp"):
+        """[(ancho, url)] de los derivados en `ext`, de menor a mayor."""
+        storage = self.imagen.storage
+        return sorted((int(ancho), storage.url(formatos[ext]))
+                      for ancho, formatos in (self.derivados or {}).items() if ext in formatos)
+
+    def url_miniatura(self, ancho_max=640, ext="webp"):
+        """URL del derivado más ancho que no supere `ancho_max`; el original si no hay."""
+        candidatas = [url for ancho, url in self.variantes(ext) if ancho <= ancho_max]
+        if candidatas:
+            return candidatas[-1]
+        return self.imagen.url if self.imagen else None
+
+
+class Trigrama(models.Model):
+    """
+    Índice invertido de trigramas para la búsqueda tolerante a errores
+    (?q_fuzzy=). Cada fila liga un trigrama con el título de un artículo o
+    con el nombre de una categoría; `total` es el número de trigramas del
+    texto de origen y permite calcular la similitud sin releerlo.
+    Lo mantiene catalog/signals.py.
+    """
+    trigrama = models.CharField(max_length=3, db_index=True)
+    articulo = models.ForeignKey(Articulo, null=True, blank=True, on_delete=models.CASCADE, related_name="trigramas")
+    categoria = models.ForeignKey(Categoria, null=True, blank=True, on_delete=models.CASCADE, related_name="trigramas")
+    total = models.PositiveSmallIntegerField()
@@ -33,6 +33,8 @@ def productos_aliados(request):
         r = requests.get(url, timeout=6)
         r.raise_for_status()
         data = r.json()
+        if isinstance(data, dict):  # feed de cambios (?since=): {"results": [...], "next": ...}
+            data = [it for it in data.get("results", []) if not it.get("eliminado")]
 
         # Normalizamos y enriquecemos cada item
         for it in data:
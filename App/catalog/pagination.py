@@ -0,0 +1,93 @@
+# App/catalog/pagination.py
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from bisect import bisect_right
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ArticuloCursorPagination(CursorPagination):
+    """
+    Paginación keyset para el listado de artículos y `mine`: la posición se
+    guarda en el cursor (por defecto sobre -creado, id), así que la página
+    100 cuesta lo mismo que la primera. Respeta ?ordering=.
+    """
+    ordering = ("-creado", "id")
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class DistanciaCursorPagination(BasePagination):
+    """
+    Cursor por (distancia, id) para /api/articulos/cerca/.
+
+    Acepta un queryset anotado con "distancia", una lista de artículos con
+    atributo `distancia` o una lista de pares (distancia, pk), ya ordenados
+    por esa clave. Solo avanza (?cursor= del campo "next").
+    """
+    cursor_query_param = "cursor"
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        crudo = request.query_params.get(self.cursor_query_param)
+        if not crudo:
+            return None
+        try:
+            d, pk = json.loads(urlsafe_b64decode(crudo.encode()).decode())
+            return float(d), uuid.UUID(pk)
+        except (TypeError, ValueError):
+            raise NotFound("Cursor inválido.")
+
+    def encode_cursor(self, posicion):
+        d, pk = posicion
+        crudo = urlsafe_b64encode(json.dumps([d, str(pk)]).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, crudo)
+
+    @staticmethod
+    def _clave(item):
+        if isinstance(item, tuple):
+            return item
+        return item.distancia, item.pk
+
+    def paginate_queryset(self, datos, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if isinstance(datos, QuerySet):
+            if cursor:
+                d, pk = cursor
+                datos = datos.filter(Q(distancia__gt=d) | Q(distancia=d, id__gt=pk))
+            filas = list(datos.order_by("distancia", "id")[:size + 1])
+        else:
+            inicio = bisect_right(datos, cursor, key=self._clave) if cursor else 0
+            filas = datos[inicio:inicio + size + 1]
+
+        pagina = filas[:size]
+        self.siguiente = self._clave(pagina[-1]) if len(filas) > size else None
+        return pagina
+
+    def get_next_link(self):
+        return self.encode_cursor(self.siguiente) if self.siguiente else None
+
+    def get_paginated_response(self, data):
+        if isinstance(data, dict):
+            return Response({"next": self.get_next_link(), **data})
+        return Response({"next": self.get_next_link(), "results": data})
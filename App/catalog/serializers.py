@@ -2,10 +2,61 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from .models import Categoria, Articulo, Imagen
+from . import categorias
 
 User = get_user_model()
 
 
+# Campos dinámicos (?fields= / ?expand=)
+
+def lista_param(valor):
+    """
+    "id, titulo,,imagenes.url" -> ["id", "titulo", "imagenes.url"]; None si no vino.
+    """
+    if valor is None:
+        return None
+    return [v.strip() for v in valor.split(",") if v.strip()]
+
+
+class CamposDinamicosMixin:
+    """
+    Recorta la salida según el contexto "fields"/"expand" que arma la vista:
+      - fields: ["id", "titulo", "imagenes.url"]; la notación con punto
+        selecciona campos de un serializer anidado.
+      - expand: relaciones de `expandibles` a incluir; si viene (aunque sea
+        vacío) las que no estén listadas se omiten. Sin expand se incluyen todas.
+    """
+    expandibles = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos, expand = self.context.get("fields"), self.context.get("expand")
+        if campos is not None or expand is not None:
+            self.recortar(campos, expand)
+
+    def recortar(self, campos=None, expand=None):
+        sub = {}
+        for c in campos or ():
+            cabeza, _, resto = c.partition(".")
+            sub.setdefault(cabeza, [])
+            if resto:
+                sub[cabeza].append(resto)
+
+        for nombre in list(self.fields):
+            if campos and nombre not in sub:
+                self.fields.pop(nombre)
+            elif expand is not None and nombre in self.expandibles and nombre not in expand and nombre not in sub:
+                self.fields.pop(nombre)
+
+        for nombre, field in self.fields.items():
+            hijo = getattr(field, "child", field)
+            if isinstance(hijo, CamposDinamicosMixin):
+                sub_expand = None
+                if expand is not None:
+                    sub_expand = [e.partition(".")[2] for e in expand if e.startswith(nombre + ".")]
+                hijo.recortar(sub.get(nombre) or None, sub_expand)
+
+
 # Categorías
 
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -13,20 +64,37 @@ class CategoriaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Categoria
-        fields = ("id", "nombre", "slug", "parent", "hijas")
+        fields = ("id", "nombre", "slug", "parent", "profundidad", "es_hoja", "hijas")
 
     def get_hijas(self, obj):
-        return CategoriaSerializer(obj.hijas.all(), many=True).data
+        # subárbol tomado del árbol en caché: sin consultas por nodo
+        if "nodos_categoria" not in self.context:
+            self.context["nodos_categoria"] = categorias.por_id(categorias.obtener())
+        nodo = self.context["nodos_categoria"].get(str(obj.pk))
+        return nodo["hijas"] if nodo else []
 
 
 # Imágenes
 
-class ImagenSerializer(serializers.ModelSerializer):
+def srcset(obj, request, ext="webp"):
+    """
+    "https://.../320.webp 320w, https://.../640.webp 640w" para <img srcset>.
+    """
+    if not obj:
+        return ""
+    return ", ".join(f"{request.build_absolute_uri(url) if request else url} {ancho}w"
+                     for ancho, url in obj.variantes(ext))
+
+
+class ImagenSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    # derivados de ancho fijo (ver catalog/imagenes.py); vacío si aún no existen
+    srcset = serializers.SerializerMethodField()
+    srcset_jpg = serializers.SerializerMethodField()
 
     class Meta:
         model = Imagen
-        fields = ("id", "url", "descripcion")
+        fields = ("id", "url", "srcset", "srcset_jpg", "descripcion")
 
     def get_url(self, obj):
         if not obj.imagen:
@@ -35,10 +103,16 @@ class ImagenSerializer(serializers.ModelSerializer):
         url = obj.imagen.url
         return request.build_absolute_uri(url) if request else url
 
+    def get_srcset(self, obj):
+        return srcset(obj, self.context.get("request"))
+
+    def get_srcset_jpg(self, obj):
+        return srcset(obj, self.context.get("request"), "jpg")
+
 
 # Propietario (usuario básico)
 
-class UserBasicSerializer(serializers.ModelSerializer):
+class UserBasicSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Devuelve datos básicos del usuario. Intenta tomarlos del propio User
     o de un perfil relacionado (perfil/profile) si existe.
@@ -86,11 +160,16 @@ class UserBasicSerializer(serializers.ModelSerializer):
 
 # Artículos
 
-class ArticuloSerializer(serializers.ModelSerializer):
+class ArticuloSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    expandibles = ("imagenes", "propietario_info")
+
     imagenes = ImagenSerializer(many=True, read_only=True)
     portada = serializers.SerializerMethodField()
+    portada_srcset = serializers.SerializerMethodField()
     # Datos anidados del propietario
     propietario_info = UserBasicSerializer(source="propietario", read_only=True)
+    # Solo presente cuando la consulta trae origen (?lat=&lng= o /cerca/)
+    distancia = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Articulo
@@ -108,18 +187,23 @@ class ArticuloSerializer(serializers.ModelSerializer):
             "ubicacion",
             "creado",
             "portada",
+            "portada_srcset",
             "imagenes",
             "lat",
              "lng",
+            "distancia",
 
         )
         read_only_fields = ("propietario",)
 
     def get_portada(self, obj):
-        # Toma la primera imagen del artículo como portada
-        img = obj.imagenes.first()
+        # Portada desnormalizada en Articulo.portada (sin consulta extra con select_related)
+        img = obj.portada
         if not img or not img.imagen:
             return None
         request = self.context.get("request")
         url = img.imagen.url
         return request.build_absolute_uri(url) if request else url
+
+    def get_portada_srcset(self, obj):
+        return srcset(obj.portada, self.context.get("request"))
@@ -0,0 +1,154 @@
+# App/catalog/signals.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from django.dispatch import receiver
+
+from common import cache_respuestas, condicional, jobs
+from . import categorias, facetas, imagenes, spatial, trigramas
+from .models import Articulo, ArticuloBorrado, Categoria, Imagen
+
+
+@receiver(post_save, sender=Articulo)
+def articulo_guardado_indice(sender, instance, **kwargs):
+    transaction.on_commit(lambda: spatial.indice.actualizar(instance))
+
+
+@receiver(post_delete, sender=Articulo)
+def articulo_borrado_indice(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: spatial.indice.quitar(pk))
+
+
+@receiver(post_save, sender=Articulo)
+def articulo_guardado_trigramas(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or "titulo" in update_fields:
+        trigramas.indexar_articulo(instance)
+
+
+@receiver(post_save, sender=Categoria)
+def categoria_guardada_trigramas(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or "nombre" in update_fields:
+        trigramas.indexar_categoria(instance)
+
+
+@receiver([post_save, post_delete], sender=Articulo)
+@receiver([post_save, post_delete], sender=Categoria)
+def catalogo_cambiado_facetas(sender, **kwargs):
+    transaction.on_commit(facetas.invalidar)
+
+
+@receiver(post_delete, sender=Categoria)
+def categoria_borrada_hoja(sender, instance, **kwargs):
+    if instance.parent_id:
+        Categoria.recalcular_hojas([instance.parent_id])
+
+
+@receiver([post_save, post_delete], sender=Categoria)
+def categoria_cambiada_arbol(sender, **kwargs):
+    transaction.on_commit(categorias.invalidar)
+
+
+@receiver([post_save, post_delete], sender=Articulo)
+@receiver([post_save, post_delete], sender=Imagen)
+@receiver([post_save, post_delete], sender=Categoria)
+def catalogo_cambiado_marca(sender, **kwargs):
+    # invalida los ETag / Last-Modified de las vistas públicas del catálogo
+    transaction.on_commit(lambda: condicional.tocar("catalogo"))
+
+
+def _invalidar_respuestas(*grupos):
+    # ahora (para lecturas dentro de la misma transacción) y al confirmar, por si
+    # otra petición volvió a guardar la versión vieja entre tanto
+    cache_respuestas.invalidar(*grupos)
+    transaction.on_commit(lambda: cache_respuestas.invalidar(*grupos))
+
+
+@receiver([post_save, post_delete], sender=Articulo)
+@receiver([post_save, post_delete], sender=Imagen)
+def articulos_cambiados_respuestas(sender, **kwargs):
+    _invalidar_respuestas("articulos")
+
+
+@receiver([post_save, post_delete], sender=Categoria)
+def categorias_cambiadas_respuestas(sender, **kwargs):
+    # el listado de artículos filtra y muestra datos de la categoría
+    _invalidar_respuestas("categorias", "articulos")
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender="users.Profile")
+def propietario_cambiado(sender, update_fields=None, **kwargs):
+    # propietario_info sale de User/Profile; el login solo toca last_login
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(lambda: condicional.tocar("catalogo"))
+    _invalidar_respuestas("articulos")
+
+
+@receiver(post_save, sender=Imagen)
+def imagen_creada_portada(sender, instance, created, **kwargs):
+    # la primera imagen de un artículo pasa a ser su portada
+    if created:
+        Articulo.objects.filter(pk=instance.articulo_id, portada__isnull=True).update(portada=instance)
+
+
+@receiver(post_delete, sender=Articulo)
+def articulo_borrado_lapida(sender, instance, **kwargs):
+    # el feed de aliados informa la baja a partir de la lápida
+    ArticuloBorrado.objects.create(articulo_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Imagen)
+def imagen_cambiada_actualizado(sender, instance, **kwargs):
+    # las fotos (y la portada) son parte del artículo en el feed de aliados
+    Articulo.objects.filter(pk=instance.articulo_id).update(actualizado=timezone.now())
+
+
+@receiver(post_delete, sender=Imagen)
+def imagen_borrada_portada(sender, instance, **kwargs):
+    siguiente = Imagen.objects.filter(articulo_id=instance.articulo_id).order_by("id").first()
+    Articulo.objects.filter(pk=instance.articulo_id, portada__isnull=True).update(portada=siguiente)
+
+
+@receiver(post_save, sender=Imagen)
+def imagen_creada_derivados(sender, instance, created, **kwargs):
+    if created:
+        # Pillow fuera de la petición: lo hace run_workers
+        jobs.enqueue("catalog.generar_derivados", imagen_id=str(instance.pk))
+
+
+@receiver(post_delete, sender=Imagen)
+def imagen_borrada_derivados(sender, instance, **kwargs):
+    transaction.on_commit(lambda: imagenes.borrar_derivados(instance))
+
+
+def articulos_actualizados_en_bloque():
+    """
+    Para escrituras que no emiten señales (bulk_update, QuerySet.update):
+    recarga el índice espacial y descarta facetas, validadores y respuestas.
+    """
+    def invalidar():
+        spatial.indice.invalidar()
+        facetas.invalidar()
+        condicional.tocar("catalogo")
+    _invalidar_respuestas("articulos")
+    transaction.on_commit(invalidar)
+
+
+def imagenes_creadas_en_bloque(imagenes):
+    """
+    Lo que hacen las señales de Imagen para filas creadas con bulk_create:
+    portada de cada artículo que no tenga, fecha de actualización, derivados
+    en segundo plano y validadores / respuestas cacheadas del catálogo.
+    """
+    primeras = {}
+    for img in imagenes:
+        primeras.setdefault(img.articulo_id, img.pk)
+    for articulo_id, imagen_id in primeras.items():
+        Articulo.objects.filter(pk=articulo_id, portada__isnull=True).update(portada=imagen_id)
+    Articulo.objects.filter(pk__in=primeras).update(actualizado=timezone.now())
+    jobs.enqueue_many("catalog.generar_derivados", [{"imagen_id": str(img.pk)} for img in imagenes])
+    transaction.on_commit(lambda: condicional.tocar("catalogo"))
+    _invalidar_respuestas("articulos")
@@ -0,0 +1,263 @@
+# App/catalog/spatial.py
+"""
+Índice espacial en memoria (KD-tree) de los artículos geocodificados.
+
+Guarda una instantánea (id, lat, lng, categoria_id, precio_por_dia) y resuelve
+consultas por radio o k vecinos sin tocar la base de datos. Se activa con
+settings.CATALOG_INDICE_ESPACIAL; entonces CatalogConfig.ready() lo construye
+al arrancar (en un hilo, sin frenar el arranque) y las señales de Articulo
+lo mantienen al día (ver catalog/signals.py).
+
+Las señales solo llegan al proceso que hizo el cambio. Para que los demás
+workers no respondan con vecinos viejos, cada cambio incrementa una versión
+en el caché de Django (compartido con Redis/Memcached) y asegurar_cargado()
+recarga el índice cuando la versión avanzó por cambios de otro proceso. Con
+LocMem cada proceso ve solo sus propios cambios.
+
+Los puntos se proyectan a la esfera unitaria (x, y, z): la distancia euclídea
+(cuerda) crece igual que la distancia sobre la superficie, así que el árbol
+puede podar con la cuerda y convertir a km al final.
+"""
+import heapq
+import threading
+from math import radians, sin, cos, asin, pi
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+from .utils import R_TIERRA_KM
+
+CLAVE_VERSION = "catalog:indice-espacial:version"
+
+
+def habilitado():
+    return getattr(settings, "CATALOG_INDICE_ESPACIAL", False)
+
+
+def _version_compartida():
+    v = cache.get(CLAVE_VERSION)
+    if v is None:
+        cache.add(CLAVE_VERSION, 0, None)
+        v = cache.get(CLAVE_VERSION, 0)
+    return v
+
+
+def _publicar():
+    """Anuncia un cambio a los demás procesos; devuelve la nueva versión (o None)."""
+    if not habilitado():
+        return None
+    try:
+        return cache.incr(CLAVE_VERSION)
+    except ValueError:  # clave ausente (caché vaciado): los procesos recargan al ver 0
+        cache.add(CLAVE_VERSION, 0, None)
+        return None
+
+
+def _xyz(lat, lng):
+    la, ln = radians(float(lat)), radians(float(lng))
+    return (cos(la) * cos(ln), cos(la) * sin(ln), sin(la))
+
+
+def _cuerda_para_km(km):
+    # cuerda en la esfera unitaria para un arco de `km`
+    return 2 * sin(min(km / R_TIERRA_KM, pi) / 2)
+
+
+def _km_desde_cuerda2(c2):
+    return 2 * R_TIERRA_KM * asin(min(1.0, c2 ** 0.5 / 2))
+
+
+def _dist2(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class _Nodo:
+    __slots__ = ("punto", "pk", "eje", "izq", "der")
+
+    def __init__(self, punto, pk, eje, izq, der):
+        self.punto, self.pk, self.eje, self.izq, self.der = punto, pk, eje, izq, der
+
+
+def _construir(items, prof=0):
+    """items: lista de (xyz, pk). Divide por la mediana alternando ejes."""
+    if not items:
+        return None
+    eje = prof % 3
+    items.sort(key=lambda it: it[0][eje])
+    m = len(items) // 2
+    return _Nodo(items[m][0], items[m][1], eje,
+                 _construir(items[:m], prof + 1),
+                 _construir(items[m + 1:], prof + 1))
+
+
+class IndiceEspacial:
+    # reconstruye el árbol cuando los cambios pendientes superan esta fracción
+    UMBRAL_RECONSTRUIR = 0.1
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cargado = False
+        self._version = None      # versión compartida que refleja el índice
+        self._datos = {}          # pk -> (xyz, categoria_id, precio)
+        self._raiz = None
+        self._en_arbol = set()    # pks presentes en el árbol
+        self._anulados = set()    # pks del árbol borrados o movidos
+        self._pendientes = {}     # pk -> xyz, fuera del árbol (recorrido lineal)
+
+    # ---------- carga / mantenimiento ----------
+    def cargar(self):
+        from .models import Articulo
+        # se lee antes que las filas: un cambio durante la carga provoca otra
+        version = _version_compartida()
+        filas = (Articulo.objects
+                 .exclude(lat__isnull=True).exclude(lng__isnull=True)
+                 .values_list("id", "lat", "lng", "categoria_id", "precio_por_dia"))
+        datos = {pk: (_xyz(lat, lng), cat, precio) for pk, lat, lng, cat, precio in filas.iterator()}
+        with self._lock:
+            self._datos = datos
+            self._reconstruir()
+            self._cargado = True
+            self._version = version
+
+    def cargar_al_arrancar(self):
+        """Construye el índice en un hilo (desde CatalogConfig.ready)."""
+        def construir():
+            try:
+                self.cargar()
+            except DatabaseError:
+                pass  # sin tablas todavía (migrate): se construirá en la primera consulta
+            finally:
+                connection.close()
+        threading.Thread(target=construir, name="indice-espacial", daemon=True).start()
+
+    def asegurar_cargado(self):
+        vigente = self._cargado and self._version == _version_compartida()
+        if not vigente:
+            with self._lock:
+                if not (self._cargado and self._version == _version_compartida()):
+                    self.cargar()
+
+    def _seguir(self, version):
+        # los cambios propios aplicados en orden no obligan a recargar
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+
+    def invalidar(self):
+        """Descarta el índice aquí y en los demás procesos (escrituras sin señales)."""
+        _publicar()
+        with self._lock:
+            self._cargado = False
+            self._datos, self._raiz = {}, None
+            self._en_arbol, self._anulados, self._pendientes = set(), set(), {}
+
+    def _reconstruir(self):
+        self._raiz = _construir([(d[0], pk) for pk, d in self._datos.items()])
+        self._en_arbol = set(self._datos)
+        self._anulados, self._pendientes = set(), {}
+
+    def actualizar(self, articulo):
+        """Inserta o mueve un artículo (llamado desde post_save)."""
+        version = _publicar()
+        if not self._cargado:
+            return
+        pk = articulo.pk
+        with self._lock:
+            self._seguir(version)
+            if articulo.lat is None or articulo.lng is None:
+                self._quitar(pk)
+                return
+            xyz = _xyz(articulo.lat, articulo.lng)
+            anterior = self._datos.get(pk)
+            self._datos[pk] = (xyz, articulo.categoria_id, articulo.precio_por_dia)
+            if pk in self._en_arbol and anterior and anterior[0] == xyz:
+                return  # solo cambiaron atributos, el punto sigue en su sitio
+            if pk in self._en_arbol:
+                self._anulados.add(pk)
+            self._pendientes[pk] = xyz
+            self._quizas_reconstruir()
+
+    def quitar(self, pk):
+        """Elimina un artículo (llamado desde post_delete)."""
+        version = _publicar()
+        if not self._cargado:
+            return
+        with self._lock:
+            self._seguir(version)
+            self._quitar(pk)
+
+    def _quitar(self, pk):
+        self._datos.pop(pk, None)
+        self._pendientes.pop(pk, None)
+        if pk in self._en_arbol:
+            self._anulados.add(pk)
+        self._quizas_reconstruir()
+
+    def _quizas_reconstruir(self):
+        cambios = len(self._anulados) + len(self._pendientes)
+        if cambios > max(64, self.UMBRAL_RECONSTRUIR * len(self._datos)):
+            self._reconstruir()
+
+    # ---------- consultas ----------
+    def cercanos(self, lat, lng, radio_km=None, k=None, categorias=None, precio_min=None, precio_max=None):
+        """
+        [(distancia_km, pk)] ordenado por distancia. Con `radio_km` devuelve
+        todo lo que esté dentro; con `k` solo los k más cercanos (dentro del
+        radio si también se indica). `categorias` es un conjunto de ids.
+        """
+        self.asegurar_cargado()
+        q = _xyz(lat, lng)
+        limite2 = _cuerda_para_km(radio_km) ** 2 if radio_km is not None else float("inf")
+
+        def acepta(pk):
+            d = self._datos.get(pk)
+            if d is None:
+                return False
+            if categorias is not None and d[1] not in categorias:
+                return False
+            if precio_min is not None and d[2] < precio_min:
+                return False
+            if precio_max is not None and d[2] > precio_max:
+                return False
+            return True
+
+        # max-heap (por -dist2) de los mejores candidatos; sin k guarda todos
+        mejores = []
+
+        def considerar(d2, pk):
+            nonlocal limite2
+            if d2 > limite2 or not acepta(pk):
+                return
+            if k is None:
+                mejores.append((-d2, pk))
+                return
+            if len(mejores) < k:
+                heapq.heappush(mejores, (-d2, pk))
+            else:
+                heapq.heappushpop(mejores, (-d2, pk))
+            if len(mejores) == k:
+                limite2 = min(limite2, -mejores[0][0])
+
+        with self._lock:
+            pila = [(self._raiz, 0.0)] if self._raiz else []
+            while pila:
+                nodo, cota2 = pila.pop()
+                if cota2 > limite2:
+                    continue
+                if nodo.pk not in self._anulados:
+                    considerar(_dist2(q, nodo.punto), nodo.pk)
+                diff = q[nodo.eje] - nodo.punto[nodo.eje]
+                cerca_, lejos = (nodo.izq, nodo.der) if diff < 0 else (nodo.der, nodo.izq)
+                # lejos se apila primero para visitar antes el lado cercano
+                if lejos is not None:
+                    pila.append((lejos, max(cota2, diff * diff)))
+                if cerca_ is not None:
+                    pila.append((cerca_, cota2))
+            for pk, xyz in self._pendientes.items():
+                considerar(_dist2(q, xyz), pk)
+
+        res = sorted((-nd2, pk) for nd2, pk in mejores)
+        return [(_km_desde_cuerda2(d2), pk) for d2, pk in res]
+
+
+indice = IndiceEspacial()
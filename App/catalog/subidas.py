@@ -0,0 +1,64 @@
+# App/catalog/subidas.py
+"""
+Subida de fotos de artículos sin cargarlas en memoria.
+
+SubidaImagenesHandler reemplaza los upload handlers de Django en
+ArticuloViewSet.create:
+- cada archivo se escribe a un temporal en disco por trozos (sin la copia en
+  memoria de MemoryFileUploadHandler para archivos chicos);
+- el SHA-256 se calcula mientras se lee, sin releer el archivo;
+- los límites por archivo y por petición cortan el parseo en cuanto se
+  superan; si el Content-Length ya los supera, ni se empieza a leer.
+
+Tras el parseo, `handler.error` dice si hubo que cortar.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+MAX_ARCHIVO = getattr(settings, "CATALOG_SUBIDA_MAX_ARCHIVO", 10 * 1024 * 1024)
+MAX_TOTAL = getattr(settings, "CATALOG_SUBIDA_MAX_TOTAL", 50 * 1024 * 1024)
+# campos de texto y separadores multipart que acompañan a los archivos
+MARGEN_FORMULARIO = 64 * 1024
+
+
+class SubidaImagenesHandler(TemporaryFileUploadHandler):
+    def __init__(self, request=None, max_archivo=None, max_total=None):
+        super().__init__(request)
+        self.max_archivo = max_archivo or MAX_ARCHIVO
+        self.max_total = max_total or MAX_TOTAL
+        self.total = 0
+        self.error = None
+
+    def _cortar(self, error):
+        # MultiPartParser cierra (y así borra) el temporal y descarta el resto del cuerpo
+        self.error = error
+        raise StopUpload(connection_reset=False)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.max_total + MARGEN_FORMULARIO:
+            self.error = f"La subida supera el máximo de {self.max_total // (1024 * 1024)} MB."
+            return QueryDict(encoding=encoding), MultiValueDict()  # sin leer el cuerpo
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.tamano = 0
+        self.hash = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.tamano += len(raw_data)
+        self.total += len(raw_data)
+        if self.tamano > self.max_archivo:
+            self._cortar(f"«{self.file_name}» supera el máximo de {self.max_archivo // (1024 * 1024)} MB por foto.")
+        if self.total > self.max_total:
+            self._cortar(f"Las fotos superan el máximo de {self.max_total // (1024 * 1024)} MB en total.")
+        self.hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        archivo = super().file_complete(file_size)
+        archivo.sha256 = self.hash.hexdigest()
+        return archivo
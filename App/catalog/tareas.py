@@ -0,0 +1,43 @@
+# App/catalog/tareas.py
+"""Tareas en segundo plano del catálogo (ver common/jobs.py)."""
+from common.jobs import tarea
+from common.services.geocoding import geocode_address, GeocodingNoEncontrado
+
+from . import imagenes
+from .models import Articulo, Imagen
+
+
+@tarea("catalog.geocodificar_articulo")
+def geocodificar_articulo(articulo_id, ubicacion=None):
+    """
+    Fija lat/lng desde la dirección. Una dirección sin resultado termina la
+    tarea; los errores de red (GeocodingError) se reintentan.
+    """
+    art = Articulo.objects.filter(pk=articulo_id).first()
+    if art is None:
+        return
+    maximo = Articulo._meta.get_field("ubicacion").max_length
+    actual = (art.ubicacion or "").strip()
+    ubic = (ubicacion or actual).strip()
+    if not ubic or (ubicacion and ubic[:maximo] != actual[:maximo]):
+        return  # sin dirección, o la cambiaron después de encolar (hay otra tarea)
+    try:
+        lat, lng, display = geocode_address(ubic, country_codes="co")
+    except GeocodingNoEncontrado:
+        return
+    art.lat = round(float(lat), 6)
+    art.lng = round(float(lng), 6)
+    campos = ["lat", "lng"]
+    # display vacío = lo resolvió el nomenclátor local: se conserva la dirección del usuario
+    clean_display = str(display)[:maximo] if display else None
+    if clean_display and len(clean_display) > len(art.ubicacion or ""):
+        art.ubicacion = clean_display
+        campos.append("ubicacion")
+    art.save(update_fields=campos)
+
+
+@tarea("catalog.generar_derivados")
+def generar_derivados(imagen_id):
+    img = Imagen.objects.filter(pk=imagen_id).first()
+    if img is not None:
+        imagenes.generar_derivados(img)
@@ -1,4 +1,5 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from common import cache_respuestas
 from catalog.models import Categoria
 
 class CategoriaTests(TestCase):
@@ -16,3 +17,970 @@ class CategoriaTests(TestCase):
         """
         resp = self.client.get("/api/categorias/")
         self.assertEqual(resp.status_code, 200)
+
+
+class CercaTests(TestCase):
+    def setUp(self):
+        from users.models import User
+        from catalog.models import Articulo
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.cat = Categoria.objects.create(nombre="Taladros")
+        # Medellín centro y puntos a ~1 km, ~5 km y ~40 km
+        puntos = {"centro": (6.2442, -75.5812), "cerca": (6.2530, -75.5812),
+                  "medio": (6.2890, -75.5812), "lejos": (6.6000, -75.5812)}
+        self.arts = {}
+        for titulo, (lat, lng) in puntos.items():
+            self.arts[titulo] = Articulo.objects.create(
+                propietario=self.user, titulo=titulo, descripcion="-", categoria=self.cat,
+                precio_por_dia=10, ubicacion="Medellín", lat=lat, lng=lng,
+            )
+
+    def test_celda_se_actualiza_al_guardar_coords(self):
+        art = self.arts["centro"]
+        celda_original = art.celda
+        self.assertTrue(celda_original)
+        art.lat, art.lng = 4.7110, -74.0721
+        art.save(update_fields=["lat", "lng"])
+        art.refresh_from_db()
+        self.assertNotEqual(art.celda, celda_original)
+
+    def test_cerca_radio_ordena_por_distancia(self):
+        resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812, "radio_km": 10})
+        self.assertEqual(resp.status_code, 200)
+        titulos = [it["titulo"] for it in resp.json()["items"]]
+        self.assertEqual(titulos, ["centro", "cerca", "medio"])
+
+    def test_cerca_k_vecinos(self):
+        resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812, "k": 2})
+        self.assertEqual(resp.status_code, 200)
+        titulos = [it["titulo"] for it in resp.json()["items"]]
+        self.assertEqual(titulos, ["centro", "cerca"])
+
+        resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812, "k": 10})
+        self.assertEqual(len(resp.json()["items"]), 4)
+
+    def test_cerca_k_acotado_y_solo_carga_la_pagina(self):
+        from unittest import mock
+        from django.db.models import QuerySet
+        resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812, "k": 100000})
+        self.assertEqual(resp.json()["meta"]["k"], 100)
+        in_bulk = QuerySet.in_bulk
+        with mock.patch.object(QuerySet, "in_bulk", autospec=True, side_effect=in_bulk) as cargados:
+            resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812, "k": 4, "page_size": 2})
+        self.assertEqual([it["titulo"] for it in resp.json()["items"]], ["centro", "cerca"])
+        self.assertEqual([len(c.args[1]) for c in cargados.call_args_list], [2])
+        resp = self.client.get(resp.json()["next"])
+        self.assertEqual([it["titulo"] for it in resp.json()["items"]], ["medio", "lejos"])
+
+    def test_cerca_k_cerca_del_polo(self):
+        from catalog.models import Articulo
+        # al otro lado del polo: ~2 km en línea recta, 180° de longitud de diferencia
+        for titulo, lng in (("polo-a", 10), ("polo-b", -170)):
+            Articulo.objects.create(propietario=self.user, titulo=titulo, descripcion="-", categoria=self.cat,
+                                    precio_por_dia=10, lat=89.99, lng=lng)
+        resp = self.client.get("/api/articulos/cerca/", {"lat": 89.995, "lng": 0, "k": 3})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sorted(it["titulo"] for it in resp.json()["items"]), ["polo-a", "polo-b"])
+
+    def test_anillos_para_radio_polo_y_fuera_de_rango(self):
+        from catalog.utils import anillos_para_radio, caja_radio
+        self.assertEqual(anillos_para_radio(6.2442, -75.5812, 10), 5)
+        self.assertIsNone(anillos_para_radio(95, -75.5, 10))
+        self.assertIsNone(anillos_para_radio(89.995, 0, 10))
+        self.assertIsNone(anillos_para_radio(-89.995, 0, 10))
+        self.assertEqual(caja_radio(89.995, 0, 10)[2:], (None, None))
+        self.assertEqual(caja_radio(0, 179.99, 10)[2:], (None, None))  # cruza el antimeridiano
+
+    def test_cerca_radio_cerca_del_polo(self):
+        from catalog.models import Articulo
+        for titulo, lng in (("polo-a", 10), ("polo-b", -170)):
+            Articulo.objects.create(propietario=self.user, titulo=titulo, descripcion="-", categoria=self.cat,
+                                    precio_por_dia=10, lat=89.99, lng=lng)
+        resp = self.client.get("/api/articulos/cerca/", {"lat": 89.995, "lng": 0, "radio_km": 10})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sorted(it["titulo"] for it in resp.json()["items"]), ["polo-a", "polo-b"])
+
+    def test_cerca_cruza_el_antimeridiano(self):
+        from catalog.models import Articulo
+        from catalog.utils import anillos_para_radio
+        self.assertIsNone(anillos_para_radio(0, 179.99, 10))
+        Articulo.objects.create(propietario=self.user, titulo="fiyi", descripcion="-", categoria=self.cat,
+                                precio_por_dia=10, lat=-16.5, lng=-179.99)
+        for params in ({"radio_km": 10}, {"k": 1}):
+            resp = self.client.get("/api/articulos/cerca/", {"lat": -16.5, "lng": 179.99, **params})
+            self.assertEqual([it["titulo"] for it in resp.json()["items"]], ["fiyi"], params)
+
+    def test_cerca_filtra_por_categoria_arbol(self):
+        from catalog.models import Articulo
+        sub = Categoria.objects.create(nombre="Percutores", parent=self.cat)
+        otra = Categoria.objects.create(nombre="Jardín")
+        Articulo.objects.create(propietario=self.user, titulo="percutor", descripcion="-", categoria=sub,
+                                precio_por_dia=10, lat=6.2450, lng=-75.5812)
+        Articulo.objects.create(propietario=self.user, titulo="pala", descripcion="-", categoria=otra,
+                                precio_por_dia=10, lat=6.2443, lng=-75.5812)
+        for params in ({"radio_km": 10}, {"k": 2}):
+            resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812,
+                                                             "categoria_arbol": sub.slug, **params})
+            self.assertEqual([it["titulo"] for it in resp.json()["items"]], ["percutor"], params)
+            resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812,
+                                                             "categoria_arbol": self.cat.slug, **params})
+            self.assertNotIn("pala", [it["titulo"] for it in resp.json()["items"]], params)
+
+    def test_cerca_rechaza_coordenadas_fuera_de_rango(self):
+        for lat, lng in ((95, 0), (-90.5, 0), (0, 181), ("nan", 0)):
+            resp = self.client.get("/api/articulos/cerca/", {"lat": lat, "lng": lng, "k": 3})
+            self.assertEqual(resp.status_code, 400, (lat, lng))
+
+
+class HaversineBatchTests(TestCase):
+    def test_batch_coincide_con_haversine_km(self):
+        from unittest import mock
+        from decimal import Decimal
+        from catalog import utils
+        lats = [Decimal("6.244200"), 4.7110, 6.2530, 3.4516]
+        lngs = [Decimal("-75.581200"), -74.0721, -75.5812, -76.5320]
+        esperado = [utils.haversine_km(la, ln, 6.2442, -75.5812) for la, ln in zip(lats, lngs)]
+
+        for np_mod in (utils.np, None):
+            with mock.patch.object(utils, "np", np_mod):
+                idx, dist = utils.haversine_km_batch(lats, lngs, 6.2442, -75.5812)
+                self.assertEqual(idx, [0, 1, 2, 3])
+                for d, e in zip(dist, esperado):
+                    self.assertAlmostEqual(d, e, places=6)
+
+                idx, dist = utils.haversine_km_batch(lats, lngs, 6.2442, -75.5812, radio_km=300, ordenar=True)
+                self.assertEqual(idx, [0, 2, 1])
+
+
+class DistanciaSQLTests(TestCase):
+    setUp = CercaTests.setUp
+
+    def test_anotacion_coincide_con_haversine_km(self):
+        from unittest import mock
+        from catalog.db import Haversine
+        from catalog.models import Articulo
+        from catalog.utils import haversine_km
+        # SQLite usa la función registrada; el segundo pase fuerza la fórmula genérica
+        for as_sqlite in (Haversine.as_sqlite, Haversine.as_sql):
+            with mock.patch.object(Haversine, "as_sqlite", as_sqlite):
+                qs = Articulo.objects.annotate(distancia=Haversine("lat", "lng", 6.2442, -75.5812))
+                for art in qs:
+                    self.assertAlmostEqual(art.distancia, haversine_km(art.lat, art.lng, 6.2442, -75.5812), places=4)
+
+    def test_listado_ordena_y_filtra_por_distancia(self):
+        resp = self.client.get("/api/articulos/", {"lat": 6.2442, "lng": -75.5812,
+                                                  "ordering": "-distancia", "radio_km": 10})
+        self.assertEqual(resp.status_code, 200)
+        titulos = [it["titulo"] for it in resp.json()["results"]]
+        self.assertEqual(titulos, ["medio", "cerca", "centro"])
+        self.assertIn("distancia", resp.json()["results"][0])
+
+    def test_listado_radio_cruza_el_antimeridiano_y_el_polo(self):
+        from catalog.models import Articulo
+        for titulo, lat, lng in (("fiyi", -16.5, -179.99), ("polo", 89.99, -170)):
+            Articulo.objects.create(propietario=self.user, titulo=titulo, descripcion="-", categoria=self.cat,
+                                    precio_por_dia=10, lat=lat, lng=lng)
+        for titulo, lat, lng in (("fiyi", -16.5, 179.99), ("polo", 89.995, 10)):
+            resp = self.client.get("/api/articulos/", {"lat": lat, "lng": lng, "radio_km": 10})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual([it["titulo"] for it in resp.json()["results"]], [titulo])
+
+    def test_ordering_distancia_sin_origen_se_ignora(self):
+        resp = self.client.get("/api/articulos/", {"ordering": "distancia"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()["results"]), 4)
+        self.assertNotIn("distancia", resp.json()["results"][0])
+
+
+class IndiceEspacialTests(TestCase):
+    setUp_datos = CercaTests.setUp
+
+    def setUp(self):
+        from catalog import spatial
+        self.indice = spatial.indice
+        self.indice.invalidar()
+        self.addCleanup(self.indice.invalidar)
+        self.setUp_datos()
+
+    def test_k_vecinos_y_radio(self):
+        pares = self.indice.cercanos(6.2442, -75.5812, k=2)
+        self.assertEqual([pk for _, pk in pares], [self.arts["centro"].pk, self.arts["cerca"].pk])
+        pares = self.indice.cercanos(6.2442, -75.5812, radio_km=10)
+        self.assertEqual(len(pares), 3)
+        self.assertAlmostEqual(pares[1][0], 0.98, places=1)
+
+    def test_senales_actualizan_el_indice(self):
+        from catalog.models import Articulo
+        self.indice.asegurar_cargado()
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Articulo.objects.create(
+                propietario=self.user, titulo="nuevo", descripcion="-", categoria=self.cat,
+                precio_por_dia=5, ubicacion="Medellín", lat=6.2443, lng=-75.5812,
+            )
+        self.assertEqual(self.indice.cercanos(6.2443, -75.5812, k=1)[0][1], nuevo.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.delete()
+        self.assertEqual(self.indice.cercanos(6.2443, -75.5812, k=1)[0][1], self.arts["centro"].pk)
+
+    def test_cerca_usa_el_indice(self):
+        with self.settings(CATALOG_INDICE_ESPACIAL=True):
+            resp = self.client.get("/api/articulos/cerca/", {"lat": 6.2442, "lng": -75.5812, "radio_km": 10,
+                                                            "precio_max": 10})
+        self.assertEqual(resp.status_code, 200)
+        titulos = [it["titulo"] for it in resp.json()["items"]]
+        self.assertEqual(titulos, ["centro", "cerca", "medio"])
+
+    @override_settings(CATALOG_INDICE_ESPACIAL=True)
+    def test_otro_proceso_recarga_al_cambiar_la_version(self):
+        from unittest import mock
+        from catalog import spatial
+        from catalog.models import Articulo
+        # `otro` hace de índice de otro worker: no recibe las señales de este proceso
+        otro = spatial.IndiceEspacial()
+        otro.asegurar_cargado()
+        self.indice.asegurar_cargado()
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Articulo.objects.create(
+                propietario=self.user, titulo="nuevo", descripcion="-", categoria=self.cat,
+                precio_por_dia=5, ubicacion="Medellín", lat=6.2443, lng=-75.5812,
+            )
+        self.assertEqual(otro.cercanos(6.2443, -75.5812, k=1)[0][1], nuevo.pk)
+        # el proceso que hizo el cambio lo aplicó por señal y no necesita recargar
+        with mock.patch.object(self.indice, "cargar") as cargar:
+            self.assertEqual(self.indice.cercanos(6.2443, -75.5812, k=1)[0][1], nuevo.pk)
+        cargar.assert_not_called()
+
+
+class BusquedaFTSTests(TestCase):
+    def setUp(self):
+        from users.models import User
+        from catalog.models import Articulo
+        user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        cat = Categoria.objects.create(nombre="Herramientas")
+        datos = [("Taladro percutor", "Ideal para concreto", "Medellín"),
+                 ("Pulidora", "Incluye disco para taladrar no", "Bogotá"),
+                 ("Escalera", "Aluminio", "Envigado")]
+        for titulo, desc, ubic in datos:
+            Articulo.objects.create(propietario=user, titulo=titulo, descripcion=desc, categoria=cat,
+                                    precio_por_dia=10, ubicacion=ubic)
+
+    def _buscar(self, termino):
+        resp = self.client.get("/api/articulos/", {"search": termino})
+        self.assertEqual(resp.status_code, 200)
+        return [it["titulo"] for it in resp.json()["results"]]
+
+    def test_prefijo_y_ranking(self):
+        # el título pesa más que la descripción
+        self.assertEqual(self._buscar("tala"), ["Taladro percutor", "Pulidora"])
+
+    def test_sin_tildes_y_triggers(self):
+        from catalog.models import Articulo
+        self.assertEqual(self._buscar("medellin"), ["Taladro percutor"])
+        Articulo.objects.filter(titulo="Escalera").update(ubicacion="Medellín")
+        cache_respuestas.invalidar("articulos")  # update() no emite señales
+        self.assertEqual(len(self._buscar("medellin")), 2)
+        Articulo.objects.filter(titulo="Taladro percutor").delete()
+        self.assertEqual(self._buscar("medellin"), ["Escalera"])
+
+    def test_caracteres_especiales(self):
+        self.assertEqual(self._buscar('"*'), [])
+
+
+class BusquedaFuzzyTests(TestCase):
+    def setUp(self):
+        from users.models import User
+        from catalog.models import Articulo
+        user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        electricas = Categoria.objects.create(nombre="Eléctricas")
+        escaleras = Categoria.objects.create(nombre="Escaleras")
+        for titulo, cat in [("Taladro percutor", electricas), ("Pulidora angular", electricas),
+                            ("Escalera tijera", escaleras)]:
+            Articulo.objects.create(propietario=user, titulo=titulo, descripcion="-", categoria=cat,
+                                    precio_por_dia=10, ubicacion="Medellín")
+
+    def _buscar(self, q):
+        resp = self.client.get("/api/articulos/", {"q_fuzzy": q})
+        self.assertEqual(resp.status_code, 200)
+        return [it["titulo"] for it in resp.json()["results"]]
+
+    def test_tolera_errores_de_tipeo(self):
+        self.assertEqual(self._buscar("talador"), ["Taladro percutor"])
+        self.assertEqual(self._buscar("xyzw"), [])
+
+    def test_coincide_por_categoria(self):
+        self.assertEqual(sorted(self._buscar("electrica")), ["Pulidora angular", "Taladro percutor"])
+
+    def test_reindexa_al_cambiar_titulo(self):
+        from catalog.models import Articulo
+        art = Articulo.objects.get(titulo="Pulidora angular")
+        art.titulo = "Sierra circular"
+        art.save()
+        self.assertEqual(self._buscar("sierra"), ["Sierra circular"])
+
+
+class FacetasTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from users.models import User
+        from catalog.models import Articulo
+        cache.clear()
+        user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.taladros = Categoria.objects.create(nombre="Taladros")
+        escaleras = Categoria.objects.create(nombre="Escaleras")
+        for precio, estado, cat in [(15000, "NUEVO", self.taladros), (30000, "USADO", self.taladros),
+                                    (600000, "USADO", escaleras)]:
+            Articulo.objects.create(propietario=user, titulo="x", descripcion="-", categoria=cat,
+                                    estado=estado, precio_por_dia=precio, ubicacion="Medellín")
+
+    def test_conteos(self):
+        resp = self.client.get("/api/articulos/facetas/")
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(data["categoria"][0]["slug"], "taladros")
+        self.assertEqual(data["categoria"][0]["n"], 2)
+        self.assertEqual({e["valor"]: e["n"] for e in data["estado"]}, {"NUEVO": 1, "USADO": 2})
+        self.assertEqual([p["n"] for p in data["precio_por_dia"]], [1, 1, 0, 0, 0, 1])
+
+    def test_respeta_filtros_y_se_invalida(self):
+        from catalog.models import Articulo
+        with self.assertNumQueries(3):
+            data = self.client.get("/api/articulos/facetas/", {"estado": "USADO"}).json()
+        self.assertEqual(data["total"], 2)
+        # misma clave normalizada -> sale de caché
+        with self.assertNumQueries(0):
+            self.client.get("/api/articulos/facetas/", {"estado": "USADO", "ordering": "precio_por_dia"})
+        with self.captureOnCommitCallbacks(execute=True):
+            Articulo.objects.filter(estado="NUEVO").first().delete()
+        data = self.client.get("/api/articulos/facetas/", {"estado": "USADO"}).json()
+        self.assertEqual(data["total"], 2)
+        self.assertEqual(self.client.get("/api/articulos/facetas/").json()["total"], 2)
+
+
+class PaginacionCursorTests(TestCase):
+    setUp = CercaTests.setUp
+
+    def _recorrer(self, url, params, clave):
+        vistos, siguiente = [], None
+        while True:
+            resp = self.client.get(siguiente or url, None if siguiente else params)
+            self.assertEqual(resp.status_code, 200)
+            data = resp.json()
+            self.assertLessEqual(len(data[clave]), params["page_size"])
+            vistos.extend(it["titulo"] for it in data[clave])
+            siguiente = data["next"]
+            if not siguiente:
+                return vistos
+
+    def test_listado_keyset(self):
+        titulos = self._recorrer("/api/articulos/", {"page_size": 2}, "results")
+        self.assertEqual(titulos, ["lejos", "medio", "cerca", "centro"])
+
+    def test_cerca_cursor_por_distancia(self):
+        params = {"lat": 6.2442, "lng": -75.5812, "radio_km": 100, "page_size": 2}
+        self.assertEqual(self._recorrer("/api/articulos/cerca/", params, "items"),
+                         ["centro", "cerca", "medio", "lejos"])
+        params["k"] = 3
+        self.assertEqual(self._recorrer("/api/articulos/cerca/", params, "items"),
+                         ["centro", "cerca", "medio"])
+
+    def test_cerca_cursor_con_indice(self):
+        from catalog import spatial
+        spatial.indice.invalidar()
+        self.addCleanup(spatial.indice.invalidar)
+        params = {"lat": 6.2442, "lng": -75.5812, "radio_km": 100, "page_size": 3}
+        with self.settings(CATALOG_INDICE_ESPACIAL=True):
+            titulos = self._recorrer("/api/articulos/cerca/", params, "items")
+        self.assertEqual(titulos, ["centro", "cerca", "medio", "lejos"])
+
+    def test_busqueda_paginada_por_relevancia(self):
+        titulos = self._recorrer("/api/articulos/", {"search": "medellin", "page_size": 2}, "results")
+        self.assertEqual(sorted(titulos), ["centro", "cerca", "lejos", "medio"])
+
+
+class CamposDinamicosTests(TestCase):
+    def setUp(self):
+        from users.models import User
+        from catalog.models import Articulo, Imagen
+        cat = Categoria.objects.create(nombre="Taladros")
+        for i in range(3):
+            user = User.objects.create_user(username=f"dueno{i}", email=f"dueno{i}@test.co", password="12345")
+            art = Articulo.objects.create(propietario=user, titulo=f"art{i}", descripcion="-", categoria=cat,
+                                          precio_por_dia=10, ubicacion="Medellín")
+            Imagen.objects.create(articulo=art, imagen=f"articulos/{i}.webp")
+
+    def test_fields_y_campos_anidados(self):
+        resp = self.client.get("/api/articulos/", {"fields": "id,titulo,imagenes.url,propietario_info.nombre"})
+        item = resp.json()["results"][0]
+        self.assertEqual(set(item), {"id", "titulo", "imagenes", "propietario_info"})
+        self.assertEqual(set(item["imagenes"][0]), {"url"})
+        self.assertEqual(set(item["propietario_info"]), {"nombre"})
+
+    def test_expand_vacio_omite_relaciones_sin_consultas(self):
+        with self.assertNumQueries(2):  # validadores (GET condicional) + artículos
+            resp = self.client.get("/api/articulos/", {"fields": "id,titulo,precio_por_dia,lat,lng", "expand": ""})
+        self.assertEqual(set(resp.json()["results"][0]), {"id", "titulo", "precio_por_dia", "lat", "lng"})
+
+        resp = self.client.get("/api/articulos/", {"expand": "imagenes"})
+        item = resp.json()["results"][0]
+        self.assertIn("imagenes", item)
+        self.assertNotIn("propietario_info", item)
+
+
+class PortadaTests(TestCase):
+    def setUp(self):
+        from users.models import User
+        from catalog.models import Articulo
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.cat = Categoria.objects.create(nombre="Taladros")
+        self.art = Articulo.objects.create(propietario=self.user, titulo="t", descripcion="-", categoria=self.cat,
+                                           precio_por_dia=10, ubicacion="Medellín")
+
+    def test_portada_se_mantiene_al_crear_y_borrar(self):
+        from catalog.models import Imagen
+        primera = Imagen.objects.create(articulo=self.art, imagen="articulos/a.webp")
+        segunda = Imagen.objects.create(articulo=self.art, imagen="articulos/b.webp")
+        self.art.refresh_from_db()
+        self.assertEqual(self.art.portada_id, primera.pk)
+        primera.delete()
+        self.art.refresh_from_db()
+        self.assertEqual(self.art.portada_id, segunda.pk)
+        segunda.delete()
+        self.art.refresh_from_db()
+        self.assertIsNone(self.art.portada_id)
+
+    def test_listado_con_consultas_constantes(self):
+        from catalog.models import Articulo, Imagen
+        for i in range(10):
+            art = Articulo.objects.create(propietario=self.user, titulo=f"t{i}", descripcion="-",
+                                          categoria=self.cat, precio_por_dia=10, ubicacion="Medellín")
+            Imagen.objects.create(articulo=art, imagen=f"articulos/{i}.webp")
+        # validadores, artículos (+propietario, perfil, portada) e imágenes prefetch
+        with self.assertNumQueries(3):
+            resp = self.client.get("/api/articulos/")
+        self.assertTrue(resp.json()["results"][0]["portada"].endswith(".webp"))
+
+    def test_borrar_articulo_con_imagenes(self):
+        from catalog.models import Articulo, Imagen
+        Imagen.objects.create(articulo=self.art, imagen="articulos/a.webp")
+        self.art.delete()
+        self.assertFalse(Articulo.objects.exists())
+        self.assertFalse(Imagen.objects.exists())
+
+
+class DerivadosImagenTests(TestCase):
+    def setUp(self):
+        import shutil, tempfile
+        from django.test import override_settings
+        from users.models import User
+        from catalog.models import Articulo
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.art = Articulo.objects.create(propietario=self.user, titulo="t", descripcion="-",
+                                           categoria=Categoria.objects.create(nombre="Taladros"),
+                                           precio_por_dia=10, ubicacion="Medellín")
+
+    def _foto(self, ancho, alto):
+        from io import BytesIO
+        from PIL import Image as PILImage
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        buf = BytesIO()
+        exif = PILImage.Exif()
+        exif[0x010F] = "Camara"  # Make
+        PILImage.new("RGB", (ancho, alto), (200, 30, 30)).save(buf, "JPEG", exif=exif)
+        return SimpleUploadedFile("foto.jpg", buf.getvalue(), content_type="image/jpeg")
+
+    def test_genera_variantes_sin_exif_al_subir(self):
+        from PIL import Image as PILImage
+        from catalog.models import Imagen
+        from common import jobs
+        with self.captureOnCommitCallbacks(execute=True):
+            img = Imagen.objects.create(articulo=self.art, imagen=self._foto(1000, 500))
+        self.assertEqual(img.derivados, {})  # la petición solo encola
+        self.assertEqual(jobs.procesar(), 1)
+        img.refresh_from_db()
+        self.assertEqual(sorted(img.derivados, key=int), ["320", "640"])  # no amplía a 1280
+        self.assertEqual([a for a, _ in img.variantes("jpg")], [320, 640])
+        with img.imagen.storage.open(img.derivados["320"]["jpg"]) as f:
+            d = PILImage.open(f)
+            self.assertEqual(d.size, (320, 160))
+            self.assertEqual(len(d.getexif()), 0)
+        self.assertEqual(img.url_miniatura(400), img.variantes("webp")[0][1])
+        self.assertTrue(img.url_miniatura(400).endswith(".webp"))
+
+        resp = self.client.get("/api/articulos/")
+        fila = resp.json()["results"][0]
+        self.assertIn("640w", fila["portada_srcset"])
+
+    def test_archivo_invalido_no_rompe_la_subida(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from catalog.models import Imagen
+        from common import jobs
+        with self.captureOnCommitCallbacks(execute=True):
+            img = Imagen.objects.create(articulo=self.art, imagen=SimpleUploadedFile("x.jpg", b"no es imagen"))
+        jobs.procesar()
+        img.refresh_from_db()
+        self.assertEqual(img.derivados, {})
+        self.assertEqual(img.url_miniatura(), img.imagen.url)
+
+
+@override_settings(GEOCODING_PROVIDERS=["gazetteer"])
+class CrearArticuloTests(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from users.models import User
+        from common.services import geocoding
+        geocoding._lru.clear()
+        self.addCleanup(geocoding._lru.clear)
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.cat = Categoria.objects.create(nombre="Taladros")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_geocodifica_en_segundo_plano(self):
+        import shutil, tempfile
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from catalog.models import Articulo
+        from common import jobs
+        from common.models import Job
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with self.settings(MEDIA_ROOT=media):
+            resp = self.api.post("/api/articulos/", {
+                "titulo": "Taladro", "descripcion": "-", "categoria": self.cat.pk, "precio_por_dia": 10,
+                "ubicacion": "El Poblado, Medellín",
+                "imagenes": [SimpleUploadedFile("a.jpg", b"x", content_type="image/jpeg")],
+            }, format="multipart")
+            self.assertEqual(resp.status_code, 201, resp.content)
+            art = Articulo.objects.get()
+            self.assertIsNone(art.lat)
+            # geocodificación (prioridad 10) antes que los derivados de la imagen
+            self.assertEqual(list(Job.objects.order_by("-priority").values_list("name", flat=True)),
+                             ["catalog.geocodificar_articulo", "catalog.generar_derivados"])
+            self.assertEqual(jobs.procesar(), 2)
+        art.refresh_from_db()
+        self.assertAlmostEqual(float(art.lat), 6.2086)
+        self.assertEqual(art.ubicacion, "El Poblado, Medellín")  # el nomenclátor no reescribe la dirección
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def _publicar(self, fotos):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return self.api.post("/api/articulos/", {
+            "titulo": "Taladro", "descripcion": "-", "categoria": self.cat.pk, "precio_por_dia": 10,
+            "lat": "6.2", "lng": "-75.5",
+            "imagenes": [SimpleUploadedFile(f"{i}.jpg", datos, content_type="image/jpeg")
+                         for i, datos in enumerate(fotos)],
+        }, format="multipart")
+
+    def test_fotos_en_un_solo_insert_con_hash(self):
+        import hashlib, shutil, tempfile
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from catalog.models import Articulo, Imagen
+        from common.models import Job
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        fotos = [f"foto {i}".encode() * 100 for i in range(10)] + [b"foto 0" * 100]  # la última repetida
+        with self.settings(MEDIA_ROOT=media), CaptureQueriesContext(connection) as consultas:
+            resp = self._publicar(fotos)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        inserts = [q["sql"] for q in consultas if q["sql"].startswith('INSERT INTO "catalog_imagen"')]
+        self.assertEqual(len(inserts), 1)
+        art = Articulo.objects.get()
+        self.assertEqual(art.imagenes.count(), 10)
+        self.assertEqual(set(Imagen.objects.values_list("sha256", flat=True)),
+                         {hashlib.sha256(f).hexdigest() for f in fotos})
+        self.assertEqual(art.portada.sha256, hashlib.sha256(fotos[0]).hexdigest())
+        self.assertEqual(Job.objects.filter(name="catalog.generar_derivados").count(), 10)
+
+    def test_limites_de_tamano(self):
+        from unittest import mock
+        from catalog.models import Articulo
+        with mock.patch("catalog.subidas.MAX_ARCHIVO", 1000):
+            resp = self._publicar([b"x" * 500, b"y" * 1500])
+        self.assertEqual(resp.status_code, 413)
+        self.assertIn("1.jpg", resp.json()["detail"])
+        with mock.patch("catalog.subidas.MAX_TOTAL", 1000), mock.patch("catalog.subidas.MARGEN_FORMULARIO", 0):
+            resp = self._publicar([b"x" * 800, b"y" * 800])
+        self.assertEqual(resp.status_code, 413)
+        self.assertFalse(Articulo.objects.exists())
+
+    def test_ubicacion_cambiada_descarta_la_tarea_vieja(self):
+        from catalog.models import Articulo
+        from catalog.tareas import geocodificar_articulo
+        art = Articulo.objects.create(propietario=self.user, titulo="t", descripcion="-", categoria=self.cat,
+                                      precio_por_dia=10, ubicacion="Bogotá")
+        geocodificar_articulo(str(art.pk), ubicacion="Medellín")
+        art.refresh_from_db()
+        self.assertIsNone(art.lat)
+
+
+@override_settings(ALIADOS_FEED_MARGEN=0)
+class FeedAliadosTests(TestCase):
+    def setUp(self):
+        from users.models import User
+        from catalog.models import Articulo
+        user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        cat = Categoria.objects.create(nombre="Taladros")
+        self.arts = [Articulo.objects.create(propietario=user, titulo=f"Taladro {i}", descripcion="-",
+                                             categoria=cat, precio_por_dia=10) for i in range(3)]
+
+    def _feed(self, since="", **params):
+        resp = self.client.get("/api/aliados/productos/", {"since": since, **params})
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_sincroniza_solo_lo_cambiado(self):
+        datos = self._feed()
+        self.assertEqual([r["titulo"] for r in datos["results"]], ["Taladro 0", "Taladro 1", "Taladro 2"])
+        self.assertFalse(datos["has_more"])
+        cursor = datos["next"]
+        self.assertEqual(self._feed(cursor), {"results": [], "next": cursor, "has_more": False})
+
+        self.arts[0].titulo = "Taladro percutor"
+        self.arts[0].save()
+        borrado = self.arts[1].pk
+        self.arts[1].delete()
+        datos = self._feed(cursor)
+        self.assertEqual([(r["id"], r["eliminado"], r.get("titulo")) for r in datos["results"]],
+                         [(str(self.arts[0].pk), False, "Taladro percutor"), (str(borrado), True, None)])
+        self.assertEqual(self._feed(datos["next"])["results"], [])
+
+    def test_paginas_con_limit(self):
+        vistos, cursor = [], ""
+        for esperado in (True, False):
+            datos = self._feed(cursor, limit=2)
+            self.assertEqual(datos["has_more"], esperado)
+            vistos += [r["id"] for r in datos["results"]]
+            cursor = datos["next"]
+        self.assertEqual(vistos, [str(a.pk) for a in self.arts])
+
+    def test_guardar_con_update_fields_entra_al_feed(self):
+        from unittest import mock
+        from catalog import tareas
+        self.arts[2].ubicacion = "Bogotá"
+        self.arts[2].save()
+        cursor = self._feed()["next"]
+        self.arts[0].lat, self.arts[0].lng = 6.2442, -75.5812
+        self.arts[0].save(update_fields=["lat", "lng"])  # como _ensure_coords
+        with mock.patch.object(tareas, "geocode_address", return_value=(4.711, -74.0721, "Bogotá")):
+            tareas.geocodificar_articulo(str(self.arts[2].pk), "Bogotá")
+        self.arts[2].refresh_from_db()
+        self.assertIsNotNone(self.arts[2].lat)
+        ids = [r["id"] for r in self._feed(cursor)["results"]]
+        self.assertEqual(ids, [str(self.arts[0].pk), str(self.arts[2].pk)])
+
+    def test_margen_y_cursor_invalido(self):
+        with self.settings(ALIADOS_FEED_MARGEN=60):
+            self.assertEqual(self._feed()["results"], [])  # aún dentro del margen
+        self.assertEqual(self.client.get("/api/aliados/productos/?since=xyz").status_code, 404)
+        # sin `since`: la lista de siempre
+        self.assertEqual(len(self.client.get("/api/aliados/productos/").json()), 3)
+
+
+class ExportarCatalogoTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+        from users.models import User
+        from catalog.models import Articulo
+        cache.clear()  # historial del throttle
+        user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        cat = Categoria.objects.create(nombre="Taladros")
+        otra = Categoria.objects.create(nombre="Escaleras")
+        for i in range(5):
+            Articulo.objects.create(propietario=user, titulo=f"Taladro «{i}»", descripcion="con, comas\ny saltos",
+                                    categoria=cat if i < 3 else otra, precio_por_dia=10 + i)
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+
+    def _exportar(self, **params):
+        resp = self.api.get("/api/articulos/exportar/", params)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        return resp, b"".join(resp.streaming_content)
+
+    def test_ndjson_con_filtros(self):
+        import json
+        resp, cuerpo = self._exportar(categoria="taladros")
+        self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+        filas = [json.loads(l) for l in cuerpo.decode().splitlines()]
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0]["categoria_slug"], "taladros")
+        self.assertNotIn("propietario_id", filas[0])
+        self.assertEqual(filas, sorted(filas, key=lambda f: f["id"]))
+
+    def test_csv_gzip(self):
+        import csv
+        import gzip
+        from io import StringIO
+        resp, cuerpo = self._exportar(formato="csv", gzip="1")
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        self.assertIn("catalogo.csv.gz", resp["Content-Disposition"])
+        filas = list(csv.DictReader(StringIO(gzip.decompress(cuerpo).decode())))
+        self.assertEqual(len(filas), 5)
+        self.assertEqual(filas[0]["descripcion"], "con, comas\ny saltos")
+        self.assertEqual(self.api.get("/api/articulos/exportar/?formato=xml").status_code, 400)
+
+    def test_requiere_usuario_y_tiene_limite(self):
+        from unittest import mock
+        from rest_framework.throttling import ScopedRateThrottle
+        self.assertEqual(self.client.get("/api/articulos/exportar/").status_code, 401)
+        with mock.patch.dict(ScopedRateThrottle.THROTTLE_RATES, {"exportar": "1/hour"}):
+            self._exportar()
+            self.assertEqual(self.api.get("/api/articulos/exportar/").status_code, 429)
+
+    def test_comando(self):
+        import json
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        with tempfile.NamedTemporaryFile(suffix=".ndjson") as f:
+            call_command("exportar_catalogo", output=f.name, chunk_size=2, stderr=StringIO())
+            self.assertEqual(len([json.loads(l) for l in open(f.name, encoding="utf-8")]), 5)
+        salida = StringIO()
+        call_command("exportar_catalogo", formato="csv", stdout=salida)
+        self.assertEqual(salida.getvalue().splitlines()[0].split(",")[:2], ["id", "titulo"])
+
+
+class ArbolCategoriasTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.herr = Categoria.objects.create(nombre="Herramientas")
+        self.elec = Categoria.objects.create(nombre="Eléctricas", parent=self.herr)
+        self.tal = Categoria.objects.create(nombre="Taladros", parent=self.elec)
+        self.jardin = Categoria.objects.create(nombre="Jardín")
+
+    def test_ruta_y_profundidad(self):
+        self.assertEqual(self.tal.ruta, f"{self.herr.id.hex}/{self.elec.id.hex}/{self.tal.id.hex}/")
+        self.assertEqual(self.tal.profundidad, 2)
+        self.assertEqual(set(self.herr.descendientes()), {self.herr, self.elec, self.tal})
+
+    def test_mover_subarbol_reescribe_descendientes(self):
+        self.elec.parent = self.jardin
+        self.elec.save()
+        self.tal.refresh_from_db()
+        self.assertTrue(self.tal.ruta.startswith(self.jardin.ruta))
+        self.assertEqual(self.tal.profundidad, 2)
+        self.assertEqual(set(self.herr.descendientes()), {self.herr})
+
+    def test_no_permite_ciclos(self):
+        from django.core.exceptions import ValidationError
+        self.herr.parent = self.tal
+        with self.assertRaises(ValidationError):
+            self.herr.save()
+
+    def test_arbol_una_consulta_y_cache(self):
+        with self.assertNumQueries(2):  # conteo (validadores) + árbol
+            resp = self.client.get("/api/categorias/arbol/")
+        raices = resp.json()
+        self.assertEqual([c["nombre"] for c in raices], ["Herramientas", "Jardín"])
+        self.assertEqual(raices[0]["hijas"][0]["hijas"][0]["slug"], self.tal.slug)
+        with self.assertNumQueries(0):  # respuesta anónima en caché
+            self.client.get("/api/categorias/arbol/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre="Podadoras", parent=self.jardin)
+        raices = self.client.get("/api/categorias/arbol/").json()
+        self.assertEqual(raices[1]["hijas"][0]["nombre"], "Podadoras")
+
+    def test_listado_sin_consultas_por_nodo(self):
+        with self.assertNumQueries(3):  # conteo + categorías + árbol (en frío)
+            resp = self.client.get("/api/categorias/")
+        fila = next(c for c in resp.json() if c["id"] == str(self.herr.id))
+        self.assertEqual(fila["hijas"][0]["nombre"], "Eléctricas")
+
+
+class HojasCategoriaTests(TestCase):
+    def setUp(self):
+        from users.models import User
+        from catalog.models import Articulo
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.herr = Categoria.objects.create(nombre="Herramientas")
+        self.elec = Categoria.objects.create(nombre="Eléctricas", parent=self.herr)
+        self.tal = Categoria.objects.create(nombre="Taladros", parent=self.elec)
+        self.sierra = Categoria.objects.create(nombre="Sierras", parent=self.elec)
+        self.jardin = Categoria.objects.create(nombre="Jardín")
+        for cat in (self.tal, self.sierra, self.jardin):
+            Articulo.objects.create(propietario=self.user, titulo=cat.nombre, descripcion="-", categoria=cat,
+                                    precio_por_dia=10, ubicacion="Medellín")
+
+    def test_es_hoja_se_mantiene(self):
+        hojas = set(Categoria.objects.filter(es_hoja=True).values_list("nombre", flat=True))
+        self.assertEqual(hojas, {"Taladros", "Sierras", "Jardín"})
+        self.tal.parent = self.jardin
+        self.tal.save()
+        self.sierra.articulos.all().delete()
+        self.sierra.delete()
+        self.elec.refresh_from_db()
+        self.jardin.refresh_from_db()
+        self.assertTrue(self.elec.es_hoja)
+        self.assertFalse(self.jardin.es_hoja)
+
+    def test_filtro_categoria_arbol(self):
+        resp = self.client.get("/api/articulos/", {"categoria_arbol": self.herr.slug})
+        titulos = sorted(a["titulo"] for a in resp.json()["results"])
+        self.assertEqual(titulos, ["Sierras", "Taladros"])
+        resp = self.client.get("/api/articulos/", {"categoria_arbol": self.tal.slug})
+        self.assertEqual([a["titulo"] for a in resp.json()["results"]], ["Taladros"])
+        resp = self.client.get("/api/articulos/", {"categoria_arbol": "no-existe"})
+        self.assertEqual(resp.json()["results"], [])
+
+
+class GetCondicionalTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from users.models import User
+        from catalog.models import Articulo
+        cache.clear()
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.cat = Categoria.objects.create(nombre="Taladros")
+        self.art = Articulo.objects.create(propietario=self.user, titulo="Taladro", descripcion="-",
+                                           categoria=self.cat, precio_por_dia=10, ubicacion="Medellín")
+
+    def _revalidar(self, url, resp):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=resp["ETag"])
+
+    def test_listado_304_sin_serializar(self):
+        resp = self.client.get("/api/articulos/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("Last-Modified", resp)
+        from rest_framework.test import APIClient
+        autenticado = APIClient()
+        autenticado.force_authenticate(self.user)  # sin caché de respuestas
+        with self.assertNumQueries(1):  # solo el agregado conteo/máximo
+            r = autenticado.get("/api/articulos/", HTTP_IF_NONE_MATCH=resp["ETag"])
+            self.assertEqual(r.status_code, 304)
+        with self.assertNumQueries(0):  # anónimo: validadores guardados con la respuesta en caché
+            self.assertEqual(self._revalidar("/api/articulos/", resp).status_code, 304)
+        # otros filtros, otro recurso
+        self.assertEqual(self._revalidar("/api/articulos/?categoria=otra", resp).status_code, 200)
+
+    def test_listado_no_depende_de_la_marca_del_proceso(self):
+        from rest_framework.test import APIClient
+        autenticado = APIClient()
+        autenticado.force_authenticate(self.user)  # sin caché de respuestas
+        resp = autenticado.get("/api/articulos/")
+        # sin ejecutar on_commit: la marca no cambia, como en un worker que no hizo la edición
+        self.art.precio_por_dia = 20
+        self.art.save()
+        nueva = autenticado.get("/api/articulos/", HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(nueva.status_code, 200)
+        self.assertEqual(nueva.json()["results"][0]["precio_por_dia"], "20.00")
+        vacio = autenticado.get("/api/articulos/?categoria=otra")
+        self.assertEqual(vacio.status_code, 200)
+        self.assertEqual(autenticado.get("/api/articulos/?categoria=otra",
+                                         HTTP_IF_NONE_MATCH=vacio["ETag"]).status_code, 304)
+
+    def test_edicion_cambia_el_etag(self):
+        url = f"/api/articulos/{self.art.pk}/"
+        resp = self.client.get(url)
+        self.assertEqual(self._revalidar(url, resp).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.art.precio_por_dia = 20
+            self.art.save()
+        nueva = self._revalidar(url, resp)
+        self.assertEqual(nueva.status_code, 200)
+        self.assertEqual(nueva.json()["precio_por_dia"], "20.00")
+
+    def test_detalle_no_depende_de_la_marca_del_proceso(self):
+        url = f"/api/articulos/{self.art.pk}/"
+        resp = self.client.get(url)
+        # sin ejecutar on_commit: la marca no cambia, como en un worker que no hizo la edición
+        self.art.lat, self.art.lng = 6.2442, -75.5812
+        self.art.save(update_fields=["lat", "lng"])
+        nueva = self._revalidar(url, resp)
+        self.assertEqual(nueva.status_code, 200)
+        self.assertEqual(self._revalidar(url, nueva).status_code, 304)
+
+    def test_detalle_cambia_con_nombre_y_telefono_del_propietario(self):
+        url = f"/api/articulos/{self.art.pk}/"
+        for campo, valor in (("nombre", "Ana Pérez"), ("telefono", "3001234567")):
+            resp = self.client.get(url)
+            setattr(self.user, campo, valor)
+            self.user.save(update_fields=[campo])
+            nueva = self._revalidar(url, resp)
+            self.assertEqual(nueva.status_code, 200, campo)
+            self.assertEqual(nueva.json()["propietario_info"][campo], valor)
+
+    def test_detalle_inexistente_sigue_404(self):
+        import uuid
+        self.assertEqual(self.client.get(f"/api/articulos/{uuid.uuid4()}/").status_code, 404)
+
+    def test_categorias_304(self):
+        for url in ("/api/categorias/", "/api/categorias/arbol/"):
+            resp = self.client.get(url)
+            self.assertEqual(self._revalidar(url, resp).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre="Sierras")
+        self.assertEqual(self._revalidar(url, resp).status_code, 200)
+
+
+@override_settings(GEOCODING_PROVIDERS=["nominatim"])
+class GeocodeMissingTests(TestCase):
+    COORDS = {"medellin": [{"lat": "6.2442", "lon": "-75.5812", "display_name": "Medellín, Antioquia, Colombia"}],
+              "bogota": [{"lat": "4.7110", "lon": "-74.0721", "display_name": "Bogotá"}]}
+
+    def setUp(self):
+        import tempfile
+        from unittest import mock
+        from users.models import User
+        from catalog.models import Articulo
+        from common.services import geocoding
+        geocoding._lru.clear()
+        self.addCleanup(geocoding._lru.clear)
+        user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        cat = Categoria.objects.create(nombre="Taladros")
+        for ubic in ["Medellín", "medellin ", "MEDELLÍN", "Bogotá", "Bogota", "Ningún lugar"]:
+            Articulo.objects.create(propietario=user, titulo=ubic, descripcion="-", categoria=cat,
+                                    precio_por_dia=10, ubicacion=ubic)
+        self.checkpoint = tempfile.mktemp(suffix=".json")
+
+        def buscar(params):
+            from common.services.geocoding import normalizar_consulta
+            return self.COORDS.get(normalizar_consulta(params["q"]), [])
+        parche = mock.patch("common.services.nominatim.NominatimClient.buscar", side_effect=buscar)
+        self.buscar = parche.start()
+        self.addCleanup(parche.stop)
+
+    def _ejecutar(self, **opts):
+        from io import StringIO
+        from django.core.management import call_command
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("geocode_missing", checkpoint=self.checkpoint, stdout=StringIO(), **opts)
+
+    def test_una_consulta_por_direccion_y_lotes(self):
+        import os
+        from catalog.models import Articulo
+        from catalog.utils import clave_para
+        self._ejecutar(batch_size=2)
+        self.assertEqual(self.buscar.call_count, 3)  # medellin, bogota, ningun lugar
+        art = Articulo.objects.get(titulo="MEDELLÍN")
+        self.assertAlmostEqual(float(art.lat), 6.2442)
+        self.assertEqual(art.celda, clave_para(art.lat, art.lng))
+        self.assertEqual(art.ubicacion, "Medellín, Antioquia, Colombia")
+        self.assertEqual(Articulo.objects.filter(lat__isnull=True).count(), 1)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_reanuda_desde_el_checkpoint(self):
+        import json
+        from catalog.models import Articulo
+        with open(self.checkpoint, "w") as f:
+            json.dump({"country": "co", "ultima": "bogota"}, f)
+        self._ejecutar()
+        # solo las direcciones posteriores a "bogota"
+        self.assertEqual(Articulo.objects.filter(lat__isnull=False).count(), 3)
+        self.assertFalse(Articulo.objects.filter(titulo="Bogotá", lat__isnull=False).exists())
+
+    def test_actualiza_el_indice_espacial(self):
+        from catalog import spatial
+        spatial.indice.cargar()
+        self.addCleanup(spatial.indice.invalidar)
+        self.assertEqual(spatial.indice.cercanos(6.2442, -75.5812, radio_km=1), [])
+        self._ejecutar(workers=1)
+        self.assertEqual(len(spatial.indice.cercanos(6.2442, -75.5812, radio_km=1)), 3)
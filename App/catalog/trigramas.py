@@ -0,0 +1,75 @@
+# App/catalog/trigramas.py
+"""
+Búsqueda por similitud de trigramas (estilo pg_trgm) sobre Articulo.titulo
+y Categoria.nombre, apoyada en la tabla catalog_trigrama.
+"""
+import re
+import unicodedata
+
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast
+
+# similitud mínima (coeficiente de Jaccard entre conjuntos de trigramas)
+UMBRAL_SIMILITUD = 0.3
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto or "").lower()
+    return "".join(ch for ch in texto if not unicodedata.combining(ch))
+
+
+def trigramas(texto):
+    """
+    Conjunto de trigramas de un texto; cada palabra se rellena como en pg_trgm:
+    "taladro" -> {"  t", " ta", "tal", ..., "ro "}.
+    """
+    res = set()
+    for palabra in re.findall(r"\w+", normalizar(texto)):
+        p = f"  {palabra} "
+        res.update(p[i:i + 3] for i in range(len(p) - 2))
+    return res
+
+
+def _filas(texto, **destino):
+    from .models import Trigrama
+    tris = trigramas(texto)
+    return [Trigrama(trigrama=t, total=len(tris), **destino) for t in tris]
+
+
+def indexar_articulo(articulo):
+    from .models import Trigrama
+    Trigrama.objects.filter(articulo=articulo).delete()
+    Trigrama.objects.bulk_create(_filas(articulo.titulo, articulo=articulo))
+
+
+def indexar_categoria(categoria):
+    from .models import Trigrama
+    Trigrama.objects.filter(categoria=categoria).delete()
+    Trigrama.objects.bulk_create(_filas(categoria.nombre, categoria=categoria))
+
+
+def buscar(q, limite=200, umbral=UMBRAL_SIMILITUD):
+    """
+    Devuelve ({articulo_id: similitud}, {categoria_id: similitud}) con los
+    mejores candidatos. Solo recorre las listas de los trigramas de `q`
+    (índice por trigrama), no el catálogo completo.
+    """
+    from .models import Trigrama
+    tris = trigramas(q)
+    if not tris:
+        return {}, {}
+    n = len(tris)
+    filas = (Trigrama.objects
+             .filter(trigrama__in=tris)
+             .values("articulo_id", "categoria_id", "total")
+             .annotate(comunes=Count("id"))
+             .annotate(similitud=Cast(F("comunes"), FloatField()) / (n + F("total") - F("comunes")))
+             .filter(similitud__gte=umbral)
+             .order_by("-similitud")[:limite])
+    articulos, categorias = {}, {}
+    for f in filas:
+        if f["articulo_id"] is not None:
+            articulos[f["articulo_id"]] = f["similitud"]
+        else:
+            categorias[f["categoria_id"]] = f["similitud"]
+    return articulos, categorias
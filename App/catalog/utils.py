@@ -1,15 +1,174 @@
 # App/catalog/utils.py
-from math import radians, sin, cos, asin, sqrt
+from math import radians, sin, cos, asin, sqrt, floor, ceil
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: haversine_km_batch cae a Python puro
+    np = None
+
+R_TIERRA_KM = 6371.0
+KM_POR_GRADO = 111.195  # km por grado de latitud (R * pi / 180)
+
+# Tamaño (en grados) de cada celda de la rejilla espacial de artículos.
+# 0.02° ≈ 2.2 km de lado en latitud.
+CELDA_GRADOS = 0.02
+
 
 def haversine_km(lat1, lon1, lat2, lon2):
     """
     Distancia en km entre dos coordenadas en grados decimales.
     """
     lat1, lon1, lat2, lon2 = map(float, (lat1, lon1, lat2, lon2))
-    R = 6371.0
+    R = R_TIERRA_KM
     dlat = radians(lat2 - lat1)
     dlon = radians(lon2 - lon1)
     a = sin(dlat/2.0)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2.0)**2
     c = 2 * asin(sqrt(a))
     return R * c
 
+
+def haversine_km_batch(lats, lngs, lat0, lng0, radio_km=None, ordenar=False):
+    """
+    Distancias en km desde (lat0, lng0) a muchos puntos en una sola pasada.
+
+    Recibe secuencias paralelas `lats`/`lngs` (floats o Decimals) y devuelve
+    (indices, distancias): posiciones en la entrada y su distancia. Con
+    `radio_km` solo se devuelven los puntos dentro del radio; con `ordenar`
+    el resultado va de más cerca a más lejos.
+    """
+    lat0, lng0 = float(lat0), float(lng0)
+    if np is None:
+        dist = [haversine_km(la, ln, lat0, lng0) for la, ln in zip(lats, lngs)]
+        idx = [i for i, d in enumerate(dist) if radio_km is None or d <= radio_km]
+        if ordenar:
+            idx.sort(key=dist.__getitem__)
+        return idx, [dist[i] for i in idx]
+
+    la = np.radians(np.asarray(lats, dtype=float))
+    ln = np.radians(np.asarray(lngs, dtype=float))
+    la0, ln0 = radians(lat0), radians(lng0)
+    a = np.sin((la - la0) / 2.0) ** 2 + cos(la0) * np.cos(la) * np.sin((ln - ln0) / 2.0) ** 2
+    dist = 2 * R_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    idx = np.nonzero(dist <= radio_km)[0] if radio_km is not None else np.arange(dist.size)
+    if ordenar:
+        idx = idx[np.argsort(dist[idx], kind="stable")]
+    return idx.tolist(), dist[idx].tolist()
+
+
+# -------------------- Rejilla espacial --------------------
+def celda_de(lat, lng, tam=CELDA_GRADOS):
+    """
+    (fila, columna) de la celda de la rejilla que contiene la coordenada.
+    """
+    return floor(float(lat) / tam), floor(float(lng) / tam)
+
+
+def celda_clave(fila, col):
+    """
+    Clave persistida en Articulo.celda, ej: "312:-3782".
+    """
+    return f"{fila}:{col}"
+
+
+def clave_para(lat, lng):
+    """
+    Clave de celda para unas coordenadas, o "" si faltan.
+    """
+    if lat is None or lng is None:
+        return ""
+    return celda_clave(*celda_de(lat, lng))
+
+
+def anillo_celdas(fila, col, r):
+    """
+    Claves de las celdas a distancia de Chebyshev exactamente `r` de (fila, col).
+    """
+    if r == 0:
+        return [celda_clave(fila, col)]
+    claves = []
+    for dc in range(-r, r + 1):
+        claves.append(celda_clave(fila - r, col + dc))
+        claves.append(celda_clave(fila + r, col + dc))
+    for df in range(-r + 1, r):
+        claves.append(celda_clave(fila + df, col - r))
+        claves.append(celda_clave(fila + df, col + r))
+    return claves
+
+
+def distancia_min_fuera_km(lat, lng, r, tam=CELDA_GRADOS):
+    """
+    Cota inferior (km) de la distancia desde (lat, lng) a cualquier punto que
+    quede fuera del bloque formado por los anillos 0..r alrededor de su celda.
+    Todo artículo aún no visitado está al menos a esta distancia.
+    """
+    lat, lng = float(lat), float(lng)
+    fila, col = celda_de(lat, lng, tam)
+    lat_lo, lat_hi = (fila - r) * tam, (fila + r + 1) * tam
+    lng_lo, lng_hi = (col - r) * tam, (col + r + 1) * tam
+    d_lat = min(lat - lat_lo, lat_hi - lat) * KM_POR_GRADO
+    # Un grado de longitud se encoge con cos(lat); usamos la latitud más
+    # extrema del bloque para que la cota sea conservadora.
+    lat_ext = min(90.0, max(abs(lat_lo), abs(lat_hi)))
+    d_lng = min(lng - lng_lo, lng_hi - lng) * KM_POR_GRADO * cos(radians(lat_ext))
+    # pequeño margen por la aproximación plana
+    return max(0.0, min(d_lat, d_lng) * 0.99)
+
+
+def anillos_hasta_polo(lat, tam=CELDA_GRADOS):
+    """
+    Anillos que se pueden recorrer desde `lat` antes de que el bloque 0..r
+    toque un polo. A partir de ahí la cota de distancia_min_fuera_km deja de
+    crecer (un grado de longitud mide 0 km en el polo) y hay que pasar a la
+    caja lat/lng.
+    """
+    fila = floor(float(lat) / tam)
+    por_hemisferio = round(90 / tam)
+    return max(0, min(por_hemisferio - fila - 1, fila + por_hemisferio))
+
+
+def anillos_hasta_antimeridiano(lng, tam=CELDA_GRADOS):
+    """
+    Anillos que se pueden recorrer desde `lng` antes de que el bloque 0..r
+    cruce ±180°. Las columnas de la rejilla no dan la vuelta (la celda de
+    179.99 y la de -179.99 no son vecinas), así que a partir de ahí hay que
+    pasar a la caja lat/lng.
+    """
+    col = floor(float(lng) / tam)
+    por_lado = round(180 / tam)
+    return max(0, min(por_lado - col - 1, col + por_lado))
+
+
+def caja_radio(lat, lng, radio_km):
+    """
+    Caja (lat_min, lat_max, lng_min, lng_max) que contiene el círculo de
+    `radio_km` alrededor de (lat, lng). lng_min/lng_max son None cuando el
+    círculo alcanza un polo o cruza el antimeridiano: hay que mirar todas las
+    longitudes de la franja.
+    """
+    lat, lng = float(lat), float(lng)
+    d_lat = radio_km / KM_POR_GRADO
+    lat_lo, lat_hi = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    # el grado de longitud más corto de la franja, para no quedarse corto
+    c = cos(radians(max(abs(lat_lo), abs(lat_hi))))
+    if c <= 1e-9:
+        return lat_lo, lat_hi, None, None
+    d_lng = radio_km / (KM_POR_GRADO * c)
+    if lng - d_lng < -180 or lng + d_lng > 180:
+        return lat_lo, lat_hi, None, None
+    return lat_lo, lat_hi, lng - d_lng, lng + d_lng
+
+
+def anillos_para_radio(lat, lng, radio_km, tam=CELDA_GRADOS):
+    """
+    Menor número de anillos r tal que el bloque 0..r cubre todo el radio, o
+    None si antes de cubrirlo el bloque llega a un polo, cruza el
+    antimeridiano o supera 180° de latitud (ahí conviene la caja lat/lng,
+    ver caja_radio).
+    """
+    tope = min(anillos_hasta_polo(lat, tam), anillos_hasta_antimeridiano(lng, tam), ceil(180 / tam))
+    r = 0
+    while distancia_min_fuera_km(lat, lng, r, tam) < radio_km:
+        if r >= tope:
+            return None
+        r += 1
+    return r
@@ -1,31 +1,81 @@
-from django.db.models import Prefetch
+from django.db.models import Count, Max, Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework.views import APIView
 
 
-from rest_framework import viewsets, permissions, status, mixins, filters
+from rest_framework import viewsets, permissions, status, mixins
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
+from rest_framework.throttling import ScopedRateThrottle
+from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import Categoria, Articulo, Imagen
-from .serializers import CategoriaSerializer, ArticuloSerializer
-from .filters import ArticuloFilter
+from .serializers import CategoriaSerializer, ArticuloSerializer, lista_param
+from .pagination import ArticuloCursorPagination, DistanciaCursorPagination
+from .filters import ArticuloFilter, ArticuloOrderingFilter, ArticuloSearchFilter, ArticuloFuzzyFilter
+from .db import Haversine
+from . import exportar, feed, spatial
+from .signals import imagenes_creadas_en_bloque
+from .subidas import SubidaImagenesHandler
+from .facetas import obtener as obtener_facetas
+from .categorias import ids_subarbol, obtener as obtener_arbol
+
+from common import condicional, jobs
+from common.cache_respuestas import cacheada
 
 # Geocodificación y distancia
-from common.services.geocoding import geocode_city, geocode_address, GeocodingError
-from .utils import haversine_km
+from common.services.geocoding import geocode_city, GeocodingError
+from .utils import (haversine_km_batch, celda_de, anillo_celdas, anillos_para_radio,
+                    anillos_hasta_polo, anillos_hasta_antimeridiano, caja_radio,
+                    distancia_min_fuera_km)
+
+# Dominio de GET condicional del catálogo (lo marca catalog/signals.py)
+MARCA = "catalogo"
+# Columnas de las que sale el ETag del detalle (ver ArticuloViewSet.retrieve)
+CAMPOS_VALIDADOR_DETALLE = ("actualizado", "propietario__profile__updated_at", "propietario__username",
+                            "propietario__first_name", "propietario__last_name", "propietario__email",
+                            "propietario__nombre", "propietario__telefono")
+
+# Tope de radio para el modo ?k= cuando no se indica radio_km
+CERCA_RADIO_MAX_KM = 200.0
+# Máximo de celdas en un filtro celda__in; por encima se usa la caja lat/lng
+CERCA_MAX_CELDAS_FILTRO = 441
+# Máximo de anillos (una consulta cada uno) del modo ?k=; más allá se lee la caja lat/lng
+CERCA_MAX_ANILLOS = 50
+# Tope de ?k=: una página de resultados como máximo
+CERCA_MAX_K = DistanciaCursorPagination.max_page_size
 
 
 # -------------------- Categorías (solo lectura) --------------------
 class CategoriaViewSet(mixins.ListModelMixin,
                        mixins.RetrieveModelMixin,
                        viewsets.GenericViewSet):
-    queryset = Categoria.objects.all()
+    queryset = Categoria.objects.order_by("profundidad", "nombre")
     serializer_class = CategoriaSerializer
     permission_classes = [permissions.AllowAny]
 
+    def _validadores(self):
+        return condicional.validadores(MARCA, Categoria.objects.count())
+
+    @cacheada("categorias-list", "categorias")
+    def list(self, request, *args, **kwargs):
+        return condicional.responder(request, *self._validadores(),
+                                     lambda: super(CategoriaViewSet, self).list(request, *args, **kwargs))
+
+    @cacheada("categorias-detail", "categorias")
+    def retrieve(self, request, *args, **kwargs):
+        return condicional.responder(request, *self._validadores(),
+                                     lambda: super(CategoriaViewSet, self).retrieve(request, *args, **kwargs))
+
+    @action(detail=False, methods=["get"])
+    @cacheada("categorias-arbol", "categorias")
+    def arbol(self, request):
+        """Árbol completo (raíces con `hijas` anidadas), en caché."""
+        return condicional.responder(request, *self._validadores(), lambda: Response(obtener_arbol()))
+
 
 # -------------------- Permiso owner-or-readonly --------------------
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -39,11 +89,17 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
 class ArticuloViewSet(ModelViewSet):
     serializer_class = ArticuloSerializer
     filterset_class = ArticuloFilter
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ArticuloSearchFilter, ArticuloFuzzyFilter, ArticuloOrderingFilter]
+    # sin FTS5 (otros motores) ArticuloSearchFilter busca con LIKE en estos campos
     search_fields = ["titulo", "descripcion", "ubicacion"]
-    ordering_fields = ["creado", "precio_por_dia"]
-    ordering = ["-creado"]
+    # "distancia" solo está disponible con ?lat=&lng= (ver get_queryset);
+    # "relevancia" con ?search= y "similitud" con ?q_fuzzy= (ver filters.py)
+    ordering_fields = ["creado", "precio_por_dia", "distancia", "relevancia", "similitud"]
+    ordering = ["-creado", "id"]
+    pagination_class = ArticuloCursorPagination
     parser_classes = [JSONParser, MultiPartParser, FormParser]
+    # ScopedRateThrottle por acción (la fija @action, ver `exportar`)
+    throttle_scope = None
 
     # ---------- helpers ----------
     @staticmethod
@@ -80,30 +136,95 @@ class ArticuloViewSet(ModelViewSet):
             instance.save(update_fields=["lat", "lng"])
             return
 
-        # 2) Geocodificar por dirección si hay texto
+        # 2) Geocodificar por dirección si hay texto (en segundo plano: Nominatim puede tardar)
         ubic = (ubicacion_raw or instance.ubicacion or "").strip()
         if not ubic:
             return
-        try:
-            lat, lng, display = geocode_address(ubic, country_codes="co")
-            instance.lat = round(float(lat), 6)
-            instance.lng = round(float(lng), 6)
-            clean_display = self._clip(display, 140) if display else None
-            if clean_display and len(clean_display) > len(instance.ubicacion or ""):
-                instance.ubicacion = clean_display
-                instance.save(update_fields=["lat", "lng", "ubicacion"])
-            else:
-                instance.save(update_fields=["lat", "lng"])
-        except GeocodingError:
-            pass  # no interrumpe
+        jobs.enqueue("catalog.geocodificar_articulo", priority=10,
+                     articulo_id=str(instance.pk), ubicacion=ubic)
+
+    def _cercanos(self, qs, base_lat, base_lng, radio_km, k=None):
+        """
+        Recorre la rejilla de celdas (Articulo.celda) en anillos concéntricos
+        alrededor del origen. Se detiene cuando ninguna celda sin visitar puede
+        contener artículos dentro del radio o, en modo k, cuando ya hay k
+        artículos más cerca que cualquier celda pendiente.
+        Solo lee (id, lat, lng): la vista carga después los artículos de la
+        página que devuelve.
+        Si harían falta más de CERCA_MAX_ANILLOS anillos, o el bloque llega a
+        un polo (donde la cota ya no crece) o al antimeridiano (donde las
+        columnas no dan la vuelta), lee de una vez la caja lat/lng.
+        Devuelve [(distancia_km, id)] ordenado por distancia.
+        """
+        fila, col = celda_de(base_lat, base_lng)
+        tope = min(CERCA_MAX_ANILLOS, anillos_hasta_polo(base_lat), anillos_hasta_antimeridiano(base_lng))
+        ids, dists = [], []
+        r = 0
+        while True:
+            filas = list(qs.filter(celda__in=anillo_celdas(fila, col, r)).values_list("id", "lat", "lng"))
+            if filas:
+                idx, d = haversine_km_batch([f[1] for f in filas], [f[2] for f in filas],
+                                            base_lat, base_lng, radio_km=radio_km)
+                ids.extend(filas[i][0] for i in idx)
+                dists.extend(d)
+            cota = distancia_min_fuera_km(base_lat, base_lng, r)
+            if cota >= radio_km:
+                break
+            if k is not None and sum(1 for d in dists if d <= cota) >= k:
+                break
+            if r >= tope:
+                filas = list(self._en_caja(qs, base_lat, base_lng, radio_km).values_list("id", "lat", "lng"))
+                idx, dists = haversine_km_batch([f[1] for f in filas], [f[2] for f in filas],
+                                                base_lat, base_lng, radio_km=radio_km)
+                ids = [filas[i][0] for i in idx]
+                break
+            r += 1
+
+        pares = sorted(zip(dists, ids))
+        return pares[:k] if k is not None else pares
+
+    @staticmethod
+    def _en_caja(qs, base_lat, base_lng, radio_km):
+        lat_lo, lat_hi, lng_lo, lng_hi = caja_radio(base_lat, base_lng, radio_km)
+        qs = qs.filter(lat__gte=lat_lo, lat__lte=lat_hi)
+        if lng_lo is not None:
+            qs = qs.filter(lng__gte=lng_lo, lng__lte=lng_hi)
+        return qs
+
+    def _en_radio(self, qs, base_lat, base_lng, radio_km):
+        """
+        Queryset (anotado con distancia) de los artículos dentro del radio,
+        ordenado por distancia. Filtra primero por celdas o por caja lat/lng
+        para usar índices; el orden y LIMIT/OFFSET los resuelve la base de datos.
+        """
+        r = anillos_para_radio(base_lat, base_lng, radio_km)
+        if r is not None and (2 * r + 1) ** 2 <= CERCA_MAX_CELDAS_FILTRO:
+            fila, col = celda_de(base_lat, base_lng)
+            qs = qs.filter(celda__in=[c for i in range(r + 1) for c in anillo_celdas(fila, col, i)])
+        else:
+            qs = self._en_caja(qs, base_lat, base_lng, radio_km)
+        return qs.filter(distancia__lte=radio_km).order_by("distancia", "id")
 
     # ---------- acciones ----------
     @action(detail=False, methods=["get"], url_path="cerca", permission_classes=[permissions.AllowAny])
     def cerca(self, request):
+        k = request.query_params.get("k")
+        if k is not None:
+            try:
+                k = int(k)
+                if k < 1:
+                    raise ValueError
+            except ValueError:
+                return Response({"detail": "k inválido"}, status=status.HTTP_400_BAD_REQUEST)
+            k = min(k, CERCA_MAX_K)
+
+        # En modo k el radio es opcional (se acota a CERCA_RADIO_MAX_KM)
+        radio_default = CERCA_RADIO_MAX_KM if k is not None else 10
         try:
-            radio_km = float(request.query_params.get("radio_km", 10))
+            radio_km = float(request.query_params.get("radio_km", radio_default))
         except ValueError:
             return Response({"detail": "radio_km inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        radio_km = min(radio_km, CERCA_RADIO_MAX_KM)
 
         ciudad = request.query_params.get("ciudad")
         lat_param = request.query_params.get("lat")
@@ -119,41 +240,105 @@ class ArticuloViewSet(ModelViewSet):
                 base_lat, base_lng = float(lat_param), float(lng_param)
             except ValueError:
                 return Response({"detail": "lat/lng inválidos"}, status=status.HTTP_400_BAD_REQUEST)
+            if not (-90 <= base_lat <= 90 and -180 <= base_lng <= 180):
+                return Response({"detail": "lat debe estar entre -90 y 90 y lng entre -180 y 180"},
+                                status=status.HTTP_400_BAD_REQUEST)
         else:
             return Response({"detail": "Proporcione ?ciudad=... o ?lat=...&lng=..."}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs = (self.get_queryset()
-              .exclude(lat__isnull=True)
-              .exclude(lng__isnull=True))
-
-        deg = radio_km / 111.0
-        qs = qs.filter(lat__gte=base_lat - deg, lat__lte=base_lat + deg,
-                       lng__gte=base_lng - deg, lng__lte=base_lng + deg)
-
-        dentro = []
-        for art in qs:
-            d = haversine_km(float(art.lat), float(art.lng), base_lat, base_lng)
-            if d <= radio_km:
-                dentro.append((d, art))
-        dentro.sort(key=lambda t: t[0])
-        articulos_ordenados = [a for _, a in dentro]
+        precio_min = self._to_float_or_none(request.query_params.get("precio_min"))
+        precio_max = self._to_float_or_none(request.query_params.get("precio_max"))
+
+        self.origen = (base_lat, base_lng)
+        qs = self.get_queryset().exclude(celda="")
+        if precio_min is not None:
+            qs = qs.filter(precio_por_dia__gte=precio_min)
+        if precio_max is not None:
+            qs = qs.filter(precio_por_dia__lte=precio_max)
+        categorias = self._categorias_filtro()
+        if categorias is not None:
+            qs = qs.filter(categoria_id__in=categorias)
+
+        paginador = DistanciaCursorPagination()
+        if spatial.habilitado() or k is not None:
+            # índice en memoria o recorrido por anillos: (distancia, id) de todos
+            # los candidatos; solo los artículos de la página van a la BD
+            if spatial.habilitado():
+                pares = spatial.indice.cercanos(base_lat, base_lng, radio_km=radio_km, k=k,
+                                                categorias=categorias,
+                                                precio_min=precio_min, precio_max=precio_max)
+            else:
+                pares = self._cercanos(qs, base_lat, base_lng, radio_km, k=k)
+            pagina = paginador.paginate_queryset(pares, request, view=self)
+            por_id = qs.in_bulk([pk for _, pk in pagina])
+            articulos = []
+            for d, pk in pagina:
+                art = por_id.get(pk)
+                if art is not None:
+                    art.distancia = d
+                    articulos.append(art)
+        else:
+            articulos = paginador.paginate_queryset(self._en_radio(qs, base_lat, base_lng, radio_km),
+                                                    request, view=self)
 
-        page = self.paginate_queryset(articulos_ordenados)
-        serializer = self.get_serializer(page or articulos_ordenados, many=True)
+        serializer = self.get_serializer(articulos, many=True)
         body = serializer.data
         meta = {"origen": {"lat": base_lat, "lng": base_lng, "radio_km": radio_km},
                 "fuente_geocoding": "Nominatim (OpenStreetMap)",
                 "atribucion": "© OpenStreetMap contributors"}
-        if page is not None:
-            return self.get_paginated_response({"meta": meta, "items": body})
-        return Response({"meta": meta, "items": body})
+        if k is not None:
+            meta["k"] = k
+        return paginador.get_paginated_response({"meta": meta, "items": body})
 
     # ---------- queryset ----------
+    def _categorias_filtro(self):
+        """
+        Ids de la categoría pedida con ?categoria=<slug> y/o del subárbol de
+        ?categoria_arbol=<slug>, o None si no hay filtro.
+        """
+        ids = None
+        cat_slug = self.request.query_params.get("categoria")
+        if cat_slug:
+            ids = set(Categoria.objects.filter(slug=cat_slug).values_list("id", flat=True))
+        arbol_slug = self.request.query_params.get("categoria_arbol")
+        if arbol_slug:
+            subarbol = set(ids_subarbol(arbol_slug))
+            ids = subarbol if ids is None else ids & subarbol
+        return ids
+
+    def _origen(self):
+        """
+        Origen para la anotación "distancia": el fijado por `cerca` o ?lat=&lng=.
+        """
+        origen = getattr(self, "origen", None)
+        if origen:
+            return origen
+        lat = self._to_float_or_none(self.request.query_params.get("lat"))
+        lng = self._to_float_or_none(self.request.query_params.get("lng"))
+        if lat is None or lng is None:
+            return None
+        return lat, lng
+
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        # ?fields= / ?expand= solo aplican a lecturas (ver CamposDinamicosMixin)
+        if self.request.method == "GET":
+            ctx["fields"] = lista_param(self.request.query_params.get("fields"))
+            ctx["expand"] = lista_param(self.request.query_params.get("expand"))
+        return ctx
+
     def get_queryset(self):
-        qs = (Articulo.objects
-              .select_related("categoria", "propietario")
-              .prefetch_related(Prefetch("imagenes", queryset=Imagen.objects.order_by("id")))
-              .all())
+        # Solo se cargan las relaciones que el serializer (ya recortado) va a usar
+        campos = self.get_serializer().fields
+        qs = Articulo.objects.all()
+        if "propietario_info" in campos:
+            qs = qs.select_related("propietario", "propietario__profile")
+        if "portada" in campos or "portada_srcset" in campos:
+            qs = qs.select_related("portada")
+        if "imagenes" in campos:
+            qs = qs.prefetch_related(Prefetch("imagenes", queryset=Imagen.objects.order_by("id")))
+        if "descripcion" not in campos:
+            qs = qs.defer("descripcion")
 
         slug = self.request.query_params.get("slug")
         if slug:
@@ -163,10 +348,41 @@ class ArticuloViewSet(ModelViewSet):
         if cat_slug:
             qs = qs.filter(categoria__slug=cat_slug)
 
+        origen = self._origen()
+        if origen:
+            qs = qs.annotate(distancia=Haversine("lat", "lng", *origen))
+
         return qs
 
+    # ---------- GET condicional ----------
+    @cacheada("articulos-list", "articulos")
+    def list(self, request, *args, **kwargs):
+        # conteo y última edición (artículo o perfil del propietario) del listado
+        # ya filtrado, en una consulta agregada; como en retrieve, sin la marca
+        resumen = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            n=Count("id"), articulo=Max("actualizado"),
+            perfil=Max("propietario__profile__updated_at"))
+        ultimo = max(filter(None, (resumen["articulo"], resumen["perfil"])), default=None)
+        etag, modificado = condicional.validadores_de_fila(ultimo, resumen["n"])
+        return condicional.responder(request, etag, modificado,
+                                     lambda: super(ArticuloViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        # Solo estado guardado en la BD (no la marca del caché, que con LocMem
+        # es de cada proceso): `actualizado` cubre el artículo y sus fotos, y
+        # los datos del propietario que muestra propietario_info
+        fila = Articulo.objects.filter(pk=kwargs.get("pk")).values_list(*CAMPOS_VALIDADOR_DETALLE).first()
+        if fila is None:
+            return super().retrieve(request, *args, **kwargs)  # 404 de siempre
+        ultimo = max(filter(None, fila[:2]))  # el artículo o el perfil, lo más reciente
+        etag, modificado = condicional.validadores_de_fila(ultimo, kwargs.get("pk"), *fila)
+        return condicional.responder(request, etag, modificado,
+                                     lambda: super(ArticuloViewSet, self).retrieve(request, *args, **kwargs))
+
     # ---------- permisos ----------
     def get_permissions(self):
+        if self.action == "exportar":
+            return super().get_permissions()  # los de @action: exportar no es público
         if self.request.method in permissions.SAFE_METHODS:
             return [permissions.AllowAny()]
         if self.request.method == "POST":
@@ -186,7 +402,12 @@ class ArticuloViewSet(ModelViewSet):
         if not request.user or not request.user.is_authenticated:
             return Response({"detail": "No autenticado."}, status=status.HTTP_401_UNAUTHORIZED)
 
+        # antes de leer el cuerpo: fotos a disco por trozos, con límites y SHA-256
+        subida = SubidaImagenesHandler(request._request)
+        request._request.upload_handlers = [subida]
         files = request.FILES.getlist("imagenes")
+        if subida.error:
+            return Response({"detail": subida.error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
         if len(files) == 0 and not request.FILES.get("portada"):
             return Response({"detail": "Debes adjuntar al menos una foto."},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -232,11 +453,17 @@ class ArticuloViewSet(ModelViewSet):
             lng_raw=data.get("lng"),
         )
 
+        # un solo INSERT para todas las fotos; la misma foto repetida se guarda una vez
         portada = request.FILES.get("portada")
-        if portada:
-            Imagen.objects.create(articulo=articulo, imagen=portada)
-        for f in files:
-            Imagen.objects.create(articulo=articulo, imagen=f)
+        vistas, imagenes = set(), []
+        for f in ([portada] if portada else []) + files:
+            if f.sha256 in vistas:
+                continue
+            vistas.add(f.sha256)
+            imagenes.append(Imagen(articulo=articulo, imagen=f, sha256=f.sha256))
+        Imagen.objects.bulk_create(imagenes)
+        imagenes_creadas_en_bloque(imagenes)  # bulk_create no emite señales
+        articulo.refresh_from_db(fields=["portada"])
 
         headers = self.get_success_headers(ser.data)
         return Response(self.get_serializer(articulo).data,
@@ -262,7 +489,43 @@ class ArticuloViewSet(ModelViewSet):
         return resp
 
     # --------- auxiliares ---------
+    @action(detail=False, methods=["get"], url_path="facetas", permission_classes=[permissions.AllowAny])
+    def facetas(self, request):
+        """
+        GET /api/articulos/facetas/?<mismos filtros que el listado>
+        Conteos por categoría, estado y rango de precio en una sola respuesta.
+        """
+        qs = self.filter_queryset(self.get_queryset())
+        return Response(obtener_facetas(qs, request.query_params))
+
+    @action(detail=False, methods=["get"], url_path="exportar", permission_classes=[permissions.IsAuthenticated],
+            throttle_classes=[ScopedRateThrottle], throttle_scope="exportar")
+    def exportar(self, request):
+        """
+        GET /api/articulos/exportar/?formato=ndjson|csv&gzip=1&<filtros de ArticuloFilter>
+        Catálogo completo (campos públicos) por streaming, sin paginar ni cachear.
+        Recorre toda la tabla: solo usuarios autenticados y con el límite
+        "exportar" de DEFAULT_THROTTLE_RATES por usuario.
+        """
+        formato = request.query_params.get("formato", "ndjson")
+        if formato not in exportar.FORMATOS:
+            return Response({"detail": "formato debe ser ndjson o csv."}, status=status.HTTP_400_BAD_REQUEST)
+        filtro = ArticuloFilter(request.query_params, queryset=Articulo.objects.all(), request=request)
+        if not filtro.is_valid():
+            return Response(filtro.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type, ext = exportar.FORMATOS[formato]
+        bloques = exportar.generar(formato, filtro.qs)
+        comprimir = request.query_params.get("gzip") in ("1", "true")
+        if comprimir:
+            bloques, ext = exportar.gzip(bloques), f"{ext}.gz"
+        resp = StreamingHttpResponse(bloques, content_type="application/gzip" if comprimir else content_type)
+        resp["Content-Disposition"] = f'attachment; filename="catalogo.{ext}"'
+        resp["Cache-Control"] = "no-store"
+        return resp
+
     @action(detail=False, methods=["get"])
+    @cacheada("articulos-recent", "articulos")
     def recent(self, request):
         limit = int(request.query_params.get("limit", 6))
         qs = self.get_queryset().order_by("-creado")[:limit]
@@ -287,11 +550,58 @@ def articulo_detalle(request, id):
 # --- Servicio JSON para aliados ---
 class AliadosArticuloList(APIView):
     """
-    Servicio público de aliados: lista de artículos en formato JSON.
-    Devuelve campos estables y enlaces a detalle.
+    Servicio público de aliados.
+
+    GET /api/aliados/productos/?since=<cursor>&limit=<n>
+      Feed de cambios ordenado: altas/ediciones y bajas ("eliminado": true)
+      posteriores al cursor (vacío = desde el principio). "next" es el cursor
+      a guardar para la próxima sincronización; con "has_more" hay que
+      seguir pidiendo enseguida.
+    Sin `since` devuelve la lista anterior (los 50 más recientes, campos
+    mínimos). El feed no pasa por el caché de respuestas: cada aliado pide
+    su propio cursor y el margen de ALIADOS_FEED_MARGEN depende de la hora.
     """
     def get(self, request):
-        articulos = Articulo.objects.all()[:50]
+        if "since" not in request.query_params:
+            return self._lista(request)
+        base = request.build_absolute_uri("/")[:-1]  # quita la '/' final
+
+        try:
+            limite = min(max(int(request.query_params.get("limit", feed.LIMITE)), 1), feed.LIMITE_MAX)
+        except ValueError:
+            limite = feed.LIMITE
+        posicion = feed.decodificar(request.query_params.get("since"))
+        pagina, siguiente, hay_mas = feed.cambios(posicion, limite)
+
+        data = []
+        for fecha, pk, a in pagina:
+            item = {"id": pk, "actualizado": fecha, "eliminado": a is None}
+            if a is not None:
+                item.update({
+                    "titulo": a.titulo,
+                    "estado": a.estado,
+                    "precio_por_dia": a.precio_por_dia,
+                    "deposito": a.deposito,
+                    "disponible": a.disponibilidad_global,
+                    "ubicacion": a.ubicacion,
+                    "lat": a.lat,
+                    "lng": a.lng,
+                    "categoria": a.categoria_id,
+                    "imagen": request.build_absolute_uri(a.portada.url_miniatura()) if a.portada else None,
+                    "creado": a.creado,
+                    "detail_api": f"{base}/api/articulos/{pk}/",
+                    "detail_web": f"{base}/articulo/{pk}/",
+                })
+            data.append(item)
+        return Response({
+            "results": data,
+            "next": feed.codificar(siguiente) if siguiente else "",
+            "has_more": hay_mas,
+        }, status=status.HTTP_200_OK)
+
+    @cacheada("aliados-productos", "articulos")
+    def _lista(self, request):
+        articulos = Articulo.objects.order_by("-creado", "id")[:50]
         base = request.build_absolute_uri("/")[:-1]  # quita la '/' final
 
         data = []
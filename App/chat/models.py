@@ -57,6 +57,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["creado"]
+        indexes = [
+            # mensajes de una conversación en orden cronológico
+            models.Index(fields=["conversacion", "creado"], name="mensaje_conv_creado_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         # al guardar un mensaje, actualiza el "ultimo_mensaje_en"
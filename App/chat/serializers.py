@@ -51,19 +51,9 @@ class ConversationListSerializer(serializers.ModelSerializer):
             or getattr(a, "precio", None)
             or getattr(a, "costo", None)
         )
-        # Imagen principal (portada o la primera de 'imagenes')
-        portada = getattr(a, "portada", None)
-        img = None
-        if portada:
-            img = getattr(portada, "url", None) or portada
-        elif hasattr(a, "imagenes"):
-            try:
-                first = a.imagenes.first()
-                img = getattr(first, "archivo", None) or getattr(first, "imagen", None) or first
-                if hasattr(img, "url"):
-                    img = img.url
-            except Exception:
-                img = None
+        # Imagen principal (Articulo.portada, cargada con select_related)
+        portada = a.portada
+        img = portada.url_miniatura(320) if portada and portada.imagen else None
 
         return {
             "id": str(getattr(a, "id", "")),
@@ -34,7 +34,9 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        base = Conversation.objects.filter(participantes=user).distinct()
+        base = (Conversation.objects.filter(participantes=user).distinct()
+                .select_related("articulo", "articulo__portada")
+                .prefetch_related("participantes"))
         return base.order_by("-creado") if hasattr(Conversation, "creado") else base
 
     # ======================================================
@@ -1,3 +1,33 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import Blob, GeocodeCache, Job
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ("query", "country_codes", "found", "lat", "lng", "expires_at")
+    list_filter = ("found", "country_codes")
+    search_fields = ("query", "display_name")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "attempts", "max_attempts", "run_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "last_error")
+    readonly_fields = ("created_at", "finished_at", "locked_by", "locked_at", "last_error")
+    actions = ["reencolar"]
+
+    @admin.action(description="Reencolar (vuelve a intentarlas desde cero)")
+    def reencolar(self, request, queryset):
+        n = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING, attempts=0, run_at=timezone.now(), finished_at=None)
+        self.message_user(request, f"{n} tareas reencoladas.")
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "refs", "created_at")
+    search_fields = ("name",)
+    readonly_fields = ("name", "size", "refs", "created_at")
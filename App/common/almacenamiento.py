@@ -0,0 +1,116 @@
+# App/common/almacenamiento.py
+"""
+Almacenamiento de media por contenido para Imagen.imagen, sus derivados y
+Profile.foto_perfil.
+
+- El nombre sale del SHA-256 del archivo: cas/ab/cd/abcd...ef.jpg. Si ya
+  existe no se vuelve a escribir, así que la misma foto subida en varios
+  artículos ocupa disco una sola vez.
+- La tabla common.Blob cuenta las referencias: cada save() suma una y cada
+  delete() resta una; el archivo se borra cuando nadie lo usa.
+- Como el contenido de una URL no cambia nunca, se puede servir con caché
+  "immutable" de un año (ver servir_media y MEDIA_CAS_CACHE_CONTROL).
+
+Los archivos anteriores (articulos/..., profiles/...) conservan su nombre y
+se borran directamente. Si la transacción que guardó un archivo hace
+rollback, el archivo queda sin fila en Blob: `manage.py limpiar_blobs` los
+elimina.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.views.static import serve
+
+DIRECTORIO = getattr(settings, "MEDIA_CAS_DIRECTORIO", "cas")
+CACHE_CONTROL = getattr(settings, "MEDIA_CAS_CACHE_CONTROL", "public, max-age=31536000, immutable")
+EXTENSIONES = {".jpeg": ".jpg", ".jpe": ".jpg"}
+
+
+def es_blob(name):
+    return bool(name) and name.startswith(f"{DIRECTORIO}/")
+
+
+def _sha256(content):
+    # el handler de subida (catalog/subidas.py) ya lo calculó mientras leía
+    digest = getattr(content, "sha256", None)
+    if digest:
+        return digest
+    h = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        h.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    content.seek(0)
+    return h.hexdigest()
+
+
+class ContenidoStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # dos subidas simultáneas del mismo contenido escriben los mismos bytes
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def nombre_para(self, name, digest):
+        ext = os.path.splitext(name or "")[1].lower()
+        ext = EXTENSIONES.get(ext, ext)
+        return f"{DIRECTORIO}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def save(self, name, content, max_length=None):
+        from common.models import Blob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            from django.core.files import File
+            content = File(content, name)
+        name = self.nombre_para(name, _sha256(content))
+        if not self.exists(name):
+            name = self._save(name, content)
+
+        if not Blob.objects.filter(name=name).update(refs=F("refs") + 1):
+            try:
+                with transaction.atomic():
+                    Blob.objects.create(name=name, size=content.size or 0, refs=1)
+            except IntegrityError:  # otro proceso la creó entre el update y el create
+                Blob.objects.filter(name=name).update(refs=F("refs") + 1)
+        return name
+
+    def delete(self, name):
+        from common.models import Blob
+
+        if not es_blob(name):
+            return super().delete(name)
+        with transaction.atomic():
+            Blob.objects.filter(name=name).update(refs=F("refs") - 1)
+            borrados, _ = Blob.objects.filter(name=name, refs__lte=0).delete()
+        if borrados:
+            def borrar():
+                if not Blob.objects.filter(name=name).exists():  # nadie lo volvió a subir
+                    super(ContenidoStorage, self).delete(name)
+            transaction.on_commit(borrar)
+
+
+_storage = ContenidoStorage()
+
+
+def contenido():
+    """Storage de los campos de imagen (callable: las migraciones guardan la ruta)."""
+    return _storage
+
+
+def liberar(archivo):
+    """Suelta la referencia de un FieldFile (tras borrar la fila o cambiar el archivo)."""
+    if archivo and archivo.name:
+        archivo.storage.delete(archivo.name)
+
+
+def servir_media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve con caché de un año para los archivos por contenido."""
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if es_blob(path) and response.status_code == 200:
+        response["Cache-Control"] = CACHE_CONTROL
+    return response
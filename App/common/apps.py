@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'common'
+
+    def ready(self):
+        from . import jobs, signals
+        jobs.cargar_tareas()
+        # referencias de los archivos guardados por contenido
+        signals.conectar()
@@ -0,0 +1,117 @@
+# App/common/cache_respuestas.py
+"""
+Caché de respuestas para lecturas anónimas (listado de artículos, `recent`,
+categorías, servicio de aliados): el resultado es igual para todos los
+visitantes, así que se guarda `response.data` y se evita el ORM y el
+serializer en las siguientes peticiones.
+
+Clave: ruta + parámetros normalizados + idioma + versión de cada grupo del
+que depende la vista. Las señales suben la versión del grupo al guardar o
+borrar (ver catalog/signals.py), con lo que las entradas viejas dejan de
+leerse sin tener que buscarlas. Los usuarios autenticados no usan el caché.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+ALIAS = getattr(settings, "CACHE_RESPUESTAS_ALIAS", "default")
+TTL = getattr(settings, "CACHE_RESPUESTAS_TTL", 60 * 5)
+
+# Cabeceras que se guardan junto a los datos (validadores del GET condicional)
+CABECERAS = ("ETag", "Last-Modified", "Cache-Control")
+
+# nombres de las vistas cacheadas, para estadisticas()
+_vistas = set()
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def _version(grupo):
+    return _cache().get(f"respuestas:version:{grupo}", 0)
+
+
+def invalidar(*grupos):
+    """Descarta las respuestas que dependen de `grupos`."""
+    c = _cache()
+    for grupo in grupos:
+        try:
+            c.incr(f"respuestas:version:{grupo}")
+        except ValueError:
+            c.set(f"respuestas:version:{grupo}", 1, None)
+
+
+def clave(request, grupos):
+    partes = [request.path]
+    for k in sorted(request.query_params.keys()):
+        valores = sorted(v.strip() for v in request.query_params.getlist(k) if v.strip())
+        if valores:
+            partes.append(f"{k}={','.join(valores)}")
+    partes.append(get_language() or "")
+    partes.extend(f"{g}:{_version(g)}" for g in grupos)
+    return "respuestas:" + hashlib.sha1("&".join(partes).encode()).hexdigest()
+
+
+def _contar(vista, resultado):
+    c, k = _cache(), f"respuestas:stats:{vista}:{resultado}"
+    if not c.add(k, 1, None):
+        try:
+            c.incr(k)
+        except ValueError:
+            c.set(k, 1, None)
+
+
+def estadisticas():
+    """{vista: {"hits", "misses", "ratio"}} más el total."""
+    c = _cache()
+    datos, total = {}, {"hits": 0, "misses": 0}
+    for vista in sorted(_vistas):
+        fila = {r: c.get(f"respuestas:stats:{vista}:{r}", 0) for r in ("hits", "misses")}
+        total["hits"] += fila["hits"]
+        total["misses"] += fila["misses"]
+        datos[vista] = fila
+    datos["total"] = total
+    for fila in datos.values():
+        n = fila["hits"] + fila["misses"]
+        fila["ratio"] = round(fila["hits"] / n, 3) if n else None
+    return datos
+
+
+def cacheada(nombre, *grupos):
+    """
+    Decorador para métodos GET de vistas DRF: `nombre` identifica la vista en
+    las estadísticas y `grupos` son las versiones que invalidan la entrada.
+    """
+    _vistas.add(nombre)
+
+    def deco(func):
+        @wraps(func)
+        def envoltura(self, request, *args, **kwargs):
+            if request.method != "GET" or request.user.is_authenticated:
+                return func(self, request, *args, **kwargs)
+            k = clave(request, grupos)
+            guardada = _cache().get(k)
+            if guardada is not None:
+                _contar(nombre, "hits")
+                data, cabeceras = guardada
+                no_modificado = get_conditional_response(
+                    request, etag=cabeceras.get("ETag"),
+                    last_modified=parse_http_date_safe(cabeceras.get("Last-Modified") or ""))
+                response = no_modificado or Response(data, headers=cabeceras)
+            else:
+                _contar(nombre, "misses")
+                response = func(self, request, *args, **kwargs)
+                if response.status_code == 200 and isinstance(response, Response):
+                    cabeceras = {h: response[h] for h in CABECERAS if h in response}
+                    _cache().set(k, (response.data, cabeceras), TTL)
+            response["X-Cache"] = "HIT" if guardada is not None else "MISS"
+            return response
+        return envoltura
+    return deco
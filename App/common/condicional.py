@@ -0,0 +1,84 @@
+# App/common/condicional.py
+"""
+GET condicional (ETag / Last-Modified) para las vistas públicas.
+
+Los validadores salen de consultas baratas (conteo y fecha máxima) y de una
+"marca" por dominio: la hora del último cambio, que las señales actualizan al
+guardar o borrar. Así se detectan también las ediciones, que no cambian ni el
+conteo ni la fecha de creación. Si el cliente ya tiene la versión actual se
+responde 304 sin pasar por el serializer.
+
+La marca vive en el caché de Django: con varios procesos conviene un caché
+compartido (Redis/Memcached); con LocMem cada proceso ve solo sus cambios,
+y el conteo/fecha máxima siguen cubriendo altas y bajas. Donde hay una
+fecha de edición guardada (el listado y el detalle de artículos, con
+Articulo.actualizado) se usa validadores_de_fila, que no depende del caché.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _clave(dominio):
+    return f"condicional:{dominio}"
+
+
+def tocar(dominio):
+    """Registra un cambio en `dominio` (se llama desde las señales, on_commit)."""
+    cache.set(_clave(dominio), time.time(), None)
+
+
+def marca(dominio):
+    """Hora (epoch) del último cambio conocido en `dominio`."""
+    ts = cache.get(_clave(dominio))
+    if ts is None:
+        # sin registro (arranque o caché vaciado): se toma "ahora", que es seguro
+        cache.add(_clave(dominio), time.time(), None)
+        ts = cache.get(_clave(dominio), time.time())
+    return ts
+
+
+def validadores(dominio, *partes, ultimo=None):
+    """
+    (etag, last_modified) a partir de la marca de `dominio`, las `partes`
+    (conteos, ids...) y `ultimo`, la fecha más reciente de los datos.
+    """
+    modificado = marca(dominio)
+    if ultimo is not None:
+        modificado = max(modificado, ultimo.timestamp())
+    crudo = "|".join(str(p) for p in (dominio, modificado, *partes))
+    return quote_etag(hashlib.sha1(crudo.encode()).hexdigest()[:32]), int(modificado)
+
+
+def validadores_de_fila(ultimo, *partes):
+    """
+    (etag, last_modified) solo de datos guardados en la BD: `ultimo` (fecha
+    de la última edición) y las `partes`. No usa la marca, así que vale igual
+    en todos los procesos aunque el caché sea local. `ultimo` es None cuando
+    no hay filas (un listado vacío).
+    """
+    if ultimo is None:
+        ultimo = datetime.fromtimestamp(0, tz=timezone.utc)
+    crudo = "|".join(str(p) for p in (ultimo.isoformat(), *partes))
+    return quote_etag(hashlib.sha1(crudo.encode()).hexdigest()[:32]), int(ultimo.timestamp())
+
+
+def responder(request, etag, modificado, generar):
+    """
+    304 si If-None-Match / If-Modified-Since coinciden; si no, la respuesta de
+    `generar()` con ETag y Last-Modified.
+    """
+    no_modificado = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if no_modificado is not None:
+        return no_modificado
+    response = generar()
+    if response.status_code == 200:
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modificado)
+        # el cliente puede guardar la copia, pero debe revalidarla en cada uso
+        response.setdefault("Cache-Control", "no-cache")
+    return response
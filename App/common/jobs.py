@@ -0,0 +1,174 @@
+# App/common/jobs.py
+"""
+Cola de tareas en segundo plano sobre la tabla common.Job.
+
+    from common.jobs import tarea, enqueue
+
+    @tarea("catalog.geocodificar_articulo")       # en <app>/tareas.py
+    def geocodificar_articulo(articulo_id): ...
+
+    enqueue("catalog.geocodificar_articulo", articulo_id=art.pk, priority=10)
+
+- enqueue() inserta la fila en la transacción actual: si la petición hace
+  rollback, la tarea no existe; si hace commit, los workers la ven.
+- Los workers (manage.py run_workers) reclaman cada tarea con un UPDATE
+  condicional (status=PENDING -> RUNNING), así que varios hilos o procesos
+  pueden compartir la cola sin SELECT FOR UPDATE (vale también en SQLite).
+- Si la tarea lanza una excepción se reintenta con backoff exponencial con
+  jitter; al agotar max_attempts queda en DEAD (dead letter) con el error.
+- Las tareas en RUNNING de un worker caído se liberan tras JOBS_LOCK_TIMEOUT.
+
+Las funciones reciben el payload como kwargs, así que deben aceptar solo
+valores serializables a JSON (ids, textos), nunca instancias de modelos.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = getattr(settings, "JOBS_MAX_ATTEMPTS", 5)
+BACKOFF = getattr(settings, "JOBS_BACKOFF", 10)            # segundos, se duplica por intento
+BACKOFF_MAX = getattr(settings, "JOBS_BACKOFF_MAX", 60 * 60)
+LOCK_TIMEOUT = getattr(settings, "JOBS_LOCK_TIMEOUT", 60 * 10)
+
+_tareas = {}
+
+
+class TareaDesconocida(Exception):
+    pass
+
+
+def tarea(nombre):
+    """Registra la función como tarea `nombre`."""
+    def deco(func):
+        _tareas[nombre] = func
+        return func
+    return deco
+
+
+def cargar_tareas():
+    """Importa <app>.tareas de cada app instalada (registra sus @tarea)."""
+    autodiscover_modules("tareas")
+
+
+def enqueue(nombre, *, priority=0, delay=0, max_attempts=None, **payload):
+    """
+    Encola `nombre(**payload)`. `priority` mayor se ejecuta antes; `delay`
+    (segundos) la programa para más tarde.
+    """
+    from common.models import Job
+
+    return Job.objects.create(
+        name=nombre,
+        payload=payload,
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or MAX_INTENTOS,
+    )
+
+
+def enqueue_many(nombre, payloads, *, priority=0, delay=0, max_attempts=None):
+    """Como enqueue() para varias tareas del mismo tipo, en un solo INSERT."""
+    from common.models import Job
+
+    run_at = timezone.now() + timedelta(seconds=delay)
+    return Job.objects.bulk_create([
+        Job(name=nombre, payload=payload, priority=priority, run_at=run_at,
+            max_attempts=max_attempts or MAX_INTENTOS)
+        for payload in payloads
+    ])
+
+
+def _espera(intento):
+    return min(BACKOFF * 2 ** (intento - 1), BACKOFF_MAX) * random.uniform(0.5, 1.5)
+
+
+def liberar_vencidas():
+    """Devuelve a PENDING las tareas RUNNING cuyo worker dejó de responder."""
+    from common.models import Job
+
+    limite = timezone.now() - timedelta(seconds=LOCK_TIMEOUT)
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=limite).update(
+        status=Job.PENDING, locked_by="", locked_at=None)
+
+
+def reclamar(worker, limite=1):
+    """
+    Hasta `limite` tareas vencidas, ya marcadas RUNNING a nombre de `worker`.
+    Si otro worker gana la carrera por una fila, se salta.
+    """
+    from common.models import Job
+
+    ahora = timezone.now()
+    candidatas = (Job.objects.filter(status=Job.PENDING, run_at__lte=ahora)
+                  .order_by("-priority", "run_at", "id")
+                  .values_list("id", flat=True)[:limite * 2])
+    tomadas = []
+    for pk in candidatas:
+        if Job.objects.filter(pk=pk, status=Job.PENDING).update(
+                status=Job.RUNNING, locked_by=worker, locked_at=ahora, attempts=F("attempts") + 1):
+            tomadas.append(pk)
+            if len(tomadas) == limite:
+                break
+    return list(Job.objects.filter(pk__in=tomadas).order_by("-priority", "run_at", "id"))
+
+
+def ejecutar(job):
+    """Corre una tarea ya reclamada y guarda el resultado. True si terminó bien."""
+    from common.models import Job
+
+    func = _tareas.get(job.name)
+    try:
+        if func is None:
+            raise TareaDesconocida(job.name)
+        func(**job.payload)
+    except Exception as e:
+        error = traceback.format_exc()
+        if isinstance(e, TareaDesconocida) or job.attempts >= job.max_attempts:
+            logger.error("Tarea %s #%s descartada tras %s intentos: %s", job.name, job.pk, job.attempts, e)
+            cambios = {"status": Job.DEAD, "finished_at": timezone.now()}
+        else:
+            logger.warning("Tarea %s #%s falló (intento %s): %s", job.name, job.pk, job.attempts, e)
+            cambios = {"status": Job.PENDING, "run_at": timezone.now() + timedelta(seconds=_espera(job.attempts))}
+        Job.objects.filter(pk=job.pk).update(last_error=error, locked_by="", locked_at=None, **cambios)
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now(),
+                                         locked_by="", locked_at=None)
+    return True
+
+
+def procesar(worker="inline", limite=None):
+    """
+    Ejecuta en este hilo las tareas vencidas hasta vaciar la cola (o hasta
+    `limite`). Devuelve cuántas se ejecutaron. Lo usan run_workers y los tests.
+    """
+    n = 0
+    while limite is None or n < limite:
+        jobs = reclamar(worker)
+        if not jobs:
+            break
+        ejecutar(jobs[0])
+        n += 1
+    return n
+
+
+def worker(nombre, parar, espera=1.0):
+    """Bucle de un hilo de run_workers: procesa la cola hasta que `parar` se active."""
+    while not parar.is_set():
+        close_old_connections()
+        try:
+            hechas = procesar(nombre, limite=10)
+        except Exception:
+            logger.exception("Error en el worker %s", nombre)
+            hechas = 0
+        if not hechas:
+            parar.wait(espera)
+    connections.close_all()  # conexiones de este hilo
@@ -0,0 +1,37 @@
+# App/common/management/commands/limpiar_blobs.py
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.almacenamiento import DIRECTORIO, contenido
+from common.models import Blob
+
+
+class Command(BaseCommand):
+    help = ("Borra los archivos guardados por contenido que no tienen fila en common.Blob "
+            "(quedan si la transacción que los subió hizo rollback).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=int, default=3600,
+                            help="Segundos de antigüedad mínima: respeta las subidas aún sin commit.")
+        parser.add_argument("--dry-run", action="store_true", help="Solo lista lo que borraría.")
+
+    def handle(self, *args, **opts):
+        storage = contenido()
+        limite = time.time() - opts["min_age"]
+        conocidos = set(Blob.objects.values_list("name", flat=True))
+        borrados = 0
+        for carpeta, _, archivos in os.walk(storage.path(DIRECTORIO)):
+            for archivo in archivos:
+                ruta = os.path.join(carpeta, archivo)
+                name = os.path.relpath(ruta, storage.location).replace(os.sep, "/")
+                if name in conocidos or os.path.getmtime(ruta) > limite:
+                    continue
+                borrados += 1
+                if opts["dry_run"]:
+                    self.stdout.write(name)
+                else:
+                    os.remove(ruta)
+        accion = "sin referencias" if opts["dry_run"] else "borrados"
+        self.stdout.write(self.style.SUCCESS(f"Listo. Archivos {accion}: {borrados}"))
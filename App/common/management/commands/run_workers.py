@@ -0,0 +1,48 @@
+# App/common/management/commands/run_workers.py
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+
+from common import jobs
+
+
+class Command(BaseCommand):
+    help = ("Procesa la cola de tareas en segundo plano (common.Job) con un grupo de hilos. "
+            "Se pueden lanzar varios procesos a la vez: cada tarea la toma un solo worker.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=2, help="Hilos procesando tareas a la vez.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Segundos de espera con la cola vacía.")
+        parser.add_argument("--once", action="store_true",
+                            help="Procesa lo que haya vencido y termina (cron, pruebas).")
+
+    def handle(self, *args, **opts):
+        base = f"{socket.gethostname()}:{os.getpid()}"
+        liberadas = jobs.liberar_vencidas()
+        if liberadas:
+            self.stdout.write(f"{liberadas} tareas de workers caídos vuelven a la cola.")
+
+        if opts["once"]:
+            n = jobs.procesar(f"{base}:0")
+            self.stdout.write(self.style.SUCCESS(f"Listo. Tareas ejecutadas: {n}"))
+            return
+
+        parar = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: parar.set())
+
+        hilos = [threading.Thread(target=jobs.worker, args=(f"{base}:{i}", parar, opts["sleep"]),
+                                  name=f"worker-{i}")
+                 for i in range(max(1, opts["threads"]))]
+        for h in hilos:
+            h.start()
+        self.stdout.write(f"{len(hilos)} workers en marcha ({base}). Ctrl+C para detener.")
+        while not parar.wait(60):
+            jobs.liberar_vencidas()
+        # cada hilo termina la tarea en curso antes de salir
+        for h in hilos:
+            h.join()
+        self.stdout.write(self.style.SUCCESS("Workers detenidos."))
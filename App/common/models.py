@@ -25,3 +25,77 @@ class Notification(models.Model):
         if self.read_at:
             return False
         return not (self.expires_at and now() > self.expires_at)
+
+
+class GeocodeCache(models.Model):
+    """
+    Resultado de Nominatim por consulta normalizada y país (ver
+    common/services/geocoding.py). found=False guarda también las consultas
+    sin resultado para no repetirlas hasta que expiren.
+    """
+    query = models.CharField(max_length=255)
+    country_codes = models.CharField(max_length=32, blank=True, default="")
+    found = models.BooleanField(default=True)
+    lat = models.FloatField(null=True, blank=True)
+    lng = models.FloatField(null=True, blank=True)
+    display_name = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = [("query", "country_codes")]
+
+    def __str__(self):
+        return f"{self.query} [{self.country_codes}]"
+
+
+class Job(models.Model):
+    """
+    Tarea en segundo plano (ver common/jobs.py). Los workers (manage.py
+    run_workers) toman las pendientes con run_at vencido, por prioridad
+    descendente; las que agotan max_attempts quedan en DEAD para revisarlas
+    y reencolarlas desde el admin.
+    """
+    PENDING, RUNNING, DONE, DEAD = "PENDING", "RUNNING", "DONE", "DEAD"
+    STATUS_CHOICES = (
+        (PENDING, "Pendiente"),
+        (RUNNING, "En ejecución"),
+        (DONE, "Terminada"),
+        (DEAD, "Fallida"),
+    )
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=PENDING)
+    run_at = models.DateTimeField(default=now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # cola: WHERE status='PENDING' AND run_at <= now ORDER BY priority DESC, run_at
+            models.Index(fields=["status", "-priority", "run_at"], name="job_cola_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} [{self.status}]"
+
+
+class Blob(models.Model):
+    """
+    Archivo de media guardado por contenido (ver common/almacenamiento.py).
+    `refs` cuenta los campos que apuntan a él; al llegar a 0 se borra el archivo.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refs = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refs})"
@@ -1,69 +1,279 @@
 # App/common/services/geocoding.py
+import csv
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+from pathlib import Path
+
 import requests
 from django.conf import settings
+from django.db import DatabaseError, IntegrityError
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import nominatim
+
+logger = logging.getLogger(__name__)
 
 class GeocodingError(Exception):
     pass
 
-def _get_base_and_headers():
-    base = getattr(settings, "EXTERNAL_GEO", {}).get("NOMINATIM_BASE") or "https://nominatim.openstreetmap.org/search"
-    ua   = getattr(settings, "EXTERNAL_GEO", {}).get("USER_AGENT") or "ToolingoApp/1.0 (contacto@example.com)"
-    timeout = getattr(settings, "HTTP_CLIENT_TIMEOUT", 8)
-    headers = {"User-Agent": ua}
-    return base, headers, timeout
 
-def geocode_city(city_name: str, country_codes: str | None = None) -> tuple[float, float]:
+class GeocodingNoEncontrado(GeocodingError):
+    """La consulta no tiene resultado (a diferencia de un error de red)."""
+
+
+# ---------------------------------------------------------------------
+# Caché: LRU en proceso -> proveedores (nomenclátor local, GeocodeCache + Nominatim)
+# ---------------------------------------------------------------------
+# Vigencia de un resultado encontrado y de uno vacío (segundos)
+TTL = getattr(settings, "GEOCODING_CACHE_TTL", 60 * 60 * 24 * 30)
+TTL_NEGATIVO = getattr(settings, "GEOCODING_CACHE_TTL_NEGATIVO", 60 * 60 * 24)
+LRU_MAX = getattr(settings, "GEOCODING_CACHE_LRU", 512)
+
+
+def normalizar_consulta(texto: str) -> str:
+    """'  Medellín,  Antioquia ' -> 'medellin, antioquia'"""
+    t = unicodedata.normalize("NFKD", texto or "")
+    t = "".join(c for c in t if not unicodedata.combining(c)).lower()
+    return re.sub(r"\s+", " ", t).strip()
+
+
+class _LRU:
+    """LRU pequeño con vencimiento por entrada; valor None = sin resultado."""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None:
+                return False, None
+            vence, valor = item
+            if vence < time.time():
+                del self._datos[clave]
+                return False, None
+            self._datos.move_to_end(clave)
+            return True, valor
+
+    def set(self, clave, valor, vence):
+        with self._lock:
+            self._datos[clave] = (vence, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+_lru = _LRU(LRU_MAX)
+
+
+# ---------------------------------------------------------------------
+# Proveedores: se prueban en el orden de settings.GEOCODING_PROVIDERS
+# ---------------------------------------------------------------------
+GAZETTEER_CSV = Path(__file__).resolve().parent.parent / "data" / "gazetteer_co.csv"
+
+
+def _palabras(texto):
+    return re.findall(r"[a-z0-9]+", normalizar_consulta(texto))
+
+
+class Gazetteer:
     """
-    Resuelve nombre de ciudad -> (lat, lon)
+    Nomenclátor local (sin red) de municipios y barrios de Colombia, leído de
+    un CSV con columnas nombre, tipo, municipio, departamento, lat, lng, alias
+    (alias separados por "|").
+
+    Solo responde cuando la consulta entera es un lugar: el nombre (o un
+    alias) y, opcionalmente, partes separadas por comas con su municipio,
+    departamento o "Colombia" ("El Poblado, Medellín, Antioquia"). Cualquier
+    otra cosa (una dirección con calle y número, otro país) sigue a Nominatim,
+    que la ubica mejor que el centro del municipio. Los barrios exigen su
+    municipio o departamento.
+
+    El display_name que devuelve es "": es un nombre armado por nosotros, no
+    una dirección, y no debe reemplazar la que escribió el usuario.
     """
-    base, headers, timeout = _get_base_and_headers()
-    params = {
-        "q": city_name,
-        "format": "jsonv2",
-        "limit": 1,
-    }
-    if country_codes:
-        params["countrycodes"] = country_codes  # ej: "co"
 
-    try:
-        resp = requests.get(base, headers=headers, params=params, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.RequestException as e:
-        raise GeocodingError(f"Error consultando Nominatim: {e}") from e
+    nombre = "gazetteer"
+    paises = {"", "co"}
+    # partes que se aceptan como país
+    PAIS = {"colombia", "co"}
 
-    if not data:
-        raise GeocodingError(f"No se encontró la ciudad: {city_name}")
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or getattr(settings, "GEOCODING_GAZETTEER_CSV", GAZETTEER_CSV))
+        self._indice = None
+        self._lock = threading.Lock()
 
-    lat = float(data[0]["lat"])
-    lon = float(data[0]["lon"])
-    return (lat, lon)
+    def _cargar(self):
+        indice = {}
+        with open(self.ruta, encoding="utf-8", newline="") as f:
+            for fila in csv.DictReader(f):
+                lugar = {
+                    "tipo": fila["tipo"],
+                    "lat": float(fila["lat"]),
+                    "lng": float(fila["lng"]),
+                    "contexto": {p for p in _palabras(f"{fila['municipio']} {fila['departamento']}") if len(p) > 1},
+                }
+                for nombre in [fila["nombre"], *filter(None, (fila.get("alias") or "").split("|"))]:
+                    palabras = tuple(_palabras(nombre))
+                    if palabras and lugar not in indice.get(palabras, ()):
+                        indice.setdefault(palabras, []).append(lugar)
+        return indice
 
-def geocode_address(address: str, country_codes: str | None = None) -> tuple[float, float, str]:
+    def indice(self):
+        """{palabras del nombre normalizado: [lugares]}"""
+        if self._indice is None:
+            with self._lock:
+                if self._indice is None:
+                    self._indice = self._cargar()
+        return self._indice
+
+    def buscar(self, consulta, country_codes):
+        if (country_codes or "").lower() not in self.paises:
+            return None
+        partes = [p for p in (_palabras(p) for p in consulta.split(",")) if p]
+        if not partes:
+            return None
+        nombre, resto = tuple(partes[0]), partes[1:]
+        contexto = {p for parte in resto for p in parte if p not in self.PAIS}
+
+        def acepta(lugar):
+            # cada parte adicional tiene que ser su municipio, departamento o el país
+            if not all(set(parte) <= lugar["contexto"] | self.PAIS for parte in resto):
+                return False
+            return lugar["tipo"] == "municipio" or bool(contexto & lugar["contexto"])
+
+        lugares = [l for l in self.indice().get(nombre, ()) if acepta(l)]
+        if not lugares:
+            return None
+        # entre homónimos gana el que más contexto comparte con la consulta
+        lugar = max(lugares, key=lambda l: len(contexto & l["contexto"]))
+        return lugar["lat"], lugar["lng"], ""
+
+
+class Nominatim:
+    """Nominatim (red), con los resultados guardados en la tabla GeocodeCache."""
+
+    nombre = "nominatim"
+
+    def _consultar(self, consulta, country_codes):
+        params = {
+            "q": consulta,
+            "format": "jsonv2",
+            "limit": 1,
+            "addressdetails": 0,
+        }
+        if country_codes:
+            params["countrycodes"] = country_codes  # ej: "co"
+
+        try:
+            data = nominatim.cliente().buscar(params)
+        except (requests.RequestException, ValueError) as e:
+            raise GeocodingError(f"Error consultando Nominatim: {e}") from e
+
+        if not data:
+            return None
+        return float(data[0]["lat"]), float(data[0]["lon"]), data[0].get("display_name") or consulta
+
+    def buscar(self, consulta, country_codes):
+        from common.models import GeocodeCache
+
+        q, cc = normalizar_consulta(consulta), (country_codes or "").lower()
+        entrada = GeocodeCache.objects.filter(query=q, country_codes=cc, expires_at__gt=timezone.now()).first()
+        if entrada is not None:
+            return (entrada.lat, entrada.lng, entrada.display_name) if entrada.found else None
+
+        valor = self._consultar(consulta, country_codes)
+        _guardar(q, cc, valor, TTL if valor else TTL_NEGATIVO)
+        return valor
+
+
+PROVEEDORES = {"gazetteer": Gazetteer, "nominatim": Nominatim}
+_instancias = {}
+_instancias_lock = threading.Lock()
+
+
+def proveedores():
+    """
+    Instancias de settings.GEOCODING_PROVIDERS, en orden. Cada elemento es un
+    nombre de PROVEEDORES o la ruta a una clase con buscar(consulta,
+    country_codes) -> (lat, lon, display_name) | None.
+    """
+    nombres = getattr(settings, "GEOCODING_PROVIDERS", ("gazetteer", "nominatim"))
+    with _instancias_lock:
+        for nombre in nombres:
+            if nombre not in _instancias:
+                clase = PROVEEDORES.get(nombre) or import_string(nombre)
+                _instancias[nombre] = clase()
+        return [_instancias[n] for n in nombres]
+
+
+def _resolver(consulta: str, country_codes: str | None):
     """
-    Resuelve una dirección libre -> (lat, lon, display_name)
+    (lat, lon, display_name) del primer proveedor que encuentre la consulta, o
+    None si ninguno la encontró. Los errores de red no se guardan en caché (se
+    lanzan como GeocodingError).
     """
-    base, headers, timeout = _get_base_and_headers()
-    params = {
-        "q": address,
-        "format": "jsonv2",
-        "limit": 1,
-        "addressdetails": 0,
-    }
-    if country_codes:
-        params["countrycodes"] = country_codes
+    clave = (normalizar_consulta(consulta), (country_codes or "").lower())
+    hallado, valor = _lru.get(clave)
+    if hallado:
+        return valor
 
+    for proveedor in proveedores():
+        valor = proveedor.buscar(consulta, country_codes)
+        if valor is not None:
+            break
+    _lru.set(clave, valor, time.time() + (TTL if valor else TTL_NEGATIVO))
+    return valor
+
+
+def _guardar(q, cc, valor, ttl):
+    """
+    Upsert en GeocodeCache sin transacción ni SELECT FOR UPDATE, para que
+    varios hilos (geocode_missing --workers) no se bloqueen en SQLite. Si
+    falla, el resultado igual se devuelve: el caché es solo una optimización.
+    """
+    from common.models import GeocodeCache
+
+    lat, lng, display = valor or (None, None, "")
+    campos = {"found": valor is not None, "lat": lat, "lng": lng, "display_name": display,
+              "expires_at": timezone.now() + timedelta(seconds=ttl)}
     try:
-        resp = requests.get(base, headers=headers, params=params, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.RequestException as e:
-        raise GeocodingError(f"Error consultando Nominatim: {e}") from e
-
-    if not data:
-        raise GeocodingError(f"No se encontró la dirección: {address}")
-
-    lat = float(data[0]["lat"])
-    lon = float(data[0]["lon"])
-    display = data[0].get("display_name", address)
-    return (lat, lon, display)
+        if not GeocodeCache.objects.filter(query=q, country_codes=cc).update(**campos):
+            GeocodeCache.objects.create(query=q, country_codes=cc, **campos)
+    except IntegrityError:
+        pass  # otro hilo lo guardó entre el update y el create
+    except DatabaseError as e:
+        logger.warning("No se pudo guardar la geocodificación de %r: %s", q, e)
+
+
+def geocode_city(city_name: str, country_codes: str | None = None) -> tuple[float, float]:
+    """
+    Resuelve nombre de ciudad -> (lat, lon)
+    """
+    valor = _resolver(city_name, country_codes)
+    if valor is None:
+        raise GeocodingNoEncontrado(f"No se encontró la ciudad: {city_name}")
+    return (valor[0], valor[1])
+
+def geocode_address(address: str, country_codes: str | None = None) -> tuple[float, float, str]:
+    """
+    Resuelve una dirección libre -> (lat, lon, display_name). display_name es
+    "" si la resolvió el nomenclátor local: entonces no hay una dirección
+    mejor que la recibida.
+    """
+    valor = _resolver(address, country_codes)
+    if valor is None:
+        raise GeocodingNoEncontrado(f"No se encontró la dirección: {address}")
+    return valor
@@ -0,0 +1,157 @@
+# App/common/services/nominatim.py
+"""
+Cliente HTTP compartido para Nominatim.
+
+- Reutiliza conexiones con un requests.Session (pool de conexiones).
+- Respeta la política de uso (1 petición/segundo) con un token bucket común
+  a todos los hilos del proceso.
+- Reintenta 429/5xx y errores de conexión con backoff exponencial con
+  jitter, respetando Retry-After.
+- Lleva contadores de llamadas, latencia y esperas por el límite.
+
+El límite es por proceso: con varios procesos conviene repartir la tasa
+(EXTERNAL_GEO["RATE_PER_SEC"]).
+"""
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """`tasa` fichas por segundo, hasta `capacidad` acumuladas."""
+
+    def __init__(self, tasa, capacidad=1, reloj=time.monotonic, dormir=time.sleep):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad)
+        self._fichas = float(capacidad)
+        self._reloj, self._dormir = reloj, dormir
+        self._ultimo = reloj()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Bloquea hasta tener una ficha; devuelve los segundos esperados."""
+        esperado = 0.0
+        with self._lock:  # en orden de llegada: un hilo espera a la vez
+            while True:
+                ahora = self._reloj()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return esperado
+                falta = (1 - self._fichas) / self.tasa
+                self._dormir(falta)
+                esperado += falta
+
+
+class NominatimClient:
+    def __init__(self, base, user_agent, timeout=8, tasa=1.0, capacidad=1, reintentos=3,
+                 backoff=1.0, backoff_max=30.0, pool=4, dormir=time.sleep, reloj=time.monotonic):
+        self.base = base
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff, self.backoff_max = backoff, backoff_max
+        self._dormir, self._reloj = dormir, reloj
+        self.bucket = TokenBucket(tasa, capacidad, reloj=reloj, dormir=dormir)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=pool)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+
+        self._lock = threading.Lock()
+        self._contadores = {"llamadas": 0, "ok": 0, "errores": 0, "reintentos": 0,
+                            "esperas": 0, "espera_s": 0.0, "latencia_s": 0.0, "latencia_max_s": 0.0}
+
+    # ---------- contadores ----------
+    def _sumar(self, **valores):
+        with self._lock:
+            for k, v in valores.items():
+                self._contadores[k] += v
+
+    def _latencia(self, segundos):
+        with self._lock:
+            self._contadores["latencia_s"] += segundos
+            self._contadores["latencia_max_s"] = max(self._contadores["latencia_max_s"], segundos)
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._contadores)
+        datos["latencia_media_s"] = round(datos["latencia_s"] / datos["llamadas"], 4) if datos["llamadas"] else None
+        return datos
+
+    # ---------- peticiones ----------
+    def _espera_reintento(self, intento, resp=None):
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return min(self.backoff * 2 ** intento, self.backoff_max) * random.uniform(0.5, 1.5)
+
+    def buscar(self, params):
+        """
+        GET <base>?<params> y devuelve el JSON. Lanza requests.RequestException
+        si falla tras agotar los reintentos.
+        """
+        intento = 0
+        while True:
+            esperado = self.bucket.adquirir()
+            if esperado:
+                self._sumar(esperas=1, espera_s=esperado)
+            inicio = self._reloj()
+            resp = None
+            try:
+                resp = self.session.get(self.base, params=params, timeout=self.timeout)
+                error = None if resp.status_code not in REINTENTABLES else requests.HTTPError(
+                    f"{resp.status_code} de Nominatim", response=resp)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except requests.RequestException:
+                self._sumar(errores=1)
+                raise
+            finally:
+                self._sumar(llamadas=1)
+                self._latencia(self._reloj() - inicio)
+
+            if error is None:
+                try:
+                    resp.raise_for_status()
+                    data = resp.json()
+                except (requests.RequestException, ValueError):
+                    self._sumar(errores=1)
+                    raise
+                self._sumar(ok=1)
+                return data
+            if intento >= self.reintentos:
+                self._sumar(errores=1)
+                raise error
+            self._sumar(reintentos=1)
+            self._dormir(self._espera_reintento(intento, resp))
+            intento += 1
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def cliente():
+    """Cliente único del proceso, configurado con settings.EXTERNAL_GEO."""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                geo = getattr(settings, "EXTERNAL_GEO", {})
+                _cliente = NominatimClient(
+                    base=geo.get("NOMINATIM_BASE") or "https://nominatim.openstreetmap.org/search",
+                    user_agent=geo.get("USER_AGENT") or "ToolingoApp/1.0 (contacto@example.com)",
+                    timeout=getattr(settings, "HTTP_CLIENT_TIMEOUT", 8),
+                    tasa=geo.get("RATE_PER_SEC", 1.0),
+                    reintentos=geo.get("MAX_RETRIES", 3),
+                )
+    return _cliente
@@ -0,0 +1,51 @@
+# App/common/signals.py
+"""
+Referencias de los archivos guardados por contenido (common/almacenamiento.py):
+al borrar una fila o reemplazar su archivo se suelta la referencia anterior.
+Se conecta a cada modelo con campos de archivo en ese storage.
+"""
+from django.apps import apps
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_init, post_save
+
+from . import almacenamiento
+
+
+def _campos(model):
+    return [f.attname for f in model._meta.concrete_fields
+            if isinstance(f, FileField) and f.storage is almacenamiento.contenido()]
+
+
+def _recordar(instance, campos):
+    # solo archivos ya guardados: uno recién asignado aún no tiene referencia
+    instance._archivos_guardados = {
+        c: getattr(instance, c).name for c in campos
+        if getattr(instance, c) and getattr(instance, c)._committed
+    }
+
+
+def conectar():
+    for model in apps.get_models():
+        campos = _campos(model)
+        if not campos:
+            continue
+
+        def al_iniciar(sender, instance, campos=campos, **kwargs):
+            _recordar(instance, campos)
+
+        def al_guardar(sender, instance, created, campos=campos, **kwargs):
+            anteriores = getattr(instance, "_archivos_guardados", {})
+            for campo in campos:
+                viejo = anteriores.get(campo)
+                if viejo and viejo != getattr(instance, campo).name:
+                    almacenamiento.contenido().delete(viejo)
+            _recordar(instance, campos)
+
+        def al_borrar(sender, instance, campos=campos, **kwargs):
+            for campo in campos:
+                almacenamiento.liberar(getattr(instance, campo))
+
+        uid = f"almacenamiento:{model._meta.label}"
+        post_init.connect(al_iniciar, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(al_guardar, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(al_borrar, sender=model, weak=False, dispatch_uid=uid)
@@ -1,3 +1,399 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+
+class CacheRespuestasTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from users.models import User
+        from catalog.models import Articulo, Categoria
+        cache.clear()
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.cat = Categoria.objects.create(nombre="Taladros")
+        self.art = Articulo.objects.create(propietario=self.user, titulo="Taladro", descripcion="-",
+                                           categoria=self.cat, precio_por_dia=10, ubicacion="Medellín")
+
+    def test_hit_miss_e_invalidacion(self):
+        resp = self.client.get("/api/articulos/recent/")
+        self.assertEqual(resp["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            resp = self.client.get("/api/articulos/recent/")
+        self.assertEqual(resp["X-Cache"], "HIT")
+        self.assertEqual(resp.json()[0]["titulo"], "Taladro")
+        # mismos parámetros en otro orden: misma entrada
+        self.client.get("/api/articulos/?estado=USADO&ordering=-creado")
+        self.assertEqual(self.client.get("/api/articulos/?ordering=-creado&estado=USADO")["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.art.titulo = "Taladro percutor"
+            self.art.save()
+        resp = self.client.get("/api/articulos/recent/")
+        self.assertEqual(resp["X-Cache"], "MISS")
+        self.assertEqual(resp.json()[0]["titulo"], "Taladro percutor")
+
+    def test_categoria_invalida_articulos_y_categorias(self):
+        self.client.get("/api/categorias/")
+        self.client.get("/api/aliados/productos/")
+        self.cat.nombre = "Taladros y brocas"
+        self.cat.save()
+        self.assertEqual(self.client.get("/api/categorias/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/aliados/productos/")["X-Cache"], "MISS")
+
+    def test_autenticados_no_usan_cache(self):
+        from rest_framework.test import APIClient
+        api = APIClient()
+        api.force_authenticate(self.user)
+        api.get("/api/articulos/recent/")
+        self.assertNotIn("X-Cache", api.get("/api/articulos/recent/"))
+
+    def test_estadisticas_solo_staff(self):
+        from rest_framework.test import APIClient
+        self.client.get("/api/categorias/arbol/")
+        self.client.get("/api/categorias/arbol/")
+        api = APIClient()
+        api.force_authenticate(self.user)
+        self.assertEqual(api.get("/api/cache/estadisticas/").status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        datos = api.get("/api/cache/estadisticas/").json()
+        self.assertEqual(datos["categorias-arbol"], {"hits": 1, "misses": 1, "ratio": 0.5})
+
+
+@override_settings(GEOCODING_PROVIDERS=["nominatim"])
+class GeocodingCacheTests(TestCase):
+    def setUp(self):
+        from common.services import geocoding
+        geocoding._lru.clear()
+        self.addCleanup(geocoding._lru.clear)
+
+    def test_una_sola_llamada_por_consulta_normalizada(self):
+        from unittest import mock
+        from common.models import GeocodeCache
+        from common.services import geocoding
+        data = [{"lat": "6.2442", "lon": "-75.5812", "display_name": "Medellín, Antioquia, Colombia"}]
+        with mock.patch("common.services.nominatim.NominatimClient.buscar", return_value=data) as get:
+            self.assertEqual(geocoding.geocode_city("Medellín", "co"), (6.2442, -75.5812))
+            self.assertEqual(geocoding.geocode_city("  MEDELLIN ", "co"), (6.2442, -75.5812))
+            self.assertEqual(geocoding.geocode_address("medellín", "co")[2], "Medellín, Antioquia, Colombia")
+            self.assertEqual(get.call_count, 1)
+            # otro proceso (LRU vacío) lee la tabla sin salir a la red
+            geocoding._lru.clear()
+            with self.assertNumQueries(1):
+                geocoding.geocode_city("Medellín", "co")
+            self.assertEqual(get.call_count, 1)
+        self.assertEqual(GeocodeCache.objects.get().query, "medellin")
+
+    def test_resultado_vacio_y_vencimiento(self):
+        from datetime import timedelta
+        from unittest import mock
+        from django.utils import timezone
+        from common.models import GeocodeCache
+        from common.services import geocoding
+        with mock.patch("common.services.nominatim.NominatimClient.buscar", return_value=[]) as get:
+            for _ in range(2):
+                with self.assertRaises(geocoding.GeocodingError):
+                    geocoding.geocode_address("Calle que no existe 123")
+            self.assertEqual(get.call_count, 1)
+            self.assertFalse(GeocodeCache.objects.get().found)
+            # vencida: se vuelve a consultar
+            GeocodeCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+            geocoding._lru.clear()
+            with self.assertRaises(geocoding.GeocodingError):
+                geocoding.geocode_address("Calle que no existe 123")
+            self.assertEqual(get.call_count, 2)
+
+    def test_errores_de_red_no_se_guardan(self):
+        import requests
+        from unittest import mock
+        from common.models import GeocodeCache
+        from common.services import geocoding
+        with mock.patch("common.services.nominatim.NominatimClient.buscar", side_effect=requests.ConnectionError("caída")):
+            with self.assertRaises(geocoding.GeocodingError):
+                geocoding.geocode_city("Bogotá")
+        self.assertFalse(GeocodeCache.objects.exists())
+
+
+@override_settings(GEOCODING_PROVIDERS=["gazetteer"])
+class GazetteerTests(TestCase):
+    def setUp(self):
+        from common.services import geocoding
+        geocoding._lru.clear()
+        self.addCleanup(geocoding._lru.clear)
+
+    def test_municipios_y_barrios_sin_red(self):
+        from unittest import mock
+        from common.services import geocoding
+        with mock.patch("common.services.nominatim.NominatimClient.buscar") as red, self.assertNumQueries(0):
+            self.assertEqual(geocoding.geocode_city("MEDELLIN"), (6.2442, -75.5812))
+            self.assertEqual(geocoding.geocode_address("Bogotá D.C., Colombia", "co"), (4.711, -74.0721, ""))
+            self.assertEqual(geocoding.geocode_address("El Poblado, Medellín, Antioquia")[:2], (6.2086, -75.5659))
+            self.assertEqual(geocoding.geocode_address("Cartagena de Indias")[:2], (10.391, -75.4794))
+        red.assert_not_called()
+
+    def test_homonimos_y_contexto(self):
+        from common.services import geocoding
+        self.assertEqual(geocoding.geocode_address("La Candelaria, Bogotá")[:2], (4.5963, -74.0737))
+        self.assertEqual(geocoding.geocode_address("la candelaria, medellin antioquia")[:2], (6.2476, -75.5658))
+        self.assertEqual(geocoding.geocode_city("Manizales, Caldas"), (5.0703, -75.5138))
+        # un barrio sin su municipio no se adivina
+        with self.assertRaises(geocoding.GeocodingError):
+            geocoding.geocode_address("Buenos Aires")
+        with self.assertRaises(geocoding.GeocodingError):
+            geocoding.geocode_city("Medellín", "ar")
+
+    def test_solo_lugares_completos(self):
+        from common.services.geocoding import Gazetteer
+        g = Gazetteer()
+        # direcciones con calle, otro país o partes desconocidas: a Nominatim
+        for consulta in ("Cra 7 # 72-41, Bogotá", "Cra 43A # 1-50, El Poblado, Medellín",
+                         "Cartagena, España", "Medellín, Caldas", "Hotel Medellín"):
+            self.assertIsNone(g.buscar(consulta, "co"), consulta)
+        self.assertIsNotNone(g.buscar("Cartagena, Bolívar, Colombia", "co"))
+
+    @override_settings(GEOCODING_PROVIDERS=["gazetteer", "nominatim"])
+    def test_nominatim_de_respaldo(self):
+        from unittest import mock
+        from common.services import geocoding
+        data = [{"lat": "6.5", "lon": "-75.1", "display_name": "Vereda X, Antioquia, Colombia"}]
+        with mock.patch("common.services.nominatim.NominatimClient.buscar", return_value=data) as red:
+            geocoding.geocode_city("Envigado")
+            self.assertEqual(geocoding.geocode_address("Vereda X", "co"), (6.5, -75.1, "Vereda X, Antioquia, Colombia"))
+        self.assertEqual(red.call_count, 1)
+
+
+class JobsTests(TestCase):
+    def setUp(self):
+        from common import jobs
+        self.llamadas = []
+        self.fallos = 0
+        self.addCleanup(jobs._tareas.pop, "tests.anotar", None)
+        self.addCleanup(jobs._tareas.pop, "tests.fallar", None)
+
+        @jobs.tarea("tests.anotar")
+        def anotar(valor):
+            self.llamadas.append(valor)
+
+        @jobs.tarea("tests.fallar")
+        def fallar():
+            self.fallos += 1
+            raise ValueError("no")
+
+    def test_prioridad_y_programacion(self):
+        from common import jobs
+        from common.models import Job
+        jobs.enqueue("tests.anotar", valor="baja")
+        jobs.enqueue("tests.anotar", valor="alta", priority=10)
+        jobs.enqueue("tests.anotar", valor="luego", priority=99, delay=3600)
+        self.assertEqual(jobs.procesar(), 2)
+        self.assertEqual(self.llamadas, ["alta", "baja"])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertEqual(Job.objects.get(status=Job.PENDING).payload, {"valor": "luego"})
+
+    def test_reintentos_con_backoff_y_dead_letter(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from common import jobs
+        from common.models import Job
+        job = jobs.enqueue("tests.fallar", max_attempts=3)
+        self.assertEqual(jobs.procesar(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=jobs.BACKOFF * 0.5 - 1))
+        self.assertIn("ValueError", job.last_error)
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            jobs.procesar()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, self.fallos), (Job.DEAD, 3, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(jobs.procesar(), 0)
+
+    def test_tarea_desconocida_y_worker_caido(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from common import jobs
+        from common.models import Job
+        desconocida = jobs.enqueue("tests.no_existe")
+        jobs.procesar()
+        desconocida.refresh_from_db()
+        self.assertEqual((desconocida.status, desconocida.attempts), (Job.DEAD, 1))
+
+        colgada = jobs.enqueue("tests.anotar", valor="x")
+        self.assertEqual([j.pk for j in jobs.reclamar("otro")], [colgada.pk])
+        self.assertEqual(jobs.reclamar("yo"), [])  # ya la tiene otro worker
+        Job.objects.filter(pk=colgada.pk).update(
+            locked_at=timezone.now() - timedelta(seconds=jobs.LOCK_TIMEOUT + 1))
+        self.assertEqual(jobs.liberar_vencidas(), 1)
+        self.assertEqual(jobs.procesar(), 1)
+        self.assertEqual(self.llamadas, ["x"])
+
+    def test_run_workers_once(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from common import jobs
+        jobs.enqueue("tests.anotar", valor=1)
+        out = StringIO()
+        call_command("run_workers", once=True, stdout=out)
+        self.assertEqual(self.llamadas, [1])
+        self.assertIn("Tareas ejecutadas: 1", out.getvalue())
+
+    def test_pago_encola_pedido_de_resenas(self):
+        from datetime import date
+        from rest_framework.test import APIClient
+        from users.models import User
+        from catalog.models import Articulo, Categoria
+        from rentals.models import CartItem
+        from common import jobs
+        user = User.objects.create_user(username="cliente", email="cliente@test.co", password="12345")
+        art = Articulo.objects.create(propietario=user, titulo="Taladro", descripcion="-",
+                                      categoria=Categoria.objects.create(nombre="Taladros"), precio_por_dia=10)
+        CartItem.objects.create(user=user, articulo=art, fecha_inicio=date(2025, 1, 1),
+                                fecha_fin=date(2025, 1, 2), dias=1)
+        api = APIClient()
+        api.force_authenticate(user)
+        self.assertEqual(api.post("/api/pagos/simular/", {"metodo": "wallet", "total": 1000},
+                                  format="json").status_code, 200)
+        self.assertEqual(api.get("/api/notificaciones/").json()["count"], 0)
+        self.assertEqual(jobs.procesar(), 1)
+        notifs = api.get("/api/notificaciones/").json()["results"]
+        self.assertEqual([n["action_url"] for n in notifs], [f"/articulo/{art.pk}/#opiniones"])
+        self.assertIn("Taladro", notifs[0]["body"])
+        api.post("/api/notificaciones/marcar-todas/")
+        self.assertEqual(api.get("/api/notificaciones/").json()["count"], 0)
+
+
+class AlmacenamientoContenidoTests(TestCase):
+    def setUp(self):
+        import shutil, tempfile
+        from users.models import User
+        from catalog.models import Articulo, Categoria
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.user = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        cat = Categoria.objects.create(nombre="Taladros")
+        self.arts = [Articulo.objects.create(propietario=self.user, titulo=f"t{i}", descripcion="-",
+                                             categoria=cat, precio_por_dia=10) for i in range(2)]
+
+    def _archivo(self, datos, nombre="foto.JPEG"):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return SimpleUploadedFile(nombre, datos, content_type="image/jpeg")
+
+    def test_misma_foto_se_guarda_una_vez_y_se_borra_al_soltarla(self):
+        import hashlib, os
+        from catalog.models import Imagen
+        from common.models import Blob
+        digest = hashlib.sha256(b"foto").hexdigest()
+        a = Imagen.objects.create(articulo=self.arts[0], imagen=self._archivo(b"foto"))
+        b = Imagen.objects.create(articulo=self.arts[1], imagen=self._archivo(b"foto", "otra.jpg"))
+        self.assertEqual(a.imagen.name, f"cas/{digest[:2]}/{digest[2:4]}/{digest}.jpg")
+        self.assertEqual(a.imagen.name, b.imagen.name)
+        self.assertEqual(Blob.objects.get().refs, 2)
+        ruta = a.imagen.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            a.delete()
+        self.assertTrue(os.path.exists(ruta))
+        self.assertEqual(Blob.objects.get().refs, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arts[1].delete()  # en cascada
+        self.assertFalse(os.path.exists(ruta))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_cambiar_foto_de_perfil_suelta_la_anterior(self):
+        import os
+        from users.models import Profile
+        from common.models import Blob
+        perfil = Profile.objects.create(user=self.user, nombre_completo="D", numero_documento="1",
+                                        pais="CO", ciudad="Medellín", foto_perfil=self._archivo(b"vieja"))
+        vieja = perfil.foto_perfil.path
+        perfil = Profile.objects.get(pk=perfil.pk)
+        perfil.foto_perfil = self._archivo(b"nueva")
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil.save()
+        self.assertFalse(os.path.exists(vieja))
+        self.assertEqual(list(Blob.objects.values_list("name", "refs")), [(perfil.foto_perfil.name, 1)])
+
+    def test_url_inmutable(self):
+        from catalog.models import Imagen
+        from django.test import RequestFactory
+        from common.almacenamiento import servir_media
+        img = Imagen.objects.create(articulo=self.arts[0], imagen=self._archivo(b"foto"))
+        self.assertTrue(img.imagen.url.startswith("/media/cas/"))
+        # en DEBUG App/urls.py sirve MEDIA_URL con esta vista
+        resp = servir_media(RequestFactory().get(img.imagen.url), img.imagen.name, document_root=self.media)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("immutable", resp["Cache-Control"])
+
+    def test_limpiar_blobs(self):
+        import os
+        from io import StringIO
+        from django.core.management import call_command
+        from catalog.models import Imagen
+        from common.models import Blob
+        img = Imagen.objects.create(articulo=self.arts[0], imagen=self._archivo(b"foto"))
+        huerfano = Imagen.objects.create(articulo=self.arts[1], imagen=self._archivo(b"rollback"))
+        Blob.objects.filter(name=huerfano.imagen.name).delete()
+        call_command("limpiar_blobs", min_age=0, stdout=StringIO())
+        self.assertTrue(os.path.exists(img.imagen.path))
+        self.assertFalse(os.path.exists(huerfano.imagen.path))
+
+
+class NominatimClientTests(TestCase):
+    def _cliente(self, respuestas, **kwargs):
+        from unittest import mock
+        from common.services.nominatim import NominatimClient
+        self.reloj = [0.0]
+        self.dormido = []
+
+        def dormir(s):
+            self.dormido.append(s)
+            self.reloj[0] += s
+
+        c = NominatimClient("https://nominatim.test/search", "tests", dormir=dormir,
+                            reloj=lambda: self.reloj[0], **kwargs)
+        c.session.get = mock.Mock(side_effect=respuestas)
+        return c
+
+    def _resp(self, status, data=None, headers=None):
+        from unittest import mock
+        import requests
+        r = mock.Mock(status_code=status, headers=headers or {})
+        r.json.return_value = data
+        r.raise_for_status.side_effect = requests.HTTPError(str(status)) if status >= 400 else None
+        return r
+
+    def test_limite_de_una_peticion_por_segundo(self):
+        c = self._cliente([self._resp(200, []) for _ in range(3)])
+        for _ in range(3):
+            c.buscar({"q": "x"})
+        self.assertEqual(self.dormido, [1.0, 1.0])
+        stats = c.estadisticas()
+        self.assertEqual((stats["llamadas"], stats["ok"], stats["esperas"]), (3, 3, 2))
+        self.assertEqual(stats["espera_s"], 2.0)
+
+    def test_reintenta_429_y_5xx(self):
+        import requests
+        c = self._cliente([self._resp(429, headers={"Retry-After": "5"}),
+                           requests.ConnectionError("reset"),
+                           self._resp(503),
+                           self._resp(200, [{"lat": "1", "lon": "2"}])])
+        self.assertEqual(c.buscar({"q": "x"}), [{"lat": "1", "lon": "2"}])
+        stats = c.estadisticas()
+        self.assertEqual((stats["llamadas"], stats["reintentos"], stats["errores"]), (4, 3, 0))
+        self.assertEqual(self.dormido[0], 5.0)  # respeta Retry-After
+
+    def test_agota_reintentos(self):
+        import requests
+        c = self._cliente([self._resp(500) for _ in range(3)], reintentos=2)
+        with self.assertRaises(requests.HTTPError):
+            c.buscar({"q": "x"})
+        self.assertEqual(c.estadisticas()["errores"], 1)
+
+    def test_404_no_se_reintenta(self):
+        import requests
+        c = self._cliente([self._resp(404)])
+        with self.assertRaises(requests.HTTPError):
+            c.buscar({"q": "x"})
+        self.assertEqual(c.estadisticas()["reintentos"], 0)
@@ -0,0 +1,63 @@
+# App/common/tests_planes.py
+"""
+Regresión de planes de consulta: cada consulta caliente debe resolverse con
+un índice. Si una migración o un cambio en la consulta hace que SQLite caiga
+a un recorrido completo ("SCAN <tabla>" sin índice), el test falla.
+"""
+import re
+from datetime import date
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from catalog.models import Articulo, ArticuloBorrado, Categoria
+from chat.models import Message
+from rentals.models import Alquiler, Calificacion
+
+# "SCAN catalog_articulo" a secas es un recorrido completo; con
+# "USING INDEX"/"USING COVERING INDEX" es un recorrido ordenado por índice.
+SCAN_COMPLETO = re.compile(r"\bSCAN (\w+)(?! USING)(?:\s|$)")
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN es de SQLite")
+class PlanesConsultaTests(TestCase):
+    def assertUsaIndices(self, qs):
+        plan = qs.explain()
+        completos = [m.group(1) for m in SCAN_COMPLETO.finditer(plan)]
+        self.assertFalse(completos, f"Recorrido completo de {completos}:\n{plan}\n{qs.query}")
+
+    def test_cerca_caja_lat_lng(self):
+        self.assertUsaIndices(Articulo.objects.filter(
+            lat__gte=6.1, lat__lte=6.4, lng__gte=-75.7, lng__lte=-75.4))
+
+    def test_cerca_celdas(self):
+        self.assertUsaIndices(Articulo.objects.filter(celda__in=["310:-3779", "310:-3778"]))
+
+    def test_listado_por_creado(self):
+        self.assertUsaIndices(Articulo.objects.order_by("-creado", "id")[:24])
+
+    def test_feed_aliados(self):
+        from datetime import datetime, timezone
+        from catalog import feed
+        posicion = (datetime(2026, 1, 1, tzinfo=timezone.utc), "0" * 32)
+        self.assertUsaIndices(feed._despues(Articulo.objects.all(), "actualizado", "id", posicion)[:100])
+        self.assertUsaIndices(feed._despues(ArticuloBorrado.objects.all(), "borrado", "articulo_id", posicion)[:100])
+
+    def test_solape_alquileres(self):
+        # disponibilidad y AlquilerSerializer.validate
+        self.assertUsaIndices(Alquiler.objects.filter(
+            articulo_id="0" * 32, estado__in=["SOLICITADO", "APROBADO", "EN_CURSO"],
+            fecha_inicio__lte=date(2026, 1, 31), fecha_fin__gte=date(2026, 1, 1),
+        ).order_by("fecha_inicio"))
+
+    def test_mensajes_de_conversacion(self):
+        self.assertUsaIndices(Message.objects.filter(conversacion_id=1).order_by("creado"))
+
+    def test_resenas_por_articulo(self):
+        self.assertUsaIndices(Calificacion.objects.select_related("alquiler", "autor")
+                              .filter(alquiler__articulo_id="0" * 32).order_by("-fecha"))
+
+    def test_categoria_subarbol(self):
+        # ?categoria_arbol= y Categoria.descendientes()
+        self.assertUsaIndices(Categoria.objects.filter(Categoria.subarbol("abc/")))
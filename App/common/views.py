@@ -1,3 +1,29 @@
-from django.shortcuts import render
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from .cache_respuestas import estadisticas
+from .services import nominatim
+
+
+class EstadisticasCacheView(APIView):
+    """
+    GET /api/cache/estadisticas/
+    Aciertos y fallos del caché de respuestas por vista (solo staff).
+    Con LocMem los contadores son del proceso que atiende la petición.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(estadisticas())
+
+
+class EstadisticasGeocodingView(APIView):
+    """
+    GET /api/geocoding/estadisticas/
+    Contadores del cliente de Nominatim de este proceso (solo staff).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(nominatim.cliente().estadisticas())
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RentalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rentals'
+
+    def ready(self):
+        # marca de cambios de reseñas para el GET condicional
+        from . import signals  # noqa: F401
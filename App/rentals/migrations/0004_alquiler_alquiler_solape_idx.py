@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_indices_articulo'),
+        ('rentals', '0003_cartitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alquiler',
+            index=models.Index(fields=['articulo', 'estado', 'fecha_inicio', 'fecha_fin'], name='alquiler_solape_idx'),
+        ),
+    ]
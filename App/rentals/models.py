@@ -16,6 +16,12 @@ class Alquiler(models.Model):
     precio_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     creado = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # solapes de fechas: disponibilidad, AlquilerSerializer.validate y clean()
+            models.Index(fields=["articulo", "estado", "fecha_inicio", "fecha_fin"], name="alquiler_solape_idx"),
+        ]
+
     def clean(self):
         if self.fecha_inicio > self.fecha_fin:
             raise ValidationError("La fecha de inicio debe ser <= fecha fin.")
@@ -90,10 +90,10 @@ class CartItemSerializer(serializers.ModelSerializer):
         read_only_fields = ("dias", "precio_por_dia", "total_estimado", "creado")
 
     def get_articulo_portada(self, obj):
-        try:
-            return obj.articulo.imagenes.first().imagen.url if obj.articulo.imagenes.exists() else obj.articulo.portada
-        except Exception:
+        portada = obj.articulo.portada
+        if not portada or not portada.imagen:
             return None
+        return portada.url_miniatura(320)
 
     def validate(self, data):
         from django.utils.timezone import now
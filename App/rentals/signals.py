@@ -0,0 +1,13 @@
+# App/rentals/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from common import condicional
+from .models import Calificacion
+
+
+@receiver([post_save, post_delete], sender=Calificacion)
+def calificacion_cambiada_marca(sender, **kwargs):
+    # invalida los ETag / Last-Modified de /api/articulos/<id>/reviews/
+    transaction.on_commit(lambda: condicional.tocar("resenas"))
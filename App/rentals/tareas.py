@@ -0,0 +1,27 @@
+# App/rentals/tareas.py
+"""Tareas en segundo plano de alquileres (ver common/jobs.py)."""
+from datetime import timedelta
+
+from django.utils.timezone import now
+
+from catalog.models import Articulo
+from common.jobs import tarea
+from common.models import Notification
+
+
+@tarea("rentals.pedir_resenas")
+def pedir_resenas(user_id, articulo_ids):
+    """Notificación “Califica el artículo…” por cada artículo pagado."""
+    tnow = now()
+    titulos = dict(Articulo.objects.filter(pk__in=articulo_ids).values_list("id", "titulo"))
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id,
+            kind="review_request",
+            title="Califica el artículo que adquiriste",
+            body=f"Cuéntanos cómo te fue con “{titulos[pk]}”.",
+            action_url=f"/articulo/{pk}/#opiniones",
+            expires_at=tnow + timedelta(days=5),
+        )
+        for pk in (Articulo._meta.pk.to_python(a) for a in articulo_ids) if pk in titulos
+    ])
@@ -1,3 +1,32 @@
+from datetime import date
+
 from django.test import TestCase
 
-# Create your tests here.
+
+class ResenasCondicionalTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from users.models import User
+        from catalog.models import Articulo, Categoria
+        from rentals.models import Alquiler
+        cache.clear()
+        dueno = User.objects.create_user(username="dueno", email="dueno@test.co", password="12345")
+        self.cliente = User.objects.create_user(username="cliente", email="cliente@test.co", password="12345")
+        self.art = Articulo.objects.create(propietario=dueno, titulo="Taladro", descripcion="-",
+                                           categoria=Categoria.objects.create(nombre="Taladros"),
+                                           precio_por_dia=10, ubicacion="Medellín")
+        self.alquiler = Alquiler.objects.create(articulo=self.art, arrendatario=self.cliente,
+                                                fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 3))
+
+    def test_resenas_304_hasta_nueva_resena(self):
+        from rentals.models import Calificacion
+        for url in (f"/api/articulos/{self.art.pk}/reviews/", f"/api/articulos/{self.art.pk}/reviews/summary/"):
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            revalidar = lambda: self.client.get(url, HTTP_IF_NONE_MATCH=resp["ETag"])
+            self.assertEqual(revalidar().status_code, 304)
+            with self.captureOnCommitCallbacks(execute=True):
+                Calificacion.objects.create(alquiler=self.alquiler, autor=self.cliente,
+                                            destinatario=self.art.propietario, puntaje=5)
+            self.assertEqual(revalidar().status_code, 200)
+            Calificacion.objects.all().delete()
@@ -4,6 +4,7 @@ from datetime import timedelta
 from django.db import models
 from django.utils.dateparse import parse_date
 from django.utils.timezone import now
+from common import condicional
 from common.enums import EstadoPago 
 
 from rest_framework import permissions, status, viewsets
@@ -30,6 +31,13 @@ def daterange(d1, d2):
         yield cur
         cur += timedelta(days=1)
 
+
+def validadores_resenas(art_id):
+    """ETag / Last-Modified de las reseñas de un artículo (conteo y última fecha)."""
+    resumen = (Calificacion.objects.filter(alquiler__articulo_id=art_id)
+               .aggregate(n=models.Count("id"), ultima=models.Max("fecha")))
+    return condicional.validadores("resenas", art_id, resumen["n"], ultimo=resumen["ultima"])
+
 # Alquileres
 
 class AlquilerViewSet(viewsets.ModelViewSet):
@@ -118,7 +126,7 @@ class CartItemViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return CartItem.objects.select_related("articulo").filter(user=self.request.user)
+        return CartItem.objects.select_related("articulo", "articulo__portada").filter(user=self.request.user)
 
     @action(detail=False, methods=["post"])
     def checkout(self, request):
@@ -187,6 +195,9 @@ class ReviewsByArticuloList(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, art_id):
+        return condicional.responder(request, *validadores_resenas(art_id), lambda: self._listar(request, art_id))
+
+    def _listar(self, request, art_id):
         qs = (
             Calificacion.objects.select_related("alquiler", "autor")
             .filter(alquiler__articulo_id=art_id)
@@ -215,6 +226,9 @@ class ReviewsByArticuloSummary(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, art_id):
+        return condicional.responder(request, *validadores_resenas(art_id), lambda: self._resumir(art_id))
+
+    def _resumir(self, art_id):
         qs = Calificacion.objects.filter(alquiler__articulo_id=art_id)
         counts = {i: qs.filter(puntaje=i).count() for i in range(1, 6)}
         total = sum(counts.values()) or 0
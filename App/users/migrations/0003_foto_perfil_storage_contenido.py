@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:08
+
+import common.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_blob'),
+        ('users', '0002_profile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='foto_perfil',
+            field=models.ImageField(blank=True, null=True, storage=common.almacenamiento.contenido, upload_to='profiles/'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 # Create your models here.
 import uuid
 from django.contrib.auth.models import AbstractUser
+from common.almacenamiento import contenido
 from common.enums import TipoUsuario
 from django.conf import settings
 from django.db import models
@@ -54,7 +55,7 @@ class Profile(models.Model):
     # PRIVADA: solo dueño o staff
     direccion_exacta = models.CharField(max_length=255, blank=True)  # privada
 
-    foto_perfil = models.ImageField(upload_to="profiles/", null=True, blank=True)
+    foto_perfil = models.ImageField(upload_to="profiles/", storage=contenido, null=True, blank=True)
 
     status = models.CharField(
         max_length=20, choices=Status.choices, default=Status.INCOMPLETE